@@ -1,8 +1,13 @@
 import sys
 import os
 
+import importlib
+
 current_script_dir = os.path.dirname(os.path.abspath(__file__))
 
+# 沙盒模式 (Debug/sandbox.py)：由環境變數指定遊戲所在資料夾與模組名稱，多個工作可同時執行
+sandbox_dir = os.environ.get("GAME_DIR")
+game_module_name = os.environ.get("GAME_MODULE", "generated_app")
 
 # 策略 A：假設我現在就在根目錄 (Fuzzer 執行時的情況)
 path_strategy_a = os.path.join(current_script_dir, "dest")
@@ -11,7 +16,10 @@ path_strategy_a = os.path.join(current_script_dir, "dest")
 path_strategy_b = os.path.join(os.path.dirname(current_script_dir), "dest")
 dest_folder_path = None
 
-if os.path.exists(path_strategy_a):
+if sandbox_dir and os.path.isdir(sandbox_dir):
+    print(f"📍 [路徑偵測] 沙盒模式: {sandbox_dir} ({game_module_name})")
+    dest_folder_path = sandbox_dir
+elif os.path.exists(path_strategy_a):
     print(f"📍 [路徑偵測] 偵測到運行於專案根目錄 (Fuzzer模式)")
     dest_folder_path = path_strategy_a
 elif os.path.exists(path_strategy_b):
@@ -27,13 +35,13 @@ else:
     print("="*40)
     sys.exit(1) # 回傳錯誤碼 1
 
-# 把 dest 加入搜尋路徑
+# 把 dest (或沙盒) 加入搜尋路徑，放在最前面避免匯入到其他位置的同名模組
 if dest_folder_path not in sys.path:
-    sys.path.append(dest_folder_path)
+    sys.path.insert(0, dest_folder_path)
 
 try:
-    from generated_app import Game
-except ImportError as e:
+    Game = importlib.import_module(game_module_name).Game
+except (ImportError, AttributeError) as e:
     print(f"❌ 匯入錯誤：{e}")
     sys.exit(1)
 
@@ -46,5 +54,28 @@ class AutoStartGame(Game):
             self.show_menu = False
 
 if __name__ == "__main__":
+    if "--profile" in sys.argv:
+        # 效能分析模式：python Debug/debug_launcher.py --profile [--frames 600] [--top 15] [--out dest/profile] [--headless]
+        import argparse
+        parser = argparse.ArgumentParser()
+        parser.add_argument("--profile", action="store_true")
+        parser.add_argument("--frames", type=int, default=600)
+        parser.add_argument("--top", type=int, default=15)
+        parser.add_argument("--interval", type=float, default=1.0, help="取樣間隔 (ms)")
+        parser.add_argument("--out", default=os.path.join(dest_folder_path, "profile"))
+        parser.add_argument("--headless", action="store_true")
+        args = parser.parse_args()
+        if args.headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+        sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+        from profiler import profile_game
+        result = profile_game(AutoStartGame, frames=args.frames, output_prefix=args.out,
+                              top_n=args.top, interval=args.interval / 1000)
+        print(result["Text"])
+        print(f"📄 Flame graph: {', '.join(result['Files'])}")
+        sys.exit(0 if result["state"] else 1)
+
     game = AutoStartGame()
     game.run()
\ No newline at end of file
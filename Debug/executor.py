@@ -1,46 +1,57 @@
 import sys
-import subprocess
 import os
 import google.generativeai as genai
 
 # 引入模組
 from config import *
 from tools import code_to_py, clean_code
+from Debug.supervisor import supervise
+from Debug.fix_cache import error_signature, get_fix_cache
+from Debug.fuzz_tester import FUZZ_BOOTSTRAP_DIR
+from Debug.traceback_parser import compact_error
+from llm_scheduler import get_scheduler
 
 # 遊戲編譯與初步偵錯 (Runtime Check)
-def compile_and_debug(full_path: str) -> dict:
+def compile_and_debug(full_path: str, limits: dict = None) -> dict:
     folder = os.path.dirname(full_path)      
     filename = os.path.basename(full_path) 
     print(f"🔄 正在執行並偵錯 {filename} 在 {folder}資料夾中 ...")
 
     try:
-        result = subprocess.run(
+        # 透過 sitecustomize 掛上 excepthook，崩潰時順便記錄遊戲模組的區域變數
+        run_env = os.environ.copy()
+        run_env["PYTHONPATH"] = os.pathsep.join(filter(None, [FUZZ_BOOTSTRAP_DIR, run_env.get("PYTHONPATH")]))
+        run_env["CRASH_LOCALS"] = filename
+
+        # 串流監控：一出現 Traceback 就結束子行程，不必等滿 10 秒
+        result = supervise(
             [sys.executable, filename],
-            capture_output = True,
-            text = True,
             cwd = folder,
+            env = run_env,
             timeout = 10,             # 測試時間
-            encoding = 'utf-8', 
-            errors = 'ignore'         # 忽略無法解碼的字元
+            limits = limits           # 沙盒模式下的 CPU / 記憶體上限
         )
-        if result.returncode == 0:
+        if result["Reason"] == "timeout":
+            print("✅ 遊戲可持續執行")
+            return {
+                "state": True,
+                "Text": None,
+                "Elapsed": result["Elapsed"]
+            }
+        elif result["state"]:
             print("✅ 遊戲執行完畢(Unusual)")
             return {
                 "state": True,
-                "Text": None
+                "Text": None,
+                "Elapsed": result["Elapsed"]
             }
         else:
-            print("❌ 程式執行失敗，發生錯誤！")
+            print(f"❌ 程式執行失敗，發生錯誤！(於 {result['DetectedAt']:.2f} 秒偵測到)")
             return {
                 "state": False,
-                "Text": result.stderr
+                "Text": result["Text"],
+                "Elapsed": result["Elapsed"]
             }
-    except subprocess.TimeoutExpired:
-        print("✅ 遊戲可持續執行")
-        return {
-                "state": True,
-                "Text": None
-        }
     except Exception as e:
         print(f"❌ 發生系統錯誤: {e}")  
         return {
@@ -48,11 +59,32 @@ def compile_and_debug(full_path: str) -> dict:
             "Text": str(e)
         }
 
+def _save_code(code_content: str, filepath: str = None):
+    if filepath:
+        # 沙盒模式：覆蓋該工作自己的檔案，不動共用的 dest/generated_app.py
+        code_to_py(code_content, filename = os.path.basename(filepath), folder = os.path.dirname(filepath))
+    else:
+        code_to_py(code_content) # 存檔覆蓋
+
 # 遊戲除錯 (Runtime Error Fixing)
-def error_solving(error_msg, code_content) -> str:
+def error_solving(error_msg, code_content, filepath: str = None) -> str:
+    # 先查已知修復快取：同樣的錯誤特徵曾經被修好過，就直接套用，不必再呼叫 LLM
+    fix_cache = get_fix_cache()
+    job = filepath or "dest"
+    signature = error_signature(error_msg)
+    fix_cache.resolve(job, signature)   # 這次的錯誤同時也是上一次修復的驗證結果
+    if signature:
+        patched, fix = fix_cache.lookup(signature, code_content)
+        if patched is not None:
+            print(f"📚 [FixCache] 套用已知修復: {signature['error']}")
+            fix_cache.begin(job, signature, code_content, patched, fix)
+            _save_code(patched, filepath)
+            return patched
+
     system_instruction_error_solver = (
         "你是一個 Python 執行期錯誤修復專家 (Runtime Exception Specialist)。"
-        "你的任務是根據「完整的 Python 原始碼」以及「控制台錯誤訊息 (Traceback/Stderr)」，修復導致程式崩潰的錯誤。"
+        "你的任務是根據「完整的 Python 原始碼」以及「錯誤報告」，修復導致程式崩潰的錯誤。"
+        "錯誤報告已整理過：例外類型與訊息、遊戲程式內的呼叫堆疊 (> 標示出錯的行) 與當下的區域變數值。"
         "【修復策略與規範】"
         "1. **Traceback 優先:** 針對報錯的那一行進行精準修復。"
         "2. **禁止鴕鳥心態:** 嚴禁為了解決錯誤而直接刪除功能。"
@@ -61,12 +93,14 @@ def error_solving(error_msg, code_content) -> str:
         "直接輸出修復後、可直接執行的完整 Python 程式碼 (Full Code)。"
         "嚴禁輸出 Markdown 標記，嚴禁輸出任何解釋文字。"
     )
-    model = genai.GenerativeModel(MODEL_SMART)
-    response_debugger = model.generate_content(f"""
+    # 只送精簡的失敗紀錄 (去掉 pygame 橫幅、函式庫內部的 frame 等雜訊)
+    error_report = compact_error(error_msg, code_content, filepath or "generated_app.py")
+
+    response_debugger = get_scheduler().generate(MODEL_SMART, f"""
             {system_instruction_error_solver}
 
-            === 執行期錯誤報告 (Runtime Error Traceback) ===
-            {error_msg}
+            === 執行期錯誤報告 (Runtime Error Report) ===
+            {error_report}
             ==============================================
 
             === 原始程式碼 (Source Code) ===
@@ -76,6 +110,8 @@ def error_solving(error_msg, code_content) -> str:
             請根據上方的錯誤報告，修復原始程式碼。
             """
     )
-    code_content = clean_code(response_debugger.text)
-    code_to_py(code_content) # 存檔覆蓋
-    return code_content
\ No newline at end of file
+    fixed_code = clean_code(response_debugger.text)
+    if signature:
+        fix_cache.begin(job, signature, code_content, fixed_code)
+    _save_code(fixed_code, filepath)
+    return fixed_code
\ No newline at end of file
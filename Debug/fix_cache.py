@@ -0,0 +1,212 @@
+import difflib
+import hashlib
+import json
+import os
+import re
+import threading
+
+# ==========================================
+# 錯誤特徵資料庫與已知修復快取 (Error Signature DB / Known-fix Cache)
+# 同樣的崩潰 (例如 GameSprite.__init__() got multiple values for argument 'pos') 在不同次生成中反覆出現。
+# 把錯誤訊息正規化成「特徵」，並記錄曾經成功修好該錯誤的程式碼片段替換；
+# 下次遇到同一特徵時先套用已知修復，不必再花一次 LLM 呼叫。
+# ==========================================
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIX_CACHE_PATH = os.path.join(BASE_DIR, "dest", "fix_cache.json")
+
+MAX_HUNKS = 6            # 修復超過這麼多處改動就不記錄 (通常是整份重寫，無法套用到別的程式)
+MAX_CHANGED_LINES = 40
+CONTEXT_LINES = 1        # 每個改動前後各保留幾行，讓片段在新程式中能唯一定位
+
+# "TypeError: ..."、"pygame.error: ..." 或靜態預檢的 "generated_app.py:12: NameError: ..."
+_EXCEPTION_LINE = re.compile(r"(?:^|:\s)([A-Za-z_][\w.]*(?:Error|Exception|Exit|Interrupt|error)):\s?(.*)$")
+_FILE_LINE = re.compile(r'^\s*File "([^"]+)", line \d+')
+
+
+def _normalize(text: str) -> str:
+    text = re.sub(r"0x[0-9a-fA-F]+", "0xADDR", text)
+    text = re.sub(r"(?:[A-Za-z]:)?[\\/][^\s'\"]*[\\/]([^\\/\s'\"]+)", r"\1", text)   # 絕對路徑只留檔名
+    text = re.sub(r"\b(?:generated_app|game_\w+?)\.py\b", "<game>.py", text)
+    text = re.sub(r"\b\d+(?:\.\d+)?\b", "N", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def error_signature(error_msg: str):
+    """
+    把錯誤訊息正規化成特徵：例外類型 + 訊息 + 出錯的那一行程式碼 (數字、路徑、記憶體位址都會被抽象化)。
+    Returns:
+        dict | None: {"key": str, "error": str, "code": str}；找不到例外訊息時回傳 None (例如效能報告)
+    """
+    if not error_msg:
+        return None
+    lines = error_msg.strip().splitlines()
+    exc_index = None
+    for index in range(len(lines) - 1, -1, -1):
+        if _EXCEPTION_LINE.search(lines[index].strip()):
+            exc_index = index
+            break
+    if exc_index is None:
+        return None
+
+    match = _EXCEPTION_LINE.search(lines[exc_index].strip())
+    error = _normalize(f"{match.group(1)}: {match.group(2)}")
+
+    # 出錯的程式碼：Traceback 最後一個 File 行的下一行，或靜態預檢訊息的下一行 (縮排的原始碼)
+    code = ""
+    file_indexes = [i for i in range(exc_index) if _FILE_LINE.match(lines[i])]
+    if file_indexes and file_indexes[-1] + 1 < exc_index:
+        code = lines[file_indexes[-1] + 1]
+    elif exc_index + 1 < len(lines) and lines[exc_index + 1].startswith((" ", "\t")):
+        code = lines[exc_index + 1]
+    if set(code.strip()) <= set("^~ "):
+        code = ""
+    code = _normalize(code)
+
+    key = hashlib.sha1(f"{error}|{code}".encode("utf-8")).hexdigest()[:16]
+    return {"key": key, "error": error, "code": code}
+
+
+def extract_hunks(before: str, after: str):
+    """
+    取出修復前後的差異片段 [(舊片段, 新片段), ...]；改動太多 (整份重寫) 時回傳 None。
+    """
+    old_lines = before.splitlines(keepends=True)
+    new_lines = after.splitlines(keepends=True)
+    opcodes = [op for op in difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_opcodes()
+               if op[0] != "equal"]
+    changed = sum(max(i2 - i1, j2 - j1) for _, i1, i2, j1, j2 in opcodes)
+    if not opcodes or len(opcodes) > MAX_HUNKS or changed > MAX_CHANGED_LINES:
+        return None
+
+    hunks = []
+    for _, i1, i2, j1, j2 in opcodes:
+        start = max(i1 - CONTEXT_LINES, 0)
+        end = min(i2 + CONTEXT_LINES, len(old_lines))
+        before_context = old_lines[start:i1]
+        after_context = old_lines[i2:end]
+        old_snippet = "".join(before_context + old_lines[i1:i2] + after_context)
+        new_snippet = "".join(before_context + new_lines[j1:j2] + after_context)
+        hunks.append([old_snippet, new_snippet])
+    return hunks
+
+
+def apply_hunks(code: str, hunks: list):
+    """每個舊片段都必須在程式中剛好出現一次才套用，否則回傳 None (避免改錯地方)"""
+    for old_snippet, _ in hunks:
+        if not old_snippet.strip() or code.count(old_snippet) != 1:
+            return None
+    for old_snippet, new_snippet in hunks:
+        code = code.replace(old_snippet, new_snippet, 1)
+    return code
+
+
+class FixCache:
+    def __init__(self, path: str = None):
+        self.path = path or FIX_CACHE_PATH
+        self._lock = threading.Lock()
+        self._pending = {}   # 工作 (檔案路徑) -> 尚待驗證的修復
+        self.data = {"signatures": {}, "stats": {"lookups": 0, "hits": 0, "llm_fixes": 0}}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)   # 原子替換，平行的工作不會讀到寫一半的檔案
+
+    def _entry(self, signature: dict) -> dict:
+        return self.data["signatures"].setdefault(signature["key"], {
+            "error": signature["error"], "code": signature["code"], "seen": 0, "fixes": []
+        })
+
+    def lookup(self, signature: dict, code_content: str):
+        """
+        依特徵尋找可套用的已知修復 (成功次數多、失敗少的優先)。
+        Returns:
+            tuple: (修復後的程式碼, 修復紀錄) 或 (None, None)
+        """
+        with self._lock:
+            self.data["stats"]["lookups"] += 1
+            entry = self._entry(signature)
+            entry["seen"] += 1
+            candidates = sorted((fix for fix in entry["fixes"] if fix["successes"] > fix["failures"]),
+                                key=lambda fix: (fix["successes"] - fix["failures"], fix["successes"]), reverse=True)
+            for fix in candidates:
+                patched = apply_hunks(code_content, fix["hunks"])
+                if patched is not None:
+                    self.data["stats"]["hits"] += 1
+                    fix["applied"] = fix.get("applied", 0) + 1
+                    self._save()
+                    return patched, fix
+            self._save()
+            return None, None
+
+    def begin(self, job: str, signature: dict, before: str, after: str, fix: dict = None):
+        """記錄一次修復 (LLM 產生或由快取套用)，等下一輪測試結果再判定是否成功"""
+        with self._lock:
+            if fix is None:
+                self.data["stats"]["llm_fixes"] += 1
+                hunks = extract_hunks(before, after)
+                if hunks is None:
+                    self._save()
+                    return
+                self._pending[job] = (signature, {"hunks": hunks, "successes": 0, "failures": 0}, True)
+            else:
+                self._pending[job] = (signature, fix, False)
+            self._save()
+
+    def resolve(self, job: str, next_signature: dict = None):
+        """
+        下一輪測試的結果出來後呼叫：同一特徵又出現代表修復無效，否則 (通過或換成別的錯誤) 代表修好了。
+        """
+        with self._lock:
+            pending = self._pending.pop(job, None)
+            if pending is None:
+                return
+            signature, fix, is_new = pending
+            fixed = next_signature is None or next_signature["key"] != signature["key"]
+            if is_new:
+                if not fixed:
+                    return   # LLM 的修復沒有效果，不列入資料庫
+                self._entry(signature)["fixes"].append(fix)
+            if fixed:
+                fix["successes"] += 1
+            else:
+                fix["failures"] += 1
+            self._save()
+
+    def hit_rate(self) -> float:
+        stats = self.data["stats"]
+        return stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+
+    def summary(self) -> str:
+        stats = self.data["stats"]
+        return (f"[FixCache] 查詢 {stats['lookups']} 次，命中 {stats['hits']} 次 ({self.hit_rate() * 100:.0f}%)，"
+                f"LLM 修復 {stats['llm_fixes']} 次，已知特徵 {len(self.data['signatures'])} 種")
+
+
+_default_cache = None
+
+
+def get_fix_cache() -> FixCache:
+    """整個行程共用一個快取 (平行的沙盒工作以檔案路徑區分)"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = FixCache()
+    return _default_cache
+
+
+if __name__ == "__main__":
+    # 查看目前的快取內容：python Debug/fix_cache.py
+    cache = get_fix_cache()
+    print(cache.summary())
+    for key, entry in sorted(cache.data["signatures"].items(), key=lambda item: -item[1]["seen"]):
+        fixes = ", ".join(f"+{fix['successes']}/-{fix['failures']}" for fix in entry["fixes"]) or "無"
+        print(f"- [{key}] {entry['error']} | {entry['code']} (出現 {entry['seen']} 次，修復紀錄: {fixes})")
@@ -0,0 +1,823 @@
+# ==========================================
+# Fuzz Agent (由 Debug/fuzz_bootstrap/sitecustomize.py 在子行程啟動時載入)
+# 以獨立模組的形式注入隨機/覆蓋率/狀態機測試代理，不改寫遊戲原始碼，
+# 因此 Traceback 的行號與原始檔案一致。只應在 fuzz 子行程中 import。
+# ==========================================
+import sys as _sys
+import os as _os
+import random as _random
+import gc as _gc
+import enum as _enum
+import threading as _threading
+import atexit as _atexit
+import pygame as _pygame
+
+# 強制設定輸出編碼為 UTF-8
+try:
+    _sys.stdout.reconfigure(encoding='utf-8')
+except:
+    pass
+
+_fuzz_duration = float(_os.environ.get('FUZZ_DURATION', '10'))
+
+# FUZZ_SEED：固定測試代理的隨機操作 (代理使用自己的 _rng，不受遊戲消耗亂數的影響)，
+# 同時固定遊戲本身的 random，讓迴歸測試每次重跑都走同一條路徑，與基準比較才有意義
+_fuzz_seed = _os.environ.get('FUZZ_SEED')
+_rng = _random.Random(int(_fuzz_seed)) if _fuzz_seed else _random.Random()
+if _fuzz_seed:
+    _random.seed(int(_fuzz_seed))
+
+# 測試代理送出的輸入事件都帶有 fuzz=True；記錄遊戲最後一次取得的事件中是否有代理的輸入。
+# 遊戲在處理那批事件的同一幀內正常結束，代表是代理自己選到了「離開」(例如鍵盤選單)，而不是遊戲提早結束
+_fuzz_input_seen = [False]
+_real_event_get = _pygame.event.get
+
+def _event_get(*args, **kwargs):
+    events = _real_event_get(*args, **kwargs)
+    _fuzz_input_seen[0] = any(getattr(event, 'fuzz', False) for event in events)
+    return events
+
+_pygame.event.get = _event_get
+
+# 虛擬時鐘 (長時間模擬用)：每次 tick 固定前進一幀、不睡眠，get_ticks 回傳虛擬時間，
+# 幾分鐘的遊戲時間可以在幾十秒內跑完。必須在遊戲建立 Clock 之前替換。
+# 遊戲跑得比真實時間快很多，所以測試代理改由 tick 在遊戲執行緒上驅動 (見 _fuzz_step)，
+# 而不是背景執行緒按真實時間喚醒，才能維持「每模擬秒」相同的操作密度。
+_virtual_ms = [0.0]
+_virtual_clock = bool(_os.environ.get('FUZZ_VIRTUAL_CLOCK'))
+_tester = None
+if _virtual_clock:
+    _VIRTUAL_STEP_MS = 1000.0 / 60
+    _RealClock = _pygame.time.Clock
+
+    class _VirtualClock:
+        def __init__(self):
+            self._real = _RealClock()
+
+        def tick(self, framerate=0):
+            _virtual_ms[0] += _VIRTUAL_STEP_MS
+            self._real.tick()
+            if _tester is not None and _virtual_ms[0] >= _next_step_ms[0]:
+                _next_step_ms[0] = _virtual_ms[0] + _fuzz_interval
+                _fuzz_step()
+            return int(round(_VIRTUAL_STEP_MS))
+
+        tick_busy_loop = tick
+
+        def get_time(self):
+            return int(round(_VIRTUAL_STEP_MS))
+
+        get_rawtime = get_time
+
+        def get_fps(self):
+            return 1000.0 / _VIRTUAL_STEP_MS
+
+    _pygame.time.Clock = _VirtualClock
+    _pygame.time.get_ticks = lambda: int(_virtual_ms[0])
+    _next_step_ms = [0.0]
+
+class _ChaosAgent:
+    def __init__(self, duration_sec=10.0):
+        self.start_t = _pygame.time.get_ticks()
+        self.duration = duration_sec * 1000
+        self.end_t = self.start_t + self.duration
+        
+        try:
+            self.surface = _pygame.display.get_surface()
+            if self.surface:
+                self.w, self.h = self.surface.get_size()
+            else:
+                self.w, self.h = 800, 600
+        except:
+            self.w, self.h = 800, 600
+
+        self.game = None
+        self.quit_rects = []    # 「結束/離開」按鈕的範圍，任何點擊都要避開
+        self.quit_scan_t = -1000
+
+        print(f"[FUZZER] Start Safe Mode Test ({duration_sec}s)")
+
+    def _post_key(self, key):
+        try:
+            _pygame.event.post(_pygame.event.Event(_pygame.KEYDOWN, key=key, fuzz=True))
+            _pygame.event.post(_pygame.event.Event(_pygame.KEYUP, key=key, fuzz=True))
+        except: pass
+
+    def _post_click(self, x, y):
+        try:
+            x = max(0, min(x, self.w - 1))
+            y = max(0, min(y, self.h - 1))
+            # 先送 MOUSEMOTION，部分 Button 需要先進入 hover 狀態才會回應點擊
+            _pygame.event.post(_pygame.event.Event(_pygame.MOUSEMOTION, pos=(x, y), rel=(0, 0), buttons=(0, 0, 0),
+                                                   fuzz=True))
+            _pygame.event.post(_pygame.event.Event(_pygame.MOUSEBUTTONDOWN, button=1, pos=(x, y), fuzz=True))
+            _pygame.event.post(_pygame.event.Event(_pygame.MOUSEBUTTONUP, button=1, pos=(x, y), fuzz=True))
+            _pygame.mouse.set_pos((x, y))
+        except: pass
+
+    # 產生一個隨機動作 (tuple)，讓 Chaos 與 Coverage 模式共用同一套動作格式
+    def _random_action(self, keys_extra=()):
+        action_type = _rng.choice(['move', 'click', 'skill'])
+        if action_type == 'move':
+            keys = [_pygame.K_LEFT, _pygame.K_RIGHT, _pygame.K_UP, _pygame.K_DOWN, 
+                    _pygame.K_w, _pygame.K_a, _pygame.K_s, _pygame.K_d]
+            return ('key', _rng.choice(keys))
+        elif action_type == 'click':
+            rand_x = _rng.randint(0, self.w)
+            safe_h_max = int(self.h * 0.85) 
+            rand_y = _rng.randint(0, safe_h_max)
+            if rand_x > self.w * 0.95 and rand_y < self.h * 0.05:
+                rand_x = self.w // 2
+                rand_y = self.h // 2
+            return ('click', rand_x, rand_y)
+        else:
+            return ('key', _rng.choice([_pygame.K_SPACE, _pygame.K_r, _pygame.K_e] + list(keys_extra)))
+
+    def _refresh_quit_rects(self):
+        # 每秒最多掃描一次：不同選單的按鈕常疊在同一位置，點到「結束遊戲」會被誤判為測試失敗
+        now = _pygame.time.get_ticks()
+        if now - self.quit_scan_t < 1000:
+            return
+        self.quit_scan_t = now
+        if self.game is None:
+            self.game = _find_game()
+        if self.game is not None:
+            roots = [self.game, getattr(self.game, 'state_manager', None), _current_state_obj(self.game)]
+            self.quit_rects = [b.rect.copy() for b in _find_buttons(roots)
+                               if any(word in str(getattr(b, 'text', '')) for word in _QUIT_WORDS)]
+
+    def _hits_quit(self, x, y):
+        return any(r.collidepoint(x, y) for r in self.quit_rects)
+
+    def _perform(self, action):
+        if action[0] == 'key':
+            self._post_key(action[1])
+        elif action[0] == 'click':
+            self._refresh_quit_rects()
+            if not self._hits_quit(action[1], action[2]):
+                self._post_click(action[1], action[2])
+
+    def _finish(self):
+        if _perf is not None:
+            _perf.save()
+        if _leak is not None:
+            _leak.save()
+        print(f"[FUZZ] MEMORY peak_kb={_peak_rss_kb()}")
+        print("[FUZZ] SUCCESS: Test Passed cleanly.")
+        try:
+            _pygame.quit()
+        except:
+            pass
+        _os._exit(0) # <--- [關鍵] 強制終止整個進程 (Process)，不留活口
+
+    def update(self):
+        current_t = _pygame.time.get_ticks()
+        
+        # --- [修正點] 時間到時，使用強制退出 ---
+        if current_t > self.end_t:
+            self._finish()
+            
+        if _rng.random() < 0.2:
+            action = self._random_action()
+            self._perform(action)
+            if action[0] == 'click' and _rng.random() < 0.1:
+                edge_x = _rng.choice([0, self.w-1])
+                edge_y = _rng.choice([0, self.h-1])
+                _pygame.mouse.set_pos((edge_x, edge_y))
+
+# ==========================================
+# Coverage-Guided 模式：追蹤遊戲模組的行覆蓋率與狀態轉移
+# ==========================================
+_COV_TARGETS = set(_os.environ.get('FUZZ_COVERAGE_FILES', 'generated_app.py').split(_os.pathsep))
+_COV_STATE_FUNCS = ('change_state', 'set_state', 'push_state')
+_cov_lines = set()        # (檔名, 行號)
+_cov_transitions = set()  # (舊狀態, 新狀態)
+_cov_file_cache = {}
+_cov_last_state = [None]
+
+def _cov_is_target(filename):
+    hit = _cov_file_cache.get(filename)
+    if hit is None:
+        hit = _cov_file_cache[filename] = _os.path.basename(filename) in _COV_TARGETS
+    return hit
+
+def _cov_record_transition(frame):
+    # 取 change_state(self, new_state, ...) 的第一個非 self 參數作為新狀態
+    code = frame.f_code
+    names = code.co_varnames[:code.co_argcount]
+    if len(names) < 2:
+        return
+    new_state = repr(frame.f_locals.get(names[1]))
+    _cov_transitions.add((_cov_last_state[0], new_state))
+    _cov_last_state[0] = new_state
+
+def _cov_local_trace(frame, event, arg):
+    if event == 'line':
+        _cov_lines.add((frame.f_code.co_filename, frame.f_lineno))
+    return _cov_local_trace
+
+def _cov_global_trace(frame, event, arg):
+    if not _cov_is_target(frame.f_code.co_filename):
+        return None # 非遊戲模組不追蹤每一行，降低開銷
+    if frame.f_code.co_name in _COV_STATE_FUNCS:
+        try:
+            _cov_record_transition(frame)
+        except:
+            pass
+    return _cov_local_trace
+
+def _cov_install():
+    # Python 3.12+ 使用 sys.monitoring：每一行只在第一次命中時回呼 (DISABLE)，幾乎零開銷
+    _mon = getattr(_sys, 'monitoring', None)
+    if _mon is not None:
+        _tool = _mon.COVERAGE_ID
+        _mon.use_tool_id(_tool, 'fuzz-coverage')
+
+        def _on_start(code, offset):
+            if not _cov_is_target(code.co_filename):
+                return _mon.DISABLE
+            _mon.set_local_events(_tool, code, _mon.events.LINE)
+            if code.co_name in _COV_STATE_FUNCS:
+                try:
+                    frame = _sys._getframe(1)
+                    if frame.f_code is code:
+                        _cov_record_transition(frame)
+                except:
+                    pass
+
+        def _on_line(code, line):
+            _cov_lines.add((code.co_filename, line))
+            return _mon.DISABLE
+
+        _mon.register_callback(_tool, _mon.events.PY_START, _on_start)
+        _mon.register_callback(_tool, _mon.events.LINE, _on_line)
+        _mon.set_events(_tool, _mon.events.PY_START)
+        return 'sys.monitoring'
+    # 舊版 Python：退回 settrace (只追蹤主執行緒，也就是遊戲迴圈)
+    _sys.settrace(_cov_global_trace)
+    return 'settrace'
+
+# Coverage-Guided Fuzzer：
+# 保留能觸發「新程式行」或「新狀態轉移」的輸入序列 (Corpus)，並持續突變它們，
+# 讓測試更容易走到暫停選單、升級畫面、結算畫面等深層狀態。
+class _CoverageAgent(_ChaosAgent):
+    SEQ_LEN = 12
+    MAX_SEQ_LEN = 64
+    EXTRA_KEYS = (_pygame.K_p, _pygame.K_ESCAPE, _pygame.K_RETURN)
+
+    def __init__(self, duration_sec=10.0, corpus_path=None):
+        super().__init__(duration_sec)
+        self.backend = _cov_install()
+        self.corpus_path = corpus_path
+        self.corpus = self._load_corpus()
+        self.iterations = 0
+        self.current = self._next_sequence()
+        self.step = 0
+        self.features = self._feature_count()
+        print(f"[FUZZER] Coverage mode ({self.backend}), seed corpus: {len(self.corpus)}")
+
+    def _feature_count(self):
+        return len(_cov_lines) + len(_cov_transitions)
+
+    def _load_corpus(self):
+        if not self.corpus_path or not _os.path.exists(self.corpus_path):
+            return []
+        try:
+            import json as _json
+            with open(self.corpus_path, 'r', encoding='utf-8') as f:
+                return [[tuple(a) for a in seq] for seq in _json.load(f)]
+        except:
+            return []
+
+    def _save_corpus(self):
+        if not self.corpus_path:
+            return
+        try:
+            import json as _json
+            with open(self.corpus_path, 'w', encoding='utf-8') as f:
+                _json.dump(self.corpus, f)
+        except:
+            pass
+
+    def _random_sequence(self):
+        return [self._random_action(self.EXTRA_KEYS) for _ in range(self.SEQ_LEN)]
+
+    def _mutate(self, seq):
+        seq = list(seq)
+        for _ in range(_rng.randint(1, 3)):
+            op = _rng.choice(['replace', 'insert', 'delete', 'splice', 'repeat'])
+            idx = _rng.randrange(len(seq)) if seq else 0
+            if op == 'replace' and seq:
+                seq[idx] = self._random_action(self.EXTRA_KEYS)
+            elif op == 'insert':
+                seq.insert(idx, self._random_action(self.EXTRA_KEYS))
+            elif op == 'delete' and len(seq) > 1:
+                del seq[idx]
+            elif op == 'splice' and self.corpus:
+                other = _rng.choice(self.corpus)
+                cut = _rng.randrange(len(other)) if other else 0
+                seq = seq[:idx] + other[cut:]
+            elif op == 'repeat' and seq:
+                seq = seq[:idx + 1] + seq[idx:idx + 4] + seq[idx + 1:]
+        return seq[:self.MAX_SEQ_LEN] or self._random_sequence()
+
+    def _next_sequence(self):
+        if not self.corpus or _rng.random() < 0.2:
+            return self._random_sequence()
+        # 偏好較新的種子 (通常代表更深的狀態)
+        recent = self.corpus[-8:]
+        return self._mutate(_rng.choice(recent))
+
+    def _finish(self):
+        elapsed = max((_pygame.time.get_ticks() - self.start_t) / 1000.0, 0.001)
+        print(f"[FUZZ] COVERAGE lines={len(_cov_lines)} transitions={len(_cov_transitions)} "
+              f"corpus={len(self.corpus)} iterations={self.iterations} "
+              f"rate={self.iterations / elapsed * 60:.0f}/min")
+        self._save_corpus()
+        super()._finish()
+
+    def update(self):
+        if _pygame.time.get_ticks() > self.end_t:
+            self._finish()
+
+        if self.step < len(self.current):
+            self._perform(self.current[self.step])
+            self.step += 1
+            return
+
+        # 一個序列播放完畢：有新覆蓋就收進 Corpus
+        self.iterations += 1
+        count = self._feature_count()
+        if count > self.features:
+            self.corpus.append(self.current)
+        self.features = count
+        self.current = self._next_sequence()
+        self.step = 0
+
+# ==========================================
+# State-Machine 模式：直接讀取遊戲的狀態機與 Button，優先探索尚未走過的狀態
+# ==========================================
+# 計算遊戲實際渲染了幾幀：動作送出後要等遊戲迴圈真的跑過幾幀才觀察結果 (貪食蛇這類低 FPS 遊戲尤其重要)
+_frame_count = [0]
+
+def _wrap_present(func):
+    def _counted(*args, **kwargs):
+        _frame_count[0] += 1
+        return func(*args, **kwargs)
+    return _counted
+
+_QUIT_WORDS = ('結束', '離開', '退出', 'Quit', 'QUIT', 'quit', 'Exit', 'EXIT', 'exit')
+_SKIP_TYPES = (type, _pygame.Surface, _pygame.Rect, _pygame.font.Font, _pygame.sprite.AbstractGroup)
+
+def _find_game():
+    # 從 GC 中找出繼承自 Game 的實例 (debug_launcher 的 AutoStartGame 也算)
+    for obj in _gc.get_objects():
+        try:
+            if not isinstance(obj, type) and any(c.__name__ == 'Game' for c in type(obj).__mro__):
+                return obj
+        except:
+            pass
+    return None
+
+def _state_label(value):
+    if isinstance(value, (str, int, _enum.Enum)):
+        return str(value)
+    return type(value).__name__
+
+def _state_holders(game):
+    return [h for h in (game, getattr(game, 'state_manager', None)) if h is not None]
+
+def _read_state_value(game):
+    # game1: state / game5, game6: current_state / game2, game4: state_manager.(_)current_state
+    for holder in _state_holders(game):
+        for name in ('current_state', '_current_state', 'state'):
+            value = getattr(holder, name, None)
+            if value is not None and not callable(value):
+                return value
+    return None
+
+def _current_state_obj(game):
+    value = _read_state_value(game)
+    return None if isinstance(value, (str, int, _enum.Enum)) else value
+
+def _known_states(game, value):
+    # 狀態全集：目前狀態若是 Enum 就取其所有成員，否則取 StateManager 註冊的狀態物件
+    if isinstance(value, _enum.Enum):
+        return {str(member) for member in type(value)}
+    known = set()
+    for holder in _state_holders(game):
+        for name in ('states', '_states', 'state_handlers'):
+            table = getattr(holder, name, None)
+            if isinstance(table, dict):
+                known.update(_state_label(k if isinstance(value, str) else v) for k, v in table.items())
+    return known
+
+def _find_objects(roots, match, max_depth=3, with_paths=False):
+    # 從遊戲物件出發，有限深度地走訪屬性 / 容器，找出符合條件的物件 (with_paths 時一併回傳屬性路徑)
+    found = []
+    seen = set()
+    stack = [(root, 0, type(root).__name__) for root in roots if root is not None]
+    while stack:
+        obj, depth, path = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if match(obj):
+            found.append((path, obj) if with_paths else obj)
+            continue
+        if isinstance(obj, _SKIP_TYPES) or callable(obj) and not hasattr(obj, '__dict__'):
+            continue
+        if depth >= max_depth:
+            continue
+        if isinstance(obj, (list, tuple, set)):
+            children = [(f'[{i}]', child) for i, child in enumerate(list(obj)[:64])]
+        elif isinstance(obj, dict):
+            children = [(f'[{k!r}]', child) for k, child in list(obj.items())[:64]]
+        elif hasattr(obj, '__dict__') and not isinstance(obj, type(_sys)):
+            children = [(f'.{k}', child) for k, child in vars(obj).items()]
+        else:
+            continue
+        stack.extend((child, depth + 1, path + name) for name, child in children)
+    return found
+
+def _find_buttons(roots, max_depth=3):
+    return _find_objects(roots, lambda obj: 'Button' in type(obj).__name__
+                         and isinstance(getattr(obj, 'rect', None), _pygame.Rect), max_depth)
+
+class _StateAgent(_ChaosAgent):
+    STATE_KEYS = (_pygame.K_p, _pygame.K_ESCAPE, _pygame.K_RETURN, _pygame.K_SPACE)
+    SETTLE_FRAMES = 2    # 動作後等待遊戲渲染幾幀，再觀察結果狀態
+    SETTLE_TIMEOUT = 500 # 遊戲沒有呼叫 flip/update 時的保底等待 (ms)
+    CHAOS_BURST = 40     # 所有已知狀態都探索完時，隨機操作的 tick 數
+
+    def __init__(self, duration_sec=10.0):
+        super().__init__(duration_sec)
+        _pygame.display.flip = _wrap_present(_pygame.display.flip)
+        _pygame.display.update = _wrap_present(_pygame.display.update)
+        self.known = set()
+        self.visited = {}       # 狀態 -> 首次到達時間 (ms)
+        self.edges = {}         # (狀態, 動作 key) -> 結果狀態
+        self.actions = {}       # 狀態 -> {動作 key: 動作}
+        self.pending = None
+        self.settle_frame = 0
+        self.settle_deadline = 0
+        self.chaos_left = 0
+        self.clicks = 0
+        self.last_state = None
+        self.search_cooldown = 0
+
+    def _discover_actions(self, state):
+        actions = {('key', k): ('key', k) for k in self.STATE_KEYS}
+        roots = [self.game, getattr(self.game, 'state_manager', None), _current_state_obj(self.game)]
+        buttons = _find_buttons(roots)
+        # 不同選單的按鈕常常疊在同一個位置，所以要先收集所有離開按鈕的範圍
+        self.quit_scan_t = _pygame.time.get_ticks()
+        self.quit_rects = [b.rect.copy() for b in buttons
+                           if any(word in str(getattr(b, 'text', '')) for word in _QUIT_WORDS)]
+        for button in buttons:
+            r = button.rect
+            if self._hits_quit(r.centerx, r.centery):
+                continue
+            actions[('button', str(getattr(button, 'text', '')), r.x, r.y, r.w, r.h)] = ('click', r.centerx, r.centery)
+        self.actions[state] = actions
+
+    def _untried(self, state):
+        return [k for k in self.actions.get(state, {}) if (state, k) not in self.edges]
+
+    def _route(self, state):
+        # BFS：沿著已知的轉移邊，走向仍有未嘗試動作 (或尚未造訪) 的狀態
+        frontier = [(state, None)]
+        seen = {state}
+        while frontier:
+            current, first_key = frontier.pop(0)
+            if current != state and (current not in self.visited or self._untried(current)):
+                return first_key
+            for (src, key), dst in self.edges.items():
+                if src == current and dst not in seen:
+                    seen.add(dst)
+                    frontier.append((dst, first_key or key))
+        return None
+
+    def _finish(self):
+        elapsed = max((_pygame.time.get_ticks() - self.start_t) / 1000.0, 0.001)
+        order = sorted(self.visited, key=self.visited.get)
+        print(f"[FUZZ] STATES visited={len(self.visited)}/{len(self.known | set(self.visited))} "
+              f"transitions={len({(s, d) for (s, _), d in self.edges.items() if s != d})} "
+              f"clicks={self.clicks} rate={len(self.visited) / elapsed:.2f}/s path={' -> '.join(order)}")
+        super()._finish()
+
+    def update(self):
+        if _pygame.time.get_ticks() > self.end_t:
+            self._finish()
+
+        if self.game is None:
+            if self.search_cooldown > 0:
+                self.search_cooldown -= 1
+                return
+            self.game = _find_game()
+            self.search_cooldown = 30
+            if self.game is None:
+                return
+            self.known = _known_states(self.game, _read_state_value(self.game))
+
+        state = _state_label(_read_state_value(self.game))
+        if state not in self.visited:
+            self.visited[state] = _pygame.time.get_ticks() - self.start_t
+        if state not in self.actions or state != self.last_state:
+            self._discover_actions(state)
+        self.last_state = state
+
+        if self.pending:
+            if _frame_count[0] < self.settle_frame and _pygame.time.get_ticks() < self.settle_deadline:
+                return
+            self.edges[self.pending] = state
+            self.pending = None
+
+        if self.chaos_left > 0:
+            self.chaos_left -= 1
+            self._perform(self._random_action(self.STATE_KEYS))
+            return
+
+        untried = self._untried(state)
+        key = _rng.choice(untried) if untried else self._route(state)
+        if key is None:
+            self.chaos_left = self.CHAOS_BURST
+            return
+
+        action = self.actions[state].get(key)
+        if action is None:
+            # 走已知路徑時按鈕可能已重新建立，找不到就交給隨機探索
+            self.chaos_left = self.CHAOS_BURST
+            return
+        if action[0] == 'click':
+            self.clicks += 1
+        self.pending = (state, key)
+        self.settle_frame = _frame_count[0] + self.SETTLE_FRAMES
+        self.settle_deadline = _pygame.time.get_ticks() + self.SETTLE_TIMEOUT
+        self._perform(action)
+
+# ==========================================
+# 效能紀錄：每幀的工作時間 (不含 clock.tick 的等待)、update / draw 耗時、精靈數量與 FPS
+# ==========================================
+from time import perf_counter as _perf_counter
+
+class _TimedClock:
+    # 包住遊戲的 pygame Clock：以 tick() 作為幀的邊界，扣掉 tick 內的睡眠時間才是真正的工作量
+    def __init__(self, clock, recorder):
+        self._clock = clock
+        self._recorder = recorder
+        self._last_end = None
+
+    def tick(self, *args):
+        start = _perf_counter()
+        if self._last_end is not None:
+            self._recorder.end_frame(start - self._last_end)
+        result = self._clock.tick(*args)
+        self._last_end = _perf_counter()
+        return result
+
+    tick_busy_loop = tick
+
+    def __getattr__(self, name):
+        return getattr(self._clock, name)
+
+class _PerfRecorder:
+    COLUMNS = ['work_ms', 'update_ms', 'draw_ms', 'sprites', 'fps']
+    SPRITE_SAMPLE_EVERY = 10   # 每 N 幀重新統計一次精靈數量
+    GROUP_SCAN_EVERY = 120     # 每 N 幀重新搜尋一次 Sprite Group (狀態切換時會建立新群組)
+
+    def __init__(self, path):
+        self.path = path
+        self.game = None
+        self.frames = []
+        self.groups = []
+        self.update_ms = 0.0
+        self.draw_ms = 0.0
+        self.sprites = 0
+
+    def _timed(self, func, slot):
+        def _wrapper(*args, **kwargs):
+            start = _perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                setattr(self, slot, getattr(self, slot) + (_perf_counter() - start) * 1000)
+        return _wrapper
+
+    def attach(self, game):
+        self.game = game
+        # game1/5/6 有 Game.update/draw，game2/4 則交給 state_manager；只包一層避免重複計時
+        for method, slot in (('update', 'update_ms'), ('draw', 'draw_ms')):
+            for holder in _state_holders(game):
+                func = getattr(holder, method, None)
+                if callable(func):
+                    setattr(holder, method, self._timed(func, slot))
+                    break
+        clock = getattr(game, 'clock', None)
+        if clock is not None and not isinstance(clock, _TimedClock):
+            game.clock = _TimedClock(clock, self)
+
+    def _count_sprites(self):
+        if len(self.frames) % self.GROUP_SCAN_EVERY == 0:
+            self.groups = _find_objects([self.game, _current_state_obj(self.game)],
+                                        lambda obj: isinstance(obj, _pygame.sprite.AbstractGroup))
+        unique = set()
+        for group in self.groups:
+            unique.update(group.sprites())
+        return len(unique)
+
+    def end_frame(self, work_s):
+        try:
+            if len(self.frames) % self.SPRITE_SAMPLE_EVERY == 0:
+                self.sprites = self._count_sprites()
+            fps = self.game.clock.get_fps()
+        except:
+            fps = 0.0
+        self.frames.append([round(work_s * 1000, 3), round(self.update_ms, 3), round(self.draw_ms, 3),
+                            self.sprites, round(fps, 2)])
+        self.update_ms = 0.0
+        self.draw_ms = 0.0
+
+    def save(self):
+        try:
+            import json as _json
+            with open(self.path, 'w', encoding='utf-8') as f:
+                _json.dump({'columns': self.COLUMNS, 'frames': self.frames}, f)
+        except:
+            pass
+
+_perf = _PerfRecorder(_os.environ['FUZZ_METRICS_PATH']) if _os.environ.get('FUZZ_METRICS_PATH') else None
+
+# ==========================================
+# 記憶體洩漏偵測：定期取樣 tracemalloc、RSS、物件池使用量與各 Sprite Group 的數量
+# ==========================================
+def _rss_kb():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * _os.sysconf('SC_PAGE_SIZE') // 1024
+    except:
+        pass
+    try:
+        import psutil as _psutil
+        return _psutil.Process().memory_info().rss // 1024
+    except:
+        return None
+
+def _peak_rss_kb():
+    # 整個測試期間的記憶體峰值 (Linux 的 ru_maxrss 單位是 KB，macOS 是 bytes；Windows 改用 psutil)
+    try:
+        import resource as _resource
+        peak = _resource.getrusage(_resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if _sys.platform == 'darwin' else peak
+    except:
+        pass
+    try:
+        import psutil as _psutil
+        info = _psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) // 1024
+    except:
+        return None
+
+def _pool_counts(pool):
+    # 各遊戲的 ObjectPool 實作不同：pool/_pool 是可用物件，active/_active/_active_objects 是使用中物件
+    counts = {'active': None, 'free': None}
+    for name in ('free', 'pool', '_pool', 'available', '_available'):
+        value = getattr(pool, name, None)
+        if hasattr(value, '__len__'):
+            counts['free'] = len(value)
+            break
+    for name in ('active', '_active', '_active_objects', 'active_objects'):
+        value = getattr(pool, name, None)
+        if hasattr(value, '__len__'):
+            counts['active'] = len(value)
+            break
+    if counts['active'] is None and callable(getattr(pool, 'count_active', None)):
+        counts['active'] = pool.count_active()
+    return counts
+
+class _LeakMonitor:
+    SAMPLE_MS = int(_os.environ.get('FUZZ_SAMPLE_MS', '2000'))
+    WARMUP_RATIO = 0.2       # 前 20% 的時間視為暖機，之後才建立 tracemalloc 基準快照
+    TOP_ALLOCATIONS = 10
+
+    def __init__(self, path, duration_sec):
+        import tracemalloc as _tracemalloc
+        self.tracemalloc = _tracemalloc
+        self.tracemalloc.start(8)
+        self.path = path
+        self.game = None
+        self.samples = []
+        self.next_sample_ms = 0
+        self.warmup_ms = duration_sec * 1000 * self.WARMUP_RATIO
+        self.baseline = None
+
+    def _snapshot(self):
+        return self.tracemalloc.take_snapshot().filter_traces([
+            self.tracemalloc.Filter(False, self.tracemalloc.__file__),
+            self.tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ])
+
+    def maybe_sample(self):
+        now = _pygame.time.get_ticks()
+        if now < self.next_sample_ms:
+            return
+        self.next_sample_ms = now + self.SAMPLE_MS
+        if self.game is None:
+            self.game = _find_game()
+            if self.game is None:
+                return
+        roots = [self.game, _current_state_obj(self.game)]
+        groups = _find_objects(roots, lambda obj: isinstance(obj, _pygame.sprite.AbstractGroup), with_paths=True)
+        pools = _find_objects(roots, lambda obj: 'Pool' in type(obj).__name__ and callable(getattr(obj, 'get', None)),
+                              with_paths=True)
+        self.samples.append({
+            't': round(now / 1000.0, 2),
+            'traced_kb': self.tracemalloc.get_traced_memory()[0] // 1024,
+            'rss_kb': _rss_kb(),
+            'groups': {path: len(group) for path, group in groups},
+            'pools': {path: _pool_counts(pool) for path, pool in pools},
+        })
+        if self.baseline is None and now >= self.warmup_ms:
+            self.baseline = self._snapshot()
+
+    def _top_allocations(self):
+        if self.baseline is None:
+            return []
+        diffs = self._snapshot().compare_to(self.baseline, 'traceback')
+        top = []
+        for diff in diffs[:self.TOP_ALLOCATIONS]:
+            if diff.size_diff <= 0:
+                continue
+            top.append({
+                'size_kb_diff': diff.size_diff // 1024,
+                'count_diff': diff.count_diff,
+                'traceback': [f'{frame.filename}:{frame.lineno}' for frame in diff.traceback],
+            })
+        return top
+
+    def save(self):
+        try:
+            import json as _json
+            report = {'sim_seconds': _fuzz_duration, 'samples': self.samples, 'allocations': self._top_allocations()}
+            with open(self.path, 'w', encoding='utf-8') as f:
+                _json.dump(report, f)
+        except:
+            pass
+
+_leak = _LeakMonitor(_os.environ['FUZZ_LEAK_PATH'], _fuzz_duration) if _os.environ.get('FUZZ_LEAK_PATH') else None
+
+_attach_cooldown = [0]
+
+def _fuzz_step():
+    # 測試代理的一步：必要時把效能紀錄器掛上遊戲、洩漏取樣、執行一次隨機/引導操作
+    try:
+        if _perf is not None and _perf.game is None:
+            _attach_cooldown[0] -= 1
+            if _attach_cooldown[0] <= 0:
+                _attach_cooldown[0] = 30
+                _game = _tester.game or _find_game()
+                if _game is not None:
+                    _perf.attach(_game)
+        if _leak is not None:
+            _leak.maybe_sample()
+        _tester.update()
+    except SystemExit:
+        raise
+    except:
+        pass
+
+def _fuzzer_loop():
+    while True:
+        try:
+            _fuzz_step()
+            _pygame.time.wait(_fuzz_interval)
+        except SystemExit:
+            break
+
+def _report_exit():
+    # 遊戲自行正常結束 (時間到的 _finish 以 os._exit 結束，不會執行到這裡)：
+    # 留下效能數據與記憶體峰值，並告訴 fuzz_tester 這次結束是不是代理自己的輸入造成的
+    if _perf is not None:
+        _perf.save()
+    print(f"[FUZZ] MEMORY peak_kb={_peak_rss_kb()}")
+    print(f"[FUZZ] EXIT fuzz_input={int(_fuzz_input_seen[0])}")
+
+def install():
+    # 選擇測試代理並啟動背景執行緒 (同一個行程只會啟動一次)
+    global _tester, _fuzz_interval
+    if hasattr(_sys, '_fuzzer_active'):
+        return
+    _sys._fuzzer_active = True
+    _fuzz_mode = _os.environ.get('FUZZ_MODE', 'chaos')
+    if _fuzz_mode == 'coverage':
+        _tester = _CoverageAgent(duration_sec=_fuzz_duration, corpus_path=_os.environ.get('FUZZ_CORPUS_PATH'))
+        _fuzz_interval = int(_os.environ.get('FUZZ_INTERVAL_MS', '10'))
+    elif _fuzz_mode == 'state':
+        _tester = _StateAgent(duration_sec=_fuzz_duration)
+        _fuzz_interval = int(_os.environ.get('FUZZ_INTERVAL_MS', '10'))
+    else:
+        _tester = _ChaosAgent(duration_sec=_fuzz_duration)
+        _fuzz_interval = 30
+    _atexit.register(_report_exit)
+    if not _virtual_clock:
+        _threading.Thread(target=_fuzzer_loop, daemon=True).start()
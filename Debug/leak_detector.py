@@ -0,0 +1,164 @@
+import json
+import linecache
+import os
+import sys
+
+# 單獨執行本檔時也能引用專案根目錄的模組
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Debug.fuzz_tester import run_fuzz_test
+
+# ==========================================
+# 記憶體洩漏 / 物件池耗盡偵測 (Leak Detector)
+# 以虛擬時鐘長時間模擬遊戲，分析 harness 取樣的記憶體、物件池與 Sprite Group 數量，
+# 找出「持續成長不會回落」的項目，並附上 tracemalloc 的配置來源。
+# ==========================================
+
+LEAK_BUDGET = {
+    "sim_seconds": 180,       # 模擬的遊戲時間 (秒)
+    "warmup_ratio": 0.2,      # 忽略開頭暖機的取樣比例
+    "growth_ratio": 1.5,      # 後段平均至少是前段平均的幾倍才算成長
+    "min_samples": 6,
+    # 各類數值至少要成長多少才回報 (避免把正常波動當成洩漏)
+    "min_growth": {"traced_kb": 2048, "rss_kb": 8192, "sprites": 50, "pool": 50}
+}
+
+
+def _mean(values: list) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def _growth(times: list, values: list, min_growth: float, growth_ratio: float):
+    """
+    判斷一段數列是否「無上限成長」：後三分之一的最小值仍高於前三分之一的最大值 (持續成長不回落)，
+    且成長量與成長倍率都超過門檻。回傳 (起始平均, 結束平均, 每分鐘斜率) 或 None。
+    """
+    points = [(t, v) for t, v in zip(times, values) if v is not None]
+    if len(points) < 3:
+        return None
+    third = max(1, len(points) // 3)
+    first = [v for _, v in points[:third]]
+    last = [v for _, v in points[-third:]]
+    start, end = _mean(first), _mean(last)
+    if min(last) <= max(first) or end - start < min_growth:
+        return None
+    if start > 0 and end < start * growth_ratio:
+        return None
+
+    # 最小平方法求斜率 (每分鐘成長量)
+    mean_t = _mean([t for t, _ in points])
+    mean_v = _mean([v for _, v in points])
+    denominator = sum((t - mean_t) ** 2 for t, _ in points) or 1.0
+    slope = sum((t - mean_t) * (v - mean_v) for t, v in points) / denominator
+    return start, end, slope * 60
+
+
+def _format_allocation(allocation: dict) -> str:
+    # 優先顯示遊戲本體 (generated_app) 中的呼叫位置，並附上該行原始碼
+    frames = allocation["traceback"]
+    game_frames = [f for f in frames if "generated_app" in f or "game" in os.path.basename(f.split(":")[0])]
+    shown = (game_frames or frames)[-3:]
+    parts = []
+    for frame in reversed(shown):
+        filename, _, lineno = frame.rpartition(":")
+        source = linecache.getline(filename, int(lineno)).strip() if lineno.isdigit() else ""
+        parts.append(f"{os.path.basename(filename)}:{lineno}" + (f" `{source}`" if source else ""))
+    return f"  +{allocation['size_kb_diff'] / 1024:.1f} MB ({allocation['count_diff']:+d} blocks) " + " <- ".join(parts)
+
+
+def analyze_leaks(report: dict, budget: dict = None) -> dict:
+    """
+    分析 harness 產生的洩漏報告。
+    Returns:
+        dict: {"state": bool, "Text": str | None, "Findings": list[dict]}
+              Findings 的每一筆為 {"kind", "name", "start", "end", "per_minute"}
+    """
+    budget = {**LEAK_BUDGET, **(budget or {})}
+    samples = report.get("samples", [])
+    samples = samples[int(len(samples) * budget["warmup_ratio"]):]
+    if len(samples) < budget["min_samples"]:
+        print(f"⚠️ [LeakCheck] 取樣數不足 ({len(samples)})，略過洩漏檢查")
+        return {"state": True, "Text": None, "Findings": []}
+
+    times = [s["t"] for s in samples]
+    min_growth = budget["min_growth"]
+    findings = []
+
+    def check(kind, name, values, threshold):
+        result = _growth(times, values, threshold, budget["growth_ratio"])
+        if result:
+            start, end, per_minute = result
+            findings.append({"kind": kind, "name": name, "start": start, "end": end, "per_minute": per_minute})
+
+    check("memory", "tracemalloc (KB)", [s["traced_kb"] for s in samples], min_growth["traced_kb"])
+    check("memory", "RSS (KB)", [s["rss_kb"] for s in samples], min_growth["rss_kb"])
+
+    group_names = sorted({name for s in samples for name in s["groups"]})
+    for name in group_names:
+        check("group", name, [s["groups"].get(name) for s in samples], min_growth["sprites"])
+
+    pool_names = sorted({name for s in samples for name in s["pools"]})
+    for name in pool_names:
+        active = [(s["pools"].get(name) or {}).get("active") for s in samples]
+        free = [(s["pools"].get(name) or {}).get("free") for s in samples]
+        check("pool", f"{name}.active", active, min_growth["pool"])
+        # 物件池耗盡：後半段大多數時間都沒有可用物件 (簡易版 ObjectPool 的 get() 會回傳 None)
+        tail = [f for f in free[len(free) // 2:] if f is not None]
+        if tail and sum(1 for f in tail if f == 0) >= len(tail) * 0.5:
+            findings.append({"kind": "pool_exhausted", "name": name, "start": free[0], "end": 0, "per_minute": 0.0})
+
+    if not findings:
+        print(f"✅ [LeakCheck] 模擬 {report.get('sim_seconds')} 秒未發現無上限成長")
+        return {"state": True, "Text": None, "Findings": []}
+
+    lines = [f"[LeakCheck] 模擬 {report.get('sim_seconds')} 秒遊戲時間後偵測到無上限成長 (記憶體洩漏 / 物件未回收):"]
+    for finding in findings:
+        if finding["kind"] == "pool_exhausted":
+            lines.append(f"- 物件池 `{finding['name']}` 已耗盡 (free 長時間為 0)，請確認物件死亡時有呼叫 release()")
+        elif finding["kind"] == "group":
+            lines.append(f"- Sprite Group `{finding['name']}`: {finding['start']:.0f} -> {finding['end']:.0f} 個精靈 "
+                         f"(+{finding['per_minute']:.0f}/分鐘)，請確認離開畫面或死亡的精靈有 kill()/remove()")
+        else:
+            lines.append(f"- {finding['name']}: {finding['start']:.0f} -> {finding['end']:.0f} "
+                         f"(+{finding['per_minute']:.0f}/分鐘)")
+    allocations = report.get("allocations", [])
+    if allocations:
+        lines.append("主要配置來源 (相對暖機後的增加量):")
+        lines += [_format_allocation(a) for a in allocations[:5]]
+
+    print(f"❌ [LeakCheck] 發現 {len(findings)} 項持續成長")
+    return {"state": False, "Text": "\n".join(lines), "Findings": findings}
+
+
+def run_leak_test(target_path_arg=None, sim_seconds=None, headless=True, report_path=None, sandbox=None) -> dict:
+    """
+    以虛擬時鐘執行長時間模擬並分析洩漏。
+    Args:
+        report_path: 洩漏報告路徑，預設為 dest/leak_report.json (沙盒模式下寫在沙盒內)
+        sandbox: Debug.sandbox.Sandbox，提供時在該工作的沙盒中執行
+    Returns:
+        dict: {"state": bool, "Text": str | None, "Findings": list[dict]}
+    """
+    sim_seconds = sim_seconds or LEAK_BUDGET["sim_seconds"]
+    if report_path is None:
+        report_path = sandbox.path("leak_report.json") if sandbox is not None else "dest/leak_report.json"
+    print(f"🧪 [LeakCheck] 以虛擬時鐘模擬 {sim_seconds} 秒遊戲時間...")
+    result = run_fuzz_test(target_path_arg, headless=headless, leak_path=report_path, sim_seconds=sim_seconds,
+                           sandbox=sandbox)
+    if not result["state"]:
+        # 長時間模擬中途崩潰，直接回報崩潰訊息
+        return {"state": False, "Text": result["Text"], "Findings": []}
+    if not os.path.exists(report_path):
+        print("⚠️ [LeakCheck] 沒有產生洩漏報告，略過洩漏檢查")
+        return {"state": True, "Text": None, "Findings": []}
+    with open(report_path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    return analyze_leaks(report)
+
+
+if __name__ == "__main__":
+    # 單獨測試用：python Debug/leak_detector.py [模擬秒數]
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    result = run_leak_test(sim_seconds=seconds)
+    if result["Text"]:
+        print(result["Text"])
+    sys.exit(0 if result["state"] else 1)
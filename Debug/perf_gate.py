@@ -0,0 +1,123 @@
+import json
+import sys
+
+# ==========================================
+# 效能門檻 (Performance Gate)
+# 讀取注入 harness 紀錄的每幀數據，判斷遊戲是否符合幀時間預算，
+# 並整理成精簡的效能摘要交給 error_solving 做自動優化。
+# ==========================================
+
+# 預設效能預算
+PERF_BUDGET = {
+    "p95_frame_ms": 16.6,   # 60 FPS 的單幀預算 (不含 clock.tick 的等待時間)
+    "min_fps": None,        # 最低平均 FPS (貪食蛇這類刻意低 FPS 的遊戲請保持 None)
+    "warmup_frames": 30,    # 忽略開頭載入資源、建立物件的幀
+    "min_frames": 60        # 有效幀數太少時不做判斷 (數據不足)
+}
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize_metrics(metrics: dict, warmup_frames: int = 0) -> dict:
+    """把每幀紀錄整理成 p50 / p95 / max 等統計值"""
+    columns = metrics.get("columns", [])
+    frames = metrics.get("frames", [])[warmup_frames:]
+    rows = [dict(zip(columns, frame)) for frame in frames]
+    if not rows:
+        return {"frames": 0}
+
+    work = [r["work_ms"] for r in rows]
+    update = [r["update_ms"] for r in rows]
+    draw = [r["draw_ms"] for r in rows]
+    sprites = [r["sprites"] for r in rows]
+    fps = [r["fps"] for r in rows if r["fps"] > 0]
+    p95 = _percentile(work, 95)
+    slow = [r for r in rows if r["work_ms"] >= p95]
+
+    return {
+        "frames": len(rows),
+        "p50_frame_ms": _percentile(work, 50),
+        "p95_frame_ms": p95,
+        "max_frame_ms": max(work),
+        "avg_update_ms": sum(update) / len(update),
+        "p95_update_ms": _percentile(update, 95),
+        "avg_draw_ms": sum(draw) / len(draw),
+        "p95_draw_ms": _percentile(draw, 95),
+        "avg_fps": sum(fps) / len(fps) if fps else 0.0,
+        "max_sprites": max(sprites),
+        # 最慢的那 5% 幀發生時的精靈數量 (幀時間與實體數量的關係)
+        "sprites_at_p95": _percentile([r["sprites"] for r in slow], 50)
+    }
+
+
+def _format_summary(summary: dict, violations: list) -> str:
+    lines = ["[PerfGate] 效能預算未通過 (遊戲沒有崩潰，但執行太慢):"]
+    lines += [f"- {v}" for v in violations]
+    other = max(summary["p50_frame_ms"] - summary["avg_update_ms"] - summary["avg_draw_ms"], 0.0)
+    lines.append(
+        f"幀時間 p50/p95/max: {summary['p50_frame_ms']:.1f} / {summary['p95_frame_ms']:.1f} / "
+        f"{summary['max_frame_ms']:.1f} ms ({summary['frames']} 幀)"
+    )
+    lines.append(
+        f"耗時分布 (平均/p95): update {summary['avg_update_ms']:.1f} / {summary['p95_update_ms']:.1f} ms, "
+        f"draw {summary['avg_draw_ms']:.1f} / {summary['p95_draw_ms']:.1f} ms, 其他 (事件/flip) 約 {other:.1f} ms"
+    )
+    lines.append(
+        f"精靈數量: 最多 {summary['max_sprites']}，慢幀發生時約 {summary['sprites_at_p95']}；"
+        f"平均 FPS {summary['avg_fps']:.1f}"
+    )
+    hot = "update" if summary["avg_update_ms"] >= summary["avg_draw_ms"] else "draw"
+    lines.append(f"請在不刪除功能的前提下優化 {hot} 階段的熱點 (例如 O(N^2) 迴圈、每幀重建 Surface、未剔除畫面外物件)。")
+    return "\n".join(lines)
+
+
+def evaluate_performance(metrics: dict, budget: dict = None) -> dict:
+    """
+    依照效能預算判斷遊戲是否過慢。
+    Args:
+        metrics: run_fuzz_test 回傳的 "Metrics" ({"columns": [...], "frames": [[...], ...]})
+        budget: 覆蓋 PERF_BUDGET 的部分欄位
+    Returns:
+        dict: {"state": bool, "Text": str | None, "Summary": dict}
+    """
+    budget = {**PERF_BUDGET, **(budget or {})}
+    if not metrics:
+        print("⚠️ [PerfGate] 沒有效能數據，略過效能檢查")
+        return {"state": True, "Text": None, "Summary": {"frames": 0}}
+
+    summary = summarize_metrics(metrics, budget["warmup_frames"])
+    if summary["frames"] < budget["min_frames"]:
+        print(f"⚠️ [PerfGate] 有效幀數不足 ({summary['frames']})，略過效能檢查")
+        return {"state": True, "Text": None, "Summary": summary}
+
+    violations = []
+    if summary["p95_frame_ms"] > budget["p95_frame_ms"]:
+        violations.append(
+            f"p95 幀時間 {summary['p95_frame_ms']:.1f} ms 超過預算 {budget['p95_frame_ms']} ms "
+            f"(約 {summary['sprites_at_p95']} 個精靈時)"
+        )
+    if budget["min_fps"] and summary["avg_fps"] < budget["min_fps"]:
+        violations.append(f"平均 FPS {summary['avg_fps']:.1f} 低於 {budget['min_fps']}")
+
+    if violations:
+        print(f"❌ [PerfGate] 效能未達標: p95 {summary['p95_frame_ms']:.1f} ms")
+        return {"state": False, "Text": _format_summary(summary, violations), "Summary": summary}
+
+    print(f"✅ [PerfGate] 效能達標: p95 {summary['p95_frame_ms']:.1f} ms, 最多 {summary['max_sprites']} 個精靈")
+    return {"state": True, "Text": None, "Summary": summary}
+
+
+if __name__ == "__main__":
+    # 單獨測試用：python Debug/perf_gate.py dest/perf_metrics.json
+    path = sys.argv[1] if len(sys.argv) > 1 else "dest/perf_metrics.json"
+    with open(path, "r", encoding="utf-8") as f:
+        result = evaluate_performance(json.load(f))
+    print(json.dumps(result["Summary"], ensure_ascii=False, indent=2))
+    if result["Text"]:
+        print(result["Text"])
@@ -0,0 +1,241 @@
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+# ==========================================
+# 取樣式效能分析器 (Sampling Profiler)
+# 定期讀取主執行緒的呼叫堆疊，不需要 settrace，對遊戲本身的負擔很低：
+# POSIX 上用 SIGPROF 計時器 (依 CPU 時間取樣，不受 GIL 影響)，
+# 其他平台 (Windows) 改用背景執行緒讀取 sys._current_frames()。結果可輸出成 collapsed stack (flamegraph.pl / speedscope 皆可讀)、
+# speedscope JSON，以及熱點函式排行。
+# ==========================================
+
+
+class ProfileFinished(BaseException):
+    """已跑完指定幀數。繼承 BaseException，避免被遊戲裡的 except Exception 吃掉"""
+
+
+def _frame_label(frame) -> tuple:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)   # 3.11+ 才有 co_qualname (例如 CameraGroup.custom_draw)
+    return name, code.co_filename, code.co_firstlineno
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.001, thread_id: int = None, max_depth: int = 64):
+        """
+        Args:
+            interval: 取樣間隔 (秒)
+            thread_id: 要取樣的執行緒，預設為建立 profiler 的執行緒 (遊戲主迴圈)
+            max_depth: 每個堆疊最多保留幾層 (從最內層往外算)
+        """
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.max_depth = max_depth
+        self.stacks = Counter()   # (label, label, ...) 由外到內 -> 取樣次數
+        self.samples = 0
+        self.elapsed = 0.0
+        self._running = False
+        self._thread = None
+        self._old_switch_interval = None
+        self._old_handler = None
+        # 只有主執行緒能設定 signal handler；SIGPROF 也只會打斷主執行緒
+        self.use_signal = (hasattr(signal, "setitimer") and self.thread_id == threading.main_thread().ident)
+
+    def _record(self, frame):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            if frame.f_code.co_filename != __file__:   # 略過 profiler 自己的 frame
+                stack.append(_frame_label(frame))
+            frame = frame.f_back
+        if not stack:
+            return
+        stack.reverse()
+        self.stacks[tuple(stack)] += 1
+        self.samples += 1
+
+    def _on_signal(self, signum, frame):
+        self._record(frame)
+
+    def _loop(self):
+        while self._running:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self._record(frame)
+            time.sleep(self.interval)
+
+    def start(self):
+        self._running = True
+        self._start_time = time.perf_counter()
+        if self.use_signal:
+            self._old_handler = signal.signal(signal.SIGPROF, self._on_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+            return
+        # 縮短 GIL 切換間隔，取樣執行緒才能以接近 interval 的頻率拿到 GIL
+        self._old_switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._old_switch_interval, self.interval))
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        self.elapsed = time.perf_counter() - self._start_time
+        if self.use_signal:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self._old_handler or signal.SIG_DFL)
+            return
+        if threading.get_ident() != self._thread.ident:
+            self._thread.join(timeout=1)
+        sys.setswitchinterval(self._old_switch_interval)
+
+    @staticmethod
+    def _format(label) -> str:
+        name, filename, _ = label
+        return f"{name} ({os.path.basename(filename)})"
+
+    def write_collapsed(self, path: str):
+        """Brendan Gregg 的 collapsed 格式：每行 `外層;...;內層 次數`"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(";".join(self._format(label) for label in stack) + f" {count}\n")
+
+    def write_speedscope(self, path: str, name: str = "game"):
+        """speedscope (https://www.speedscope.app) 的 sampled profile 格式"""
+        frame_index = {}
+        frames = []
+        samples = []
+        weights = []
+        interval_ms = self.elapsed * 1000 / self.samples if self.samples else self.interval * 1000
+        for stack, count in self.stacks.items():
+            indices = []
+            for label in stack:
+                if label not in frame_index:
+                    frame_index[label] = len(frames)
+                    frames.append({"name": label[0], "file": label[1], "line": label[2]})
+                indices.append(frame_index[label])
+            samples.append(indices)
+            weights.append(count * interval_ms)
+        document = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights
+            }],
+            "exporter": "Debug/profiler.py"
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(document, f)
+
+    def top_functions(self, n: int = 15) -> list:
+        """
+        熱點函式排行。
+        Returns:
+            list[dict]: {"name", "file", "line", "self", "total"}，self/total 為取樣比例 (0~1)，依 self 排序
+        """
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in self.stacks.items():
+            self_counts[stack[-1]] += count
+            for label in set(stack):   # 遞迴呼叫只算一次
+                total_counts[label] += count
+        total = self.samples or 1
+        ranked = sorted(total_counts, key=lambda label: (self_counts[label], total_counts[label]), reverse=True)
+        return [{
+            "name": label[0],
+            "file": label[1],
+            "line": label[2],
+            "self": self_counts[label] / total,
+            "total": total_counts[label] / total
+        } for label in ranked[:n]]
+
+    def format_report(self, n: int = 15, frames: int = None) -> str:
+        lines = [f"[Profiler] {self.samples} 個取樣 / {self.elapsed:.2f} 秒"
+                 + (f" / {frames} 幀 (平均 {self.elapsed * 1000 / frames:.2f} ms/幀)" if frames else "")]
+        lines.append(f"{'self%':>7} {'total%':>7}  函式")
+        for entry in self.top_functions(n):
+            lines.append(f"{entry['self'] * 100:6.1f}% {entry['total'] * 100:6.1f}%  "
+                         f"{entry['name']} ({os.path.basename(entry['file'])}:{entry['line']})")
+        return "\n".join(lines)
+
+
+def profile_game(game_factory, frames: int = 600, output_prefix: str = "dest/profile", top_n: int = 15,
+                 interval: float = 0.001) -> dict:
+    """
+    在取樣 profiler 下執行遊戲指定的幀數，輸出 collapsed stack / speedscope 檔與熱點報告。
+    以不睡眠的固定步長 Clock 取代 pygame.time.Clock (模擬幀)，讓結果只反映遊戲本身的運算。
+    Args:
+        game_factory: 建立遊戲物件的函式 (例如 AutoStartGame)，物件需有 run()
+        frames: 要模擬的幀數 (以 display.flip / display.update 計數)
+    Returns:
+        dict: {"state": bool, "Text": str, "Top": list[dict], "Files": list[str]}
+    """
+    import pygame
+
+    step_ms = 1000.0 / 60
+    simulated = {"frames": 0, "ms": 0.0}
+
+    class SimulatedClock:
+        def tick(self, framerate=0):
+            simulated["ms"] += step_ms
+            return int(round(step_ms))
+
+        tick_busy_loop = tick
+
+        def get_time(self):
+            return int(round(step_ms))
+
+        get_rawtime = get_time
+
+        def get_fps(self):
+            return 1000.0 / step_ms
+
+    def count_frame(original):
+        def wrapper(*args, **kwargs):
+            result = original(*args, **kwargs)
+            simulated["frames"] += 1
+            if simulated["frames"] >= frames:
+                raise ProfileFinished()
+            return result
+        return wrapper
+
+    pygame.time.Clock = SimulatedClock
+    pygame.time.get_ticks = lambda: int(simulated["ms"])
+    pygame.display.flip = count_frame(pygame.display.flip)
+    pygame.display.update = count_frame(pygame.display.update)
+
+    profiler = SamplingProfiler(interval=interval)
+    error = None
+    profiler.start()
+    try:
+        game = game_factory()
+        game.run()
+    except ProfileFinished:
+        pass
+    except SystemExit:
+        pass   # 遊戲自己結束 (例如 sys.exit())，仍輸出目前為止的結果
+    except Exception as e:
+        error = e
+    finally:
+        profiler.stop()
+        pygame.quit()
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_prefix)), exist_ok=True)
+    files = [f"{output_prefix}.collapsed", f"{output_prefix}.speedscope.json"]
+    profiler.write_collapsed(files[0])
+    profiler.write_speedscope(files[1])
+    report = profiler.format_report(top_n, simulated["frames"])
+    if error is not None:
+        report += f"\n⚠️ 遊戲在第 {simulated['frames']} 幀發生例外: {type(error).__name__}: {error}"
+    return {"state": error is None, "Text": report, "Top": profiler.top_functions(top_n), "Files": files}
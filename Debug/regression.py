@@ -0,0 +1,209 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 單獨執行本檔時也能引用專案根目錄的模組
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Debug.fuzz_tester import run_fuzz_test
+from Debug.perf_gate import summarize_metrics, PERF_BUDGET
+from Debug.sandbox import Sandbox
+from Debug.static_checker import static_check
+
+# ==========================================
+# Games/ 迴歸測試 (Batch Regression Runner)
+# 找出 Games/*.py 的所有參考遊戲，各自在獨立沙盒中以虛擬時鐘 + Fuzzer 平行驗證，
+# 整理出通過/失敗、幀時間、記憶體峰值與崩潰訊息，並和儲存的基準 (baseline) 比較。
+# 修改提示詞或 reference_modules 之後跑一次，就能知道有沒有把原本能跑的遊戲弄壞。
+# ==========================================
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GAMES_DIR = os.path.join(BASE_DIR, "Games")
+BASELINE_PATH = os.path.join(GAMES_DIR, "regression_baseline.json")
+# 遊戲自己的資料檔/素材 (原本由遊戲的 __main__ 區塊產生，經 debug_launcher 匯入時不會執行)：
+# Games/data/<遊戲檔名>/ 的內容會複製到該遊戲的沙盒，例如 Games/data/game6/game_plan.json
+DATA_DIR = os.path.join(GAMES_DIR, "data")
+# 固定測試代理與遊戲的亂數 (FUZZ_SEED)：同一份程式碼每次重跑都走同一條路徑，與基準比較才有意義
+FUZZ_SEED = 0
+
+# 與基準比較時的容忍範圍 (不同次執行的幀時間/記憶體本來就會有些許浮動)
+TOLERANCE = {
+    "p95_ratio": 1.5,      # p95 幀時間超過基準的 1.5 倍...
+    "p95_min_ms": 2.0,     # ...且至少慢 2 ms 才算退步
+    "memory_ratio": 1.3,   # 記憶體峰值超過基準的 1.3 倍...
+    "memory_min_mb": 32    # ...且至少多 32 MB 才算退步
+}
+
+
+def _crash_summary(text: str) -> str:
+    """從 Traceback 取出最後一個遊戲內的位置與例外訊息，例如 `game4.py:748 RuntimeError: ...`"""
+    if not text:
+        return ""
+    lines = [line for line in text.strip().splitlines() if line.strip()]
+    location = ""
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith('File "') and "site-packages" not in stripped and "Debug" not in stripped:
+            filename = stripped.split('"')[1]
+            lineno = stripped.split("line ")[1].split(",")[0] if "line " in stripped else "?"
+            location = f"{os.path.basename(filename)}:{lineno} "
+    return (location + lines[-1].strip())[:160]
+
+
+def validate_one(game_path: str, sim_seconds: int = 30, seed: int = FUZZ_SEED) -> dict:
+    """
+    在獨立沙盒中驗證一個遊戲檔。
+    Returns:
+        dict: {"game", "state", "p50_ms", "p95_ms", "peak_mb", "crash", "trace", "elapsed"}
+    """
+    name = os.path.basename(game_path)
+    start = time.perf_counter()
+    with open(game_path, "r", encoding="utf-8", errors="replace") as f:
+        code = f.read()
+
+    # 參考遊戲都是已知能跑的版本：靜態預檢擋下它們代表預檢誤報 (會讓生成流程白白多一輪 LLM 修復)
+    static_result = static_check(code, filename=game_path)
+    if not static_result["state"]:
+        first = static_result["Errors"][0]
+        location = f"{name}:{first['line']}" if first["line"] else name
+        return {"game": name, "state": False, "p50_ms": None, "p95_ms": None, "peak_mb": None,
+                "crash": f"StaticCheck {location} {first['type']}: {first['message']}"[:160],
+                "trace": static_result["Text"], "elapsed": round(time.perf_counter() - start, 1)}
+
+    data_dir = os.path.join(DATA_DIR, os.path.splitext(name)[0])
+    with Sandbox(code, job_id=os.path.splitext(name)[0], data_dir=data_dir if os.path.isdir(data_dir) else None) as sandbox:
+        result = run_fuzz_test(
+            headless=True,
+            metrics_path=sandbox.path("perf_metrics.json"),
+            sim_seconds=sim_seconds,
+            sandbox=sandbox,
+            seed=seed
+        )
+        # Traceback 中的沙盒模組路徑換回原始檔案 (行號本來就一致)
+        trace = (result["Text"] or "").replace(sandbox.game_path, game_path)
+
+    summary = summarize_metrics(result.get("Metrics") or {}, PERF_BUDGET["warmup_frames"])
+    peak_kb = result.get("PeakMemoryKB")
+    return {
+        "game": name,
+        "state": bool(result["state"]),
+        "p50_ms": round(summary["p50_frame_ms"], 2) if summary["frames"] else None,
+        "p95_ms": round(summary["p95_frame_ms"], 2) if summary["frames"] else None,
+        "peak_mb": round(peak_kb / 1024, 1) if peak_kb else None,
+        "crash": "" if result["state"] else _crash_summary(trace),
+        "trace": None if result["state"] else trace,
+        "elapsed": round(time.perf_counter() - start, 1)
+    }
+
+
+def compare_to_baseline(results: list, baseline: dict) -> list:
+    """回傳退步項目的說明清單 (空清單代表沒有退步)"""
+    regressions = []
+    for row in results:
+        base = baseline.get(row["game"])
+        if base is None:
+            continue
+        if base["state"] and not row["state"]:
+            regressions.append(f"{row['game']}: 原本通過，現在失敗 ({row['crash']})")
+            continue
+        if row["p95_ms"] is not None and base.get("p95_ms") is not None:
+            limit = max(base["p95_ms"] * TOLERANCE["p95_ratio"], base["p95_ms"] + TOLERANCE["p95_min_ms"])
+            if row["p95_ms"] > limit:
+                regressions.append(f"{row['game']}: p95 幀時間 {base['p95_ms']} -> {row['p95_ms']} ms")
+        if row["peak_mb"] is not None and base.get("peak_mb") is not None:
+            limit = max(base["peak_mb"] * TOLERANCE["memory_ratio"], base["peak_mb"] + TOLERANCE["memory_min_mb"])
+            if row["peak_mb"] > limit:
+                regressions.append(f"{row['game']}: 記憶體峰值 {base['peak_mb']} -> {row['peak_mb']} MB")
+    return regressions
+
+
+def format_table(results: list, baseline: dict = None) -> str:
+    baseline = baseline or {}
+
+    def cell(value, base_value=None):
+        text = "-" if value is None else f"{value}"
+        if base_value is not None and value is not None and base_value != value:
+            text += f" ({base_value})"
+        return text
+
+    header = f"{'Game':<12} {'Result':<7} {'p50 ms':>12} {'p95 ms':>14} {'Peak MB':>14} {'Time':>6}  Crash"
+    lines = [header, "-" * len(header)]
+    for row in results:
+        base = baseline.get(row["game"], {})
+        status = "PASS" if row["state"] else "FAIL"
+        if base and base.get("state") != row["state"]:
+            status += "*"
+        lines.append(
+            f"{row['game']:<12} {status:<7} {cell(row['p50_ms'], base.get('p50_ms')):>12} "
+            f"{cell(row['p95_ms'], base.get('p95_ms')):>14} {cell(row['peak_mb'], base.get('peak_mb')):>14} "
+            f"{row['elapsed']:>5}s  {row['crash']}"
+        )
+    if baseline:
+        lines.append("括號內為基準值，* 代表通過/失敗狀態與基準不同")
+    return "\n".join(lines)
+
+
+def run_regression(pattern: str = "*.py", workers: int = None, sim_seconds: int = 30,
+                   baseline_path: str = BASELINE_PATH, update_baseline: bool = False) -> dict:
+    """
+    平行驗證 Games/ 內所有遊戲並與基準比較。
+    Returns:
+        dict: {"state": bool (沒有退步), "Text": str (結果表格), "Results": list[dict], "Regressions": list[str]}
+    """
+    game_paths = sorted(glob.glob(os.path.join(GAMES_DIR, pattern)))
+    if not game_paths:
+        return {"state": False, "Text": f"找不到任何遊戲: {os.path.join(GAMES_DIR, pattern)}", "Results": [],
+                "Regressions": []}
+
+    workers = workers or min(len(game_paths), os.cpu_count() or 1)
+    print(f"🧪 [Regression] 以 {workers} 個工作平行驗證 {len(game_paths)} 個遊戲 (模擬 {sim_seconds} 秒)...")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda path: validate_one(path, sim_seconds), game_paths))
+
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = {row["game"]: row for row in json.load(f)["results"]}
+
+    regressions = compare_to_baseline(results, baseline)
+    table = format_table(results, baseline)
+
+    if update_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "sim_seconds": sim_seconds,
+                "seed": FUZZ_SEED,
+                "results": [{k: v for k, v in row.items() if k != "trace"} for row in results]
+            }, f, ensure_ascii=False, indent=2)
+        print(f"💾 [Regression] 已更新基準: {baseline_path}")
+    elif not baseline:
+        print("⚠️ [Regression] 尚無基準，請以 --update-baseline 建立")
+
+    return {"state": not regressions, "Text": table, "Results": results, "Regressions": regressions}
+
+
+if __name__ == "__main__":
+    # 用法：python Debug/regression.py [--games "game*.py"] [--workers 4] [--sim-seconds 30] [--update-baseline]
+    parser = argparse.ArgumentParser(description="Games/ 迴歸測試")
+    parser.add_argument("--games", default="*.py", help="Games/ 內要測試的檔名樣式")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--sim-seconds", type=int, default=30)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--json", default=None, help="另存完整結果 (含崩潰 Traceback) 的 JSON 路徑")
+    args = parser.parse_args()
+
+    report = run_regression(args.games, args.workers, args.sim_seconds, update_baseline=args.update_baseline)
+    print()
+    print(report["Text"])
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if report["Regressions"]:
+        print("\n❌ [Regression] 發現退步:")
+        for item in report["Regressions"]:
+            print(f"- {item}")
+        sys.exit(1)
+    print("\n✅ [Regression] 沒有發現退步")
@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import uuid
+
+# ==========================================
+# 每個驗證工作的獨立沙盒 (Per-job Sandbox)
+# 每個工作有自己的暫存資料夾、模組名稱與測試產物，並限制子行程的 CPU 時間與記憶體，
+# 多個遊戲可以同時驗證而不會互相覆蓋 dest/generated_app.py 或效能/洩漏報告。
+# ==========================================
+
+# 預設的子行程資源上限 (只在支援 resource.prlimit 的平台 (Linux) 生效)
+DEFAULT_LIMITS = {
+    "cpu_seconds": 300,   # 單一子行程最多使用的 CPU 秒數 (長時間洩漏模擬也在範圍內)
+    "memory_mb": 2048     # 位址空間上限，避免失控的遊戲拖垮整台機器
+}
+
+# 遊戲常以相對路徑讀取素材 (例如 "assets/player.png")，沙盒內以連結指向專案根目錄的同名資料夾
+SHARED_DIRS = ("assets", "Graphic")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Sandbox:
+    def __init__(self, code: str = None, job_id: str = None, limits: dict = None, base_dir: str = None,
+                 keep: bool = False, data_dir: str = None):
+        """
+        Args:
+            code: 遊戲原始碼，提供時會直接寫入沙盒
+            data_dir: 遊戲以相對路徑讀取的資料夾 (資料檔、素材)，內容會複製到沙盒根目錄
+            job_id: 工作代號 (預設隨機產生)，同時決定模組名稱 game_<job_id>
+            limits: 覆蓋 DEFAULT_LIMITS 的部分欄位，欄位值為 None 代表不限制該項
+            base_dir: 沙盒建立的位置 (預設為系統暫存資料夾)
+            keep: 結束時是否保留沙盒資料夾 (除錯用)
+        """
+        self.job_id = job_id or uuid.uuid4().hex[:8]
+        self.module_name = f"game_{self.job_id}"
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.keep = keep
+        if base_dir:
+            os.makedirs(base_dir, exist_ok=True)
+        self.root = tempfile.mkdtemp(prefix=f"job_{self.job_id}_", dir=base_dir)
+        self.game_path = os.path.join(self.root, f"{self.module_name}.py")
+        if data_dir:
+            # 複製而非連結：遊戲可能改寫自己的資料檔，不能影響原始檔案或其他工作
+            shutil.copytree(data_dir, self.root, dirs_exist_ok=True)
+        self._link_shared_dirs()
+        if code is not None:
+            self.write(code)
+
+    def _link_shared_dirs(self):
+        for name in SHARED_DIRS:
+            source = os.path.join(PROJECT_ROOT, name)
+            if not os.path.isdir(source):
+                continue
+            target = os.path.join(self.root, name)
+            if os.path.isdir(target):
+                # data_dir 已經帶了同名資料夾：只補上其中沒有的項目
+                entries = [entry for entry in os.listdir(source) if not os.path.exists(os.path.join(target, entry))]
+            else:
+                entries = [None]
+            for entry in entries:
+                entry_source = source if entry is None else os.path.join(source, entry)
+                entry_target = target if entry is None else os.path.join(target, entry)
+                try:
+                    os.symlink(entry_source, entry_target, target_is_directory=os.path.isdir(entry_source))
+                except OSError:
+                    # Windows 未開啟開發者模式時無法建立 symlink，改為複製
+                    if os.path.isdir(entry_source):
+                        shutil.copytree(entry_source, entry_target, dirs_exist_ok=True)
+                    else:
+                        shutil.copy(entry_source, entry_target)
+
+    def write(self, code: str) -> str:
+        """把 (修復後的) 遊戲原始碼寫入沙盒，回傳檔案路徑"""
+        with open(self.game_path, "w", encoding="utf-8") as f:
+            f.write(code)
+        return self.game_path
+
+    def path(self, name: str) -> str:
+        """沙盒內的檔案路徑 (效能數據、洩漏報告、Corpus...)"""
+        return os.path.join(self.root, name)
+
+    def env(self) -> dict:
+        """debug_launcher 讀取的環境變數：從哪個資料夾匯入哪個模組"""
+        return {"GAME_DIR": self.root, "GAME_MODULE": self.module_name}
+
+    def cleanup(self):
+        if not self.keep:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False
+
+    def __repr__(self):
+        return f"Sandbox({self.job_id!r}, root={self.root!r})"
@@ -0,0 +1,338 @@
+import ast
+import builtins
+import sys
+import time
+
+# ==========================================
+# 靜態預檢 (Static Pre-flight Check)
+# 在啟動任何遊戲子行程之前，先在同一個行程內用 compile() + AST 找出明顯錯誤。
+# 只回報「確定」的問題 (寧可漏報也不誤報)，避免浪費一次 LLM 修復。
+# ==========================================
+
+MAX_REPORTED_ERRORS = 20
+
+MODULE_NAMES = {"__name__", "__file__", "__doc__", "__builtins__", "__spec__",
+                "__loader__", "__package__", "__annotations__", "__path__"}
+KNOWN_NAMES = set(dir(builtins)) | MODULE_NAMES
+# object / type 本身就有的屬性 (self.__class__、cls.__name__、cls.mro() 等)，不可回報為未定義
+OBJECT_ATTRS = set(dir(object)) | set(dir(type)) | {"__dict__", "__module__", "__weakref__", "__annotations__"}
+
+COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+
+class _Scope:
+    def __init__(self, node, parent, kind):
+        self.node = node
+        self.parent = parent
+        self.kind = kind            # module / function / class / comprehension
+        self.bound = set()
+        self.global_names = set()
+        self.loads = []             # (name, lineno)
+        self.star_import = False
+
+    def module(self):
+        scope = self
+        while scope.parent is not None:
+            scope = scope.parent
+        return scope
+
+    def bind(self, name):
+        if name in self.global_names:
+            self.module().bound.add(name)
+        else:
+            self.bound.add(name)
+
+
+def _bind_arguments(args: ast.arguments, scope: _Scope) -> None:
+    for arg in args.posonlyargs + args.args + args.kwonlyargs:
+        scope.bind(arg.arg)
+    if args.vararg:
+        scope.bind(args.vararg.arg)
+    if args.kwarg:
+        scope.bind(args.kwarg.arg)
+
+
+def _visit(node, scope: _Scope, scopes: list) -> None:
+    """走訪 AST 並建立作用域樹，紀錄每個作用域綁定與讀取的名稱"""
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+        if not isinstance(node, ast.Lambda):
+            scope.bind(node.name)
+            for decorator in node.decorator_list:
+                _visit(decorator, scope, scopes)
+            if node.returns:
+                _visit(node.returns, scope, scopes)
+        args = node.args
+        for default in args.defaults + [d for d in args.kw_defaults if d is not None]:
+            _visit(default, scope, scopes)
+        for arg in args.posonlyargs + args.args + args.kwonlyargs + [args.vararg, args.kwarg]:
+            if arg is not None and arg.annotation is not None:
+                _visit(arg.annotation, scope, scopes)
+        child = _Scope(node, scope, "function")
+        scopes.append(child)
+        _bind_arguments(args, child)
+        body = [node.body] if isinstance(node, ast.Lambda) else node.body
+        for stmt in body:
+            _visit(stmt, child, scopes)
+        return
+
+    if isinstance(node, ast.ClassDef):
+        scope.bind(node.name)
+        for expr in node.decorator_list + node.bases + [k.value for k in node.keywords]:
+            _visit(expr, scope, scopes)
+        child = _Scope(node, scope, "class")
+        scopes.append(child)
+        for stmt in node.body:
+            _visit(stmt, child, scopes)
+        return
+
+    if isinstance(node, COMPREHENSIONS):
+        child = _Scope(node, scope, "comprehension")
+        scopes.append(child)
+        for index, generator in enumerate(node.generators):
+            # 第一個 iterable 在外層作用域求值
+            _visit(generator.iter, scope if index == 0 else child, scopes)
+            _visit(generator.target, child, scopes)
+            for condition in generator.ifs:
+                _visit(condition, child, scopes)
+        elements = [node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]
+        for element in elements:
+            _visit(element, child, scopes)
+        return
+
+    if isinstance(node, ast.Name):
+        if isinstance(node.ctx, ast.Load):
+            scope.loads.append((node.id, node.lineno))
+        else:
+            scope.bind(node.id)
+        return
+
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        for alias in node.names:
+            if alias.name == "*":
+                scope.module().star_import = True
+            else:
+                scope.bind(alias.asname or alias.name.split(".")[0])
+        return
+
+    if isinstance(node, ast.Global):
+        scope.global_names.update(node.names)
+        scope.module().bound.update(node.names)
+        return
+
+    if isinstance(node, ast.NamedExpr):
+        # 海象運算子綁定在最近的「非推導式」作用域
+        target_scope = scope
+        while target_scope.kind == "comprehension":
+            target_scope = target_scope.parent
+        target_scope.bind(node.target.id)
+        _visit(node.value, scope, scopes)
+        return
+
+    if isinstance(node, ast.ExceptHandler) and node.name:
+        scope.bind(node.name)
+    elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+        scope.bind(node.name)
+    elif isinstance(node, ast.MatchMapping) and node.rest:
+        scope.bind(node.rest)
+
+    for child in ast.iter_child_nodes(node):
+        _visit(child, scope, scopes)
+
+
+def _resolves(name: str, scope: _Scope) -> bool:
+    current = scope
+    while current is not None:
+        # 類別作用域只對自己的 class body 可見，對內部方法不可見
+        if (current is scope or current.kind != "class") and name in current.bound:
+            return True
+        current = current.parent
+    return name in KNOWN_NAMES
+
+
+def _check_names(tree: ast.Module) -> list:
+    module = _Scope(tree, None, "module")
+    scopes = [module]
+    for stmt in tree.body:
+        _visit(stmt, module, scopes)
+    if module.star_import:
+        return []
+
+    errors = []
+    reported = set()
+    for scope in scopes:
+        for name, lineno in scope.loads:
+            if (name, lineno) not in reported and not _resolves(name, scope):
+                reported.add((name, lineno))
+                errors.append({"type": "NameError", "line": lineno,
+                               "message": f"name '{name}' is not defined"})
+    return errors
+
+
+def _class_body_names(cls: ast.ClassDef) -> set:
+    names = set()
+    for stmt in cls.body:
+        if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(stmt.name)
+        elif isinstance(stmt, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+            targets = stmt.targets if isinstance(stmt, ast.Assign) else [stmt.target]
+            for target in targets:
+                names.update(n.id for n in ast.walk(target) if isinstance(n, ast.Name))
+    return names
+
+
+def _stored_attributes(tree: ast.Module) -> set:
+    """模組內任何地方被賦值的屬性名稱 (obj.attr = ...、setattr(obj, 'attr', ...))"""
+    stored = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and not isinstance(node.ctx, ast.Load):
+            stored.add(node.attr)
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "setattr"
+              and len(node.args) >= 2 and isinstance(node.args[1], ast.Constant)
+              and isinstance(node.args[1].value, str)):
+            stored.add(node.args[1].value)
+    return stored
+
+
+def _check_attributes(tree: ast.Module) -> list:
+    """
+    只檢查「整個繼承家族都定義在本檔案內」的類別 (不繼承 pygame.sprite.Sprite 等外部類別)，
+    找出 self.xxx 讀取了從未被定義過的屬性。
+    """
+    classes = {node.name: node for node in ast.walk(tree) if isinstance(node, ast.ClassDef)}
+
+    def local_bases(cls):
+        bases = []
+        for base in cls.bases:
+            if isinstance(base, ast.Name) and base.id in classes:
+                bases.append(base.id)
+            elif not (isinstance(base, ast.Name) and base.id == "object"):
+                return None     # 有外部基底類別，無法得知其屬性
+        return bases
+
+    # 以繼承關係把類別分成家族 (祖先 + 子孫)，任何成員有外部基底就整個家族跳過
+    family = {name: {name} for name in classes}
+    closed = {name: not cls.keywords for name, cls in classes.items()}
+    for name, cls in classes.items():
+        bases = local_bases(cls)
+        if bases is None:
+            closed[name] = False
+            continue
+        for base in bases:
+            merged = family[name] | family[base]
+            for member in merged:
+                family[member] = merged
+
+    stored = _stored_attributes(tree)
+    errors = []
+    for name, cls in classes.items():
+        members = family[name]
+        if not all(closed[m] for m in members):
+            continue
+        defined = set(OBJECT_ATTRS) | stored
+        for member in members:
+            defined |= _class_body_names(classes[member])
+        if "__getattr__" in defined or "__getattribute__" in defined - OBJECT_ATTRS or "__slots__" in defined:
+            continue
+
+        for method in cls.body:
+            if not isinstance(method, (ast.FunctionDef, ast.AsyncFunctionDef)) or not method.args.args:
+                continue
+            if any(isinstance(d, ast.Name) and d.id == "staticmethod" for d in method.decorator_list):
+                continue
+            self_name = method.args.args[0].arg
+            for node in ast.walk(method):
+                if (isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Load)
+                        and isinstance(node.value, ast.Name) and node.value.id == self_name
+                        and node.attr not in defined
+                        and not (node.attr.startswith("__") and node.attr.endswith("__"))):   # 直譯器隱含提供的 dunder 屬性
+                    errors.append({"type": "AttributeError", "line": node.lineno,
+                                   "message": f"'{name}' object has no attribute '{node.attr}'"})
+    return errors
+
+
+def _check_hooks(tree: ast.Module) -> list:
+    """自動化測試接口：Game 類別、run() 方法、self.game_active 旗標"""
+    classes = {node.name: node for node in tree.body if isinstance(node, ast.ClassDef)}
+    if "Game" not in classes:
+        return [{"type": "MissingHook", "line": None, "message": "找不到 `class Game` (debug_launcher 需要匯入它)"}]
+
+    # 沿著本檔案內的基底類別收集 Game 的方法與屬性
+    chain, pending = [], ["Game"]
+    while pending:
+        cls = classes.get(pending.pop())
+        if cls is None or cls in chain:
+            continue
+        chain.append(cls)
+        pending.extend(b.id for b in cls.bases if isinstance(b, ast.Name))
+
+    methods = {n.name for cls in chain for n in cls.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))}
+    attributes = {node.attr for cls in chain for node in ast.walk(cls)
+                  if isinstance(node, ast.Attribute) and not isinstance(node.ctx, ast.Load)}
+    attributes |= {name for cls in chain for name in _class_body_names(cls)}
+
+    errors = []
+    if "run" not in methods:
+        errors.append({"type": "MissingHook", "line": classes["Game"].lineno,
+                       "message": "`Game` 缺少 `run()` 方法"})
+    if "game_active" not in attributes:
+        # debug_launcher 會自己設定 game.game_active = True，缺少只影響手動遊玩時的選單，不阻擋測試
+        errors.append({"type": "MissingHook", "line": classes["Game"].lineno, "warning": True,
+                       "message": "`Game` 缺少 `self.game_active` 自動化測試旗標 (建議在 __init__ 中預設為 False)"})
+    return errors
+
+
+def _format_errors(errors: list, filename: str, title: str = "問題") -> str:
+    lines = [f"[StaticCheck] 發現 {len(errors)} 個{title} (尚未執行程式):"]
+    for error in errors[:MAX_REPORTED_ERRORS]:
+        location = f"{filename}:{error['line']}" if error["line"] else filename
+        lines.append(f"{location}: {error['type']}: {error['message']}")
+        if error.get("text"):
+            lines.append(f"    {error['text']}")
+    if len(errors) > MAX_REPORTED_ERRORS:
+        lines.append(f"... 其餘 {len(errors) - MAX_REPORTED_ERRORS} 個問題省略")
+    return "\n".join(lines)
+
+
+def static_check(code_content: str, filename: str = "generated_app.py") -> dict:
+    """
+    在同一個行程中對遊戲原始碼做靜態預檢，不啟動任何子行程。
+    Returns:
+        dict: {"state": bool, "Text": str | None, "Errors": list[dict], "Warnings": list[dict], "Elapsed": float (ms)}
+              Errors / Warnings 的每一筆為 {"type", "line", "message"}；Warnings 只回報，不會讓預檢失敗
+    """
+    start = time.perf_counter()
+    errors = []
+    try:
+        tree = compile(code_content, filename, "exec", flags=ast.PyCF_ONLY_AST)
+        compile(tree, filename, "exec")
+    except SyntaxError as e:
+        errors.append({"type": type(e).__name__, "line": e.lineno, "message": e.msg,
+                       "text": (e.text or "").strip()})
+    except ValueError as e:
+        errors.append({"type": "ValueError", "line": None, "message": str(e)})
+    else:
+        errors = _check_names(tree) + _check_attributes(tree) + _check_hooks(tree)
+        errors.sort(key=lambda e: e["line"] or 0)
+    warnings = [error for error in errors if error.get("warning")]
+    errors = [error for error in errors if not error.get("warning")]
+
+    elapsed = (time.perf_counter() - start) * 1000
+    if errors:
+        print(f"❌ [StaticCheck] 靜態預檢失敗 ({len(errors)} 個問題, {elapsed:.1f} ms)")
+        return {"state": False, "Text": _format_errors(errors, filename), "Errors": errors, "Warnings": warnings,
+                "Elapsed": elapsed}
+
+    print(f"✅ [StaticCheck] 靜態預檢通過 ({elapsed:.1f} ms)")
+    if warnings:
+        print(_format_errors(warnings, filename, "警告"))
+    return {"state": True, "Text": None, "Errors": [], "Warnings": warnings, "Elapsed": elapsed}
+
+
+if __name__ == "__main__":
+    # 單獨測試用：python Debug/static_checker.py <file.py>
+    path = sys.argv[1] if len(sys.argv) > 1 else "dest/generated_app.py"
+    with open(path, "r", encoding="utf-8") as f:
+        result = static_check(f.read(), filename=path)
+    if result["Text"]:
+        print(result["Text"])
+    sys.exit(0 if result["state"] else 1)
@@ -0,0 +1,196 @@
+import os
+import queue
+import re
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    import resource   # 只有 POSIX 平台有，Windows 上不限制資源
+except ImportError:
+    resource = None
+
+# ==========================================
+# 串流式子行程監控 (Streaming Subprocess Supervisor)
+# 逐行讀取 stdout / stderr，一看到 Traceback 或成功標記就立刻結束子行程，
+# 失敗的測試不必再等完整個 timeout。
+# ==========================================
+
+TRACEBACK_MARKER = "Traceback (most recent call last)"
+
+# Traceback 最後一行 (例如 "TypeError: ..."、"pygame.error: ..."、"KeyboardInterrupt")
+EXCEPTION_LINE = re.compile(r"^[A-Za-z_][\w.]*(Error|Exception|Exit|Interrupt|error)\b")
+
+
+def _limit_resources(pid, limits):
+    """
+    子行程啟動後由父行程以 prlimit 設定 CPU 時間與記憶體上限。
+    不使用 Popen(preexec_fn=...)：父行程有其他執行緒 (輸出讀取、平行驗證) 時，fork 後執行 Python 程式碼可能死結。
+    """
+    if resource is None or not limits or not hasattr(resource, "prlimit"):
+        return   # prlimit 只有 Linux 提供，其他平台不限制資源
+    cpu_seconds = limits.get("cpu_seconds")
+    memory_mb = limits.get("memory_mb")
+    try:
+        if cpu_seconds:
+            resource.prlimit(pid, resource.RLIMIT_CPU, (int(cpu_seconds), int(cpu_seconds) + 5))
+        if memory_mb:
+            memory_bytes = int(memory_mb) * 1024 * 1024
+            resource.prlimit(pid, resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    except (OSError, ValueError):
+        pass   # 子行程已經結束，或上限高於目前的 hard limit
+
+
+def _pump(stream, name, lines_queue):
+    """背景執行緒：把子行程輸出逐行放進佇列，串流關閉時送出 None"""
+    try:
+        for line in iter(stream.readline, ""):
+            lines_queue.put((name, line))
+    except (ValueError, OSError):
+        pass
+    finally:
+        lines_queue.put((name, None))
+
+
+def supervise(cmd, cwd=None, env=None, timeout=10.0, success_marker=None,
+              failure_markers=(TRACEBACK_MARKER,), exception_grace=0.05, idle_grace=0.5, limits=None) -> dict:
+    """
+    啟動子行程並即時監控其輸出。
+    Args:
+        cmd: 要執行的指令 (list)
+        timeout: 最長執行秒數，時間到仍未失敗則視為「存活」
+        success_marker: stdout 出現此字串即視為成功並結束子行程 (例如 "[FUZZ] SUCCESS")
+        failure_markers: stdout/stderr 出現這些字串即進入失敗收尾
+        exception_grace: 讀到例外訊息行後，再等待多久收集後續輸出 (例外鏈) 才結束
+        idle_grace: 失敗後若遲遲沒有讀到例外訊息行，輸出靜止多久就結束
+        limits: 子行程資源上限 {"cpu_seconds": int | None, "memory_mb": int | None} (Linux 才有效)
+    Returns:
+        dict: {"state": bool, "Text": str | None, "Reason": "success" | "failure" | "exit" | "timeout",
+               "ReturnCode": int | None, "Stdout": str, "Stderr": str,
+               "Elapsed": float (秒), "DetectedAt": float | None (偵測到成功/失敗的時間點)}
+    """
+    run_env = dict(env if env is not None else os.environ)
+    run_env["PYTHONUNBUFFERED"] = "1"   # 子行程不緩衝輸出，才能逐行即時判斷
+    run_env.setdefault("PYTHONIOENCODING", "utf-8")
+
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        env=run_env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        bufsize=1
+    )
+    _limit_resources(process.pid, limits)
+
+    lines_queue = queue.Queue()
+    readers = [
+        threading.Thread(target=_pump, args=(process.stdout, "stdout", lines_queue), daemon=True),
+        threading.Thread(target=_pump, args=(process.stderr, "stderr", lines_queue), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    output = {"stdout": [], "stderr": []}
+    reason = None
+    detected_at = None
+    grace_deadline = None
+    closed_streams = 0
+    deadline = start + timeout
+
+    try:
+        while True:
+            now = time.perf_counter()
+            if grace_deadline is not None and now >= grace_deadline:
+                reason = "failure"
+                break
+            if now >= deadline:
+                reason = "failure" if grace_deadline is not None else "timeout"
+                break
+
+            wait = min(deadline, grace_deadline or deadline) - now
+            try:
+                name, line = lines_queue.get(timeout=wait)
+            except queue.Empty:
+                continue
+
+            if line is None:
+                closed_streams += 1
+                if closed_streams == len(readers):
+                    reason = "failure" if grace_deadline is not None else "exit"
+                    break
+                continue
+
+            output[name].append(line)
+            now = time.perf_counter()
+
+            if grace_deadline is None:
+                if success_marker and name == "stdout" and success_marker in line:
+                    reason = "success"
+                    detected_at = now - start
+                    break
+                if any(marker in line for marker in failure_markers):
+                    detected_at = now - start
+                    grace_deadline = now + idle_grace
+            else:
+                # 失敗收尾中：讀到例外訊息行就只再等一下下 (可能還有 "During handling..." 例外鏈)
+                grace = exception_grace if EXCEPTION_LINE.match(line) else idle_grace
+                grace_deadline = now + grace
+    finally:
+        if process.poll() is None:
+            try:
+                process.kill()
+            except OSError:
+                pass
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        for reader in readers:
+            reader.join(timeout=1)
+
+    # 收集結束前最後一刻還在佇列中的輸出
+    while True:
+        try:
+            name, line = lines_queue.get_nowait()
+        except queue.Empty:
+            break
+        if line is not None:
+            output[name].append(line)
+
+    stdout = "".join(output["stdout"])
+    stderr = "".join(output["stderr"])
+    if reason == "exit" and process.returncode not in (0, None):
+        reason = "failure"
+        detected_at = time.perf_counter() - start
+
+    text = None
+    if reason == "failure":
+        text = stderr if stderr.strip() else stdout[-1000:]
+        if process.returncode is not None and process.returncode < 0 and not text.strip():
+            # 被訊號終止且沒有任何輸出 (例如超過 RLIMIT_CPU 收到 SIGXCPU)
+            text = f"子行程被訊號 {-process.returncode} 終止 (可能超過 CPU 時間或記憶體上限: {limits})"
+
+    return {
+        "state": reason in ("success", "exit", "timeout"),
+        "Text": text,
+        "Reason": reason,
+        "ReturnCode": process.returncode,
+        "Stdout": stdout,
+        "Stderr": stderr,
+        "Elapsed": time.perf_counter() - start,
+        "DetectedAt": detected_at
+    }
+
+
+if __name__ == "__main__":
+    # 單獨測試用：python Debug/supervisor.py <script.py>
+    result = supervise([sys.executable] + sys.argv[1:], timeout=10)
+    print(f"Reason: {result['Reason']} | Elapsed: {result['Elapsed']:.3f}s | DetectedAt: {result['DetectedAt']}")
+    if result["Text"]:
+        print(result["Text"])
@@ -0,0 +1,246 @@
+import json
+import os
+import re
+import reprlib
+import sys
+import types
+
+# ==========================================
+# 結構化 Traceback 解析 (Structured Failure Record)
+# error_solving 收到的是原始 stderr (fuzzer 有時是 stdout 最後 1000 字)，夾雜 pygame 橫幅與其他雜訊。
+# 這裡把輸出整理成精簡的失敗紀錄：例外類型、訊息、只屬於遊戲模組的堆疊、每一層附近的原始碼，
+# 以及 (子行程有掛上 excepthook 時) 當下的區域變數值。只把這份紀錄交給 LLM，提示詞更短、更容易一次修好。
+# ==========================================
+
+TRACEBACK_MARKER = "Traceback (most recent call last):"
+LOCALS_MARKER = "[CRASH] LOCALS "   # excepthook 在 Traceback 之前印到 stderr 的單行 JSON
+
+MAX_FRAMES = 6           # 只保留最內層的幾個遊戲 frame
+INNER_WINDOW = 3         # 最內層 frame 前後各顯示幾行原始碼
+OUTER_WINDOW = 1         # 其他 frame 前後各顯示幾行
+MAX_LOCALS = 12          # 每個 frame 最多幾個區域變數
+MAX_REPR = 80            # 每個變數值最多幾個字元
+
+_FRAME_LINE = re.compile(r'^\s*File "([^"]+)", line (\d+)(?:, in (.+))?$')
+_EXCEPTION_LINE = re.compile(r"^([A-Za-z_][\w.]*(?:Error|Exception|Exit|Interrupt|error|Warning))(?::\s?(.*))?$")
+_SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.MethodType, types.BuiltinFunctionType)
+_CHAIN_LINES = ("During handling of the above exception", "The above exception was the direct cause")
+
+
+# ------------------------------------------
+# 子行程端：excepthook 記錄區域變數
+# ------------------------------------------
+
+def _safe_repr(value) -> str:
+    limiter = reprlib.Repr()
+    limiter.maxstring = MAX_REPR
+    limiter.maxother = MAX_REPR
+    limiter.maxlist = limiter.maxtuple = limiter.maxdict = limiter.maxset = 6
+    try:
+        text = limiter.repr(value)
+    except Exception:
+        text = f"<{type(value).__name__} (repr 失敗)>"
+    return text[:MAX_REPR]
+
+
+def _frame_locals(frame) -> dict:
+    """挑出有意義的區域變數：略過模組、函式、類別，self 則展開成前幾個屬性"""
+    values = {}
+    for name, value in frame.f_locals.items():
+        if len(values) >= MAX_LOCALS:
+            break
+        if name.startswith("__") or isinstance(value, _SKIPPED_TYPES):
+            continue
+        if name == "self" and hasattr(value, "__dict__"):
+            values["self"] = f"<{type(value).__name__}>"
+            for attr, attr_value in list(vars(value).items())[:MAX_LOCALS // 2]:
+                if not attr.startswith("_") and not isinstance(attr_value, _SKIPPED_TYPES):
+                    values[f"self.{attr}"] = _safe_repr(attr_value)
+            continue
+        values[name] = _safe_repr(value)
+    return values
+
+
+def install_locals_hook(target_files=None):
+    """
+    在子行程中掛上 sys.excepthook：未捕捉的例外發生時，先把遊戲模組各 frame 的區域變數以單行 JSON 印到 stderr，
+    再交給原本的 excepthook 印出 Traceback (supervisor 看到 Traceback 才開始收尾，所以這行一定會被收集到)。
+    Args:
+        target_files: 要記錄的檔名 (basename) 集合，預設為啟動的腳本
+    """
+    targets = set(target_files or [os.path.basename(sys.argv[0] or "")])
+    previous_hook = sys.excepthook
+
+    def hook(exc_type, exc, tb):
+        try:
+            frames = []
+            while tb is not None:
+                frame = tb.tb_frame
+                if os.path.basename(frame.f_code.co_filename) in targets and frame.f_code.co_name != "<module>":
+                    frames.append({
+                        "file": os.path.basename(frame.f_code.co_filename),
+                        "line": tb.tb_lineno,
+                        "function": frame.f_code.co_name,
+                        "locals": _frame_locals(frame)
+                    })
+                tb = tb.tb_next
+            if frames:
+                sys.stderr.write(LOCALS_MARKER + json.dumps({"frames": frames[-MAX_FRAMES:]}, ensure_ascii=False) + "\n")
+                sys.stderr.flush()
+        except Exception:
+            pass   # 記錄失敗不能影響原本的錯誤輸出
+        previous_hook(exc_type, exc, tb)
+
+    sys.excepthook = hook
+
+
+# ------------------------------------------
+# 主行程端：解析輸出並產生精簡紀錄
+# ------------------------------------------
+
+def _last_traceback(lines: list) -> tuple:
+    """
+    取出最後一個 (例外鏈中最終的) Traceback 區塊，以及它的前因例外 (若有)。
+    Returns:
+        tuple: (區塊內的行 list, 前因例外字串 | None)
+    """
+    starts = [i for i, line in enumerate(lines) if TRACEBACK_MARKER in line]
+    if not starts:
+        return [], None
+    block = lines[starts[-1] + 1:]
+
+    cause = None
+    if len(starts) > 1 and any(marker in line for line in lines[starts[-2]:starts[-1]] for marker in _CHAIN_LINES):
+        for line in reversed(lines[starts[-2]:starts[-1]]):
+            if _EXCEPTION_LINE.match(line.strip()):
+                cause = line.strip()
+                break
+    return block, cause
+
+
+def _parse_block(block: list) -> tuple:
+    """Returns: (frames list[dict], 例外類型, 訊息)"""
+    frames = []
+    exc_type, message = None, ""
+    index = 0
+    while index < len(block):
+        line = block[index]
+        match = _FRAME_LINE.match(line)
+        if match:
+            code = ""
+            if index + 1 < len(block) and block[index + 1].startswith("    ") and not _FRAME_LINE.match(block[index + 1]):
+                code = block[index + 1].strip()
+                index += 1
+            frames.append({"file": match.group(1), "line": int(match.group(2)),
+                           "function": match.group(3) or "<module>", "code": code})
+        elif not line.startswith((" ", "\t")) and exc_type is None:
+            exc_match = _EXCEPTION_LINE.match(line.strip())
+            if exc_match:
+                exc_type, message = exc_match.group(1), (exc_match.group(2) or "").strip()
+                # 多行訊息接續到空白行為止 (最多 5 行，略過 fuzzer / pygame 的輸出)
+                extra = 0
+                while index + 1 < len(block) and block[index + 1].strip() and extra < 5 \
+                        and not block[index + 1].startswith(("[", "pygame ", "Hello from")):
+                    index += 1
+                    extra += 1
+                    message += "\n" + block[index].rstrip()
+        index += 1
+    return frames, exc_type, message
+
+
+def _parse_locals(lines: list) -> list:
+    for line in reversed(lines):
+        if line.startswith(LOCALS_MARKER):
+            try:
+                return json.loads(line[len(LOCALS_MARKER):])["frames"]
+            except (ValueError, KeyError, TypeError):
+                return []
+    return []
+
+
+def parse_failure(text: str, source: str = None, module_file: str = "generated_app.py"):
+    """
+    把子行程的錯誤輸出整理成結構化的失敗紀錄。
+    Args:
+        text: 原始 stderr / stdout 片段
+        source: 目前的遊戲原始碼 (用來擷取各 frame 附近的程式碼；行號與 Traceback 一致)
+        module_file: 遊戲模組的檔名或路徑，只保留這個檔案中的 frame
+    Returns:
+        dict | None: {"type", "message", "cause", "origin", "frames": [{"file", "line", "function", "code",
+                      "window": [(行號, 原始碼)], "locals": dict}]}；輸出中沒有 Traceback 時回傳 None
+    """
+    if not text:
+        return None
+    lines = text.replace("\r\n", "\n").splitlines()
+    block, cause = _last_traceback(lines)
+    frames, exc_type, message = _parse_block(block)
+    if exc_type is None:
+        return None
+
+    module_name = os.path.basename(module_file)
+    game_frames = [frame for frame in frames if os.path.basename(frame["file"]) == module_name]
+
+    # 例外若是在 pygame / 標準函式庫裡拋出，記下拋出位置，但堆疊仍只列遊戲本身的 frame
+    origin = None
+    if frames and os.path.basename(frames[-1]["file"]) != module_name:
+        inner = frames[-1]
+        origin = f"{os.path.basename(inner['file'])}:{inner['line']} in {inner['function']}"
+
+    source_lines = source.splitlines() if source else []
+    recorded_locals = {(frame["file"], frame["line"], frame["function"]): frame["locals"]
+                       for frame in _parse_locals(lines)}
+
+    game_frames = game_frames[-MAX_FRAMES:]
+    for depth, frame in enumerate(reversed(game_frames)):
+        radius = INNER_WINDOW if depth == 0 else OUTER_WINDOW
+        start = max(frame["line"] - radius, 1)
+        end = min(frame["line"] + radius, len(source_lines))
+        frame["window"] = [(lineno, source_lines[lineno - 1]) for lineno in range(start, end + 1)]
+        frame["file"] = module_name
+        frame["locals"] = recorded_locals.get((module_name, frame["line"], frame["function"]), {})
+
+    return {"type": exc_type, "message": message, "cause": cause, "origin": origin, "frames": game_frames}
+
+
+def format_failure(record: dict) -> str:
+    """把失敗紀錄排成給 LLM 看的精簡文字"""
+    lines = [f"{record['type']}: {record['message']}".rstrip(": ")]
+    if record["cause"]:
+        lines.append(f"(處理前一個例外時發生: {record['cause']})")
+    if record["origin"]:
+        lines.append(f"(例外於 {record['origin']} 拋出)")
+    if not record["frames"]:
+        lines.append("(堆疊中沒有遊戲模組的 frame)")
+        return "\n".join(lines)
+
+    lines.append("遊戲模組內的呼叫堆疊 (由外到內，> 為執行中的那一行):")
+    for index, frame in enumerate(record["frames"], start=1):
+        lines.append(f"#{index} {frame['file']}:{frame['line']} in {frame['function']}")
+        if frame["window"]:
+            for lineno, code in frame["window"]:
+                marker = ">" if lineno == frame["line"] else " "
+                lines.append(f"  {marker} {lineno:>4} | {code}")
+        elif frame["code"]:
+            lines.append(f"  > {frame['line']:>4} | {frame['code']}")
+        if frame["locals"]:
+            lines.append("    區域變數: " + ", ".join(f"{name}={value}" for name, value in frame["locals"].items()))
+    return "\n".join(lines)
+
+
+def compact_error(text: str, source: str = None, module_file: str = "generated_app.py") -> str:
+    """
+    error_solving 用：有 Traceback 就回傳精簡紀錄，否則 (靜態預檢、效能/洩漏報告) 原樣回傳。
+    """
+    record = parse_failure(text, source, module_file)
+    return format_failure(record) if record else text
+
+
+if __name__ == "__main__":
+    # 單獨測試用：python Debug/traceback_parser.py <stderr.txt> [game.py]
+    with open(sys.argv[1], "r", encoding="utf-8", errors="replace") as f:
+        raw = f.read()
+    game_source = None
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], "r", encoding="utf-8", errors="replace") as f:
+            game_source = f.read()
+    print(compact_error(raw, game_source, sys.argv[2] if len(sys.argv) > 2 else "generated_app.py"))
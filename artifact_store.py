@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+# ==========================================
+# 版本化產物倉庫 (Content-addressed Artifact Store)
+# code_to_py 每個階段、每次修復都覆蓋 dest/generated_app.py，企劃書也只留最後一份。
+# 這裡把每個階段的產出 (企劃書、架構師程式碼、偵錯後程式碼、每一次修復) 依內容雜湊存成 blob，
+# 相同內容只存一份；每次生成 (run) 另有一份 manifest 記錄版本順序、耗時、分數與附加資訊，
+# 可以退回分數最高的版本，或從任一階段接續執行而不必重新生成前面的階段。
+# 每個版本另記錄其輸入的雜湊 (checkpoint)：同一個 run 重跑時，輸入相同且已完成的階段直接沿用。
+# ==========================================
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARTIFACT_DIR = os.path.join(BASE_DIR, "dest", "artifacts")
+
+# 生成流程的階段 (依執行順序)；validate_game 的每次修復記錄為 "repair"
+PIPELINE_STAGES = ("prompt", "design_document", "designer_code", "debugged_code", "validation")
+CODE_STAGES = ("designer_code", "debugged_code", "repair")
+
+
+def input_key(*parts: str) -> str:
+    """階段輸入的雜湊 (checkpoint 的鍵)；輸入不同時不沿用舊的產出"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def should_reuse(stage: str, redo_from: str = None) -> bool:
+    """redo_from 指定的階段 (含) 之後一律重新執行，其餘階段可沿用 checkpoint"""
+    return not redo_from or PIPELINE_STAGES.index(stage) < PIPELINE_STAGES.index(redo_from)
+
+
+class ArtifactStore:
+    def __init__(self, root: str = None):
+        self.root = root or ARTIFACT_DIR
+        self._lock = threading.Lock()
+
+    # ------------------------------------------
+    # Blob：以 sha256 為名稱，相同內容只存一份
+    # ------------------------------------------
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def put_blob(self, content: str) -> str:
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        return digest
+
+    def get_blob(self, digest: str) -> str:
+        with open(self._blob_path(digest), "r", encoding="utf-8") as f:
+            return f.read()
+
+    # ------------------------------------------
+    # Run manifest：一次生成的所有版本
+    # ------------------------------------------
+    def _manifest_path(self, run_id: str) -> str:
+        return os.path.join(self.root, "runs", f"{run_id}.json")
+
+    def _read_manifest(self, run_id: str) -> dict:
+        path = self._manifest_path(run_id)
+        if not os.path.exists(path):
+            raise KeyError(f"找不到 run: {run_id}")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest: dict):
+        path = self._manifest_path(manifest["run_id"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+
+    def new_run(self, prompt: str = None, run_id: str = None) -> str:
+        """建立一次新的生成紀錄 (run_id 已存在時沿用原本的 manifest)"""
+        run_id = run_id or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        with self._lock:
+            if not os.path.exists(self._manifest_path(run_id)):
+                self._write_manifest({"run_id": run_id, "created": time.time(), "prompt": prompt, "versions": []})
+        return run_id
+
+    def has_run(self, run_id: str) -> bool:
+        return os.path.exists(self._manifest_path(run_id))
+
+    def record(self, run_id: str, stage: str, content: str, meta: dict = None, elapsed: float = None,
+               score: float = None, inputs: tuple = None) -> dict:
+        """
+        儲存一個階段的產出。
+        Args:
+            stage: 階段名稱 (PIPELINE_STAGES 或 "repair" 等)
+            meta: 附加資訊 (例如修復的觸發階段、第幾輪)
+            elapsed: 產生這份產出花費的秒數 (LLM 呼叫時間)
+            score: 測試分數，越高越好 (之後可用 set_score 補上)
+            inputs: 產生這份產出的輸入 (字串 tuple)，記錄成 checkpoint 供 find 查詢
+        Returns:
+            dict: 版本紀錄 {"id", "stage", "blob", "size", "created", "elapsed", "score", "meta"}
+        """
+        digest = self.put_blob(content)
+        meta = dict(meta or {})
+        if inputs is not None:
+            meta["input"] = input_key(*inputs)
+        with self._lock:
+            manifest = self._read_manifest(run_id)
+            version = {
+                "id": len(manifest["versions"]),
+                "stage": stage,
+                "blob": digest,
+                "size": len(content),
+                "created": time.time(),
+                "elapsed": round(elapsed, 3) if elapsed is not None else None,
+                "score": score,
+                "meta": meta
+            }
+            manifest["versions"].append(version)
+            self._write_manifest(manifest)
+        return version
+
+    def set_score(self, run_id: str, version_id: int, score: float, **meta):
+        """補上某個版本的測試分數 (與額外的 meta 欄位)"""
+        with self._lock:
+            manifest = self._read_manifest(run_id)
+            version = manifest["versions"][version_id]
+            version["score"] = score
+            version["meta"].update(meta)
+            self._write_manifest(manifest)
+
+    def versions(self, run_id: str, stage: str = None) -> list:
+        versions = self._read_manifest(run_id)["versions"]
+        return [version for version in versions if stage is None or version["stage"] == stage]
+
+    def latest(self, run_id: str, stage: str):
+        """某階段最新的版本，沒有時回傳 None"""
+        versions = self.versions(run_id, stage) if self.has_run(run_id) else []
+        return versions[-1] if versions else None
+
+    def find(self, run_id: str, stage: str, inputs: tuple):
+        """同一 run 中輸入相同、已完成的階段產出 (checkpoint)，沒有時回傳 None"""
+        if not run_id or not self.has_run(run_id):
+            return None
+        key = input_key(*inputs)
+        for version in reversed(self.versions(run_id, stage)):
+            if version["meta"].get("input") == key:
+                return version
+        return None
+
+    def prompt(self, run_id: str):
+        """建立 run 時的原始提示詞"""
+        return self._read_manifest(run_id).get("prompt")
+
+    def best(self, run_id: str, stages: tuple = CODE_STAGES):
+        """分數最高的程式碼版本 (同分取較新的)，沒有任何評分過的版本時回傳 None"""
+        scored = [version for version in self.versions(run_id) if version["stage"] in stages
+                  and version["score"] is not None]
+        if not scored:
+            return None
+        return max(scored, key=lambda version: (version["score"], version["id"]))
+
+    def load(self, version: dict) -> str:
+        return self.get_blob(version["blob"])
+
+    def runs(self) -> list:
+        runs_dir = os.path.join(self.root, "runs")
+        if not os.path.isdir(runs_dir):
+            return []
+        return sorted(name[:-len(".json")] for name in os.listdir(runs_dir) if name.endswith(".json"))
+
+
+_default_store = None
+
+
+def get_artifact_store() -> ArtifactStore:
+    """整個行程共用一個倉庫"""
+    global _default_store
+    if _default_store is None:
+        _default_store = ArtifactStore()
+    return _default_store
+
+
+if __name__ == "__main__":
+    # 查看產物：python artifact_store.py [run_id]
+    import sys
+    store = get_artifact_store()
+    if len(sys.argv) < 2:
+        for run_id in store.runs():
+            print(f"- {run_id} ({len(store.versions(run_id))} 個版本)")
+    else:
+        for version in store.versions(sys.argv[1]):
+            print(f"#{version['id']:<3} {version['stage']:<16} {version['blob'][:12]} {version['size']:>7} 字元 "
+                  f"耗時 {version['elapsed']}s 分數 {version['score']} {version['meta'] or ''}")
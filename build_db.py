@@ -1,16 +1,12 @@
 #建立database
 import os
 import chromadb
-import google.generativeai as genai
 from chromadb.utils import embedding_functions
 
-# 1. 設定 Google API
-# 為了安全，每次執行時輸入 Key，或者你可以寫死在這裡測試
-api_key_user = input("Please enter your Google Gemini API Key: ").strip()
-genai.configure(api_key=api_key_user)
-
-# 設定我們要使用的 Embedding 模型 (這是專門把文字變數字的模型，不是對話模型)
-EMBEDDING_MODEL = "models/text-embedding-004"
+# 1. 設定 Google API (匯入 config 時會要求輸入 Key)
+# Embedding 模型 (這是專門把文字變數字的模型，不是對話模型) 與 RAG 查詢共用 config 的設定
+from config import EMBEDDING_MODEL
+from llm_scheduler import get_scheduler, lane
 
 def build_knowledge_base():
     print("🚀 開始建立向量資料庫 (Knowledge Base)...")
@@ -64,13 +60,15 @@ def build_knowledge_base():
     print("🧠 正在呼叫 Gemini 生成向量 (這可能需要幾秒鐘)...")
     
     try:
-        # 使用 Google GenAI 批次生成向量
-        result = genai.embed_content(
-            model=EMBEDDING_MODEL,
-            content=documents,
-            task_type="retrieval_document",
-            title="Game Code Snippets"
-        )
+        # 使用 Google GenAI 批次生成向量 (經排程器以 batch 通道送出：遵守配額、429 時退避重試，
+        # 並讓同時進行的互動請求優先)
+        with lane("batch"):
+            result = get_scheduler().embed(
+                EMBEDDING_MODEL,
+                content=documents,
+                task_type="retrieval_document",
+                title="Game Code Snippets"
+            )
         
         embeddings = result['embedding']
 
@@ -21,4 +21,13 @@ safety_settings = [
     { "category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
     { "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
     { "category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-]
\ No newline at end of file
+]
+
+#LLM 呼叫排程 (llm_scheduler.py)：每個模型的配額 (每分鐘請求數 / 每分鐘 token 數)
+LLM_RATE_LIMITS = {
+    'models/gemini-2.5-flash': {"rpm": 10, "tpm": 250000},
+    EMBEDDING_MODEL: {"rpm": 100, "tpm": 30000},
+}
+LLM_DEFAULT_LIMIT = {"rpm": 10, "tpm": 250000}   #未列出的模型
+LLM_MAX_CONCURRENCY = 4                           #同時進行中的 LLM 請求上限
+LLM_MAX_RETRIES = 6                               #配額/暫時性錯誤的最多重試次數
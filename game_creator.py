@@ -1,66 +1,196 @@
 # game_creator.py 
+import os
 import sys
+import time
 from llm_agent import complete_prompt, generate_py
 from Debug.fuzz_tester import run_fuzz_test
 from Debug.executor import compile_and_debug, error_solving
-def generate_whole(user_prompt: str):
-    # 1. 優化提示詞
-    user_prompt = complete_prompt(user_prompt)
-    if not user_prompt:
-        print("⚠️ 輸入非法提示詞或者發生未知錯誤，請重新提供提示詞")
-        return
-    
-    # 2. 生成並儲存程式碼 (Agent 工作)
-    filepath, code_content = generate_py(user_prompt)
-    
-    # 3. 執行與自動修復迴圈 (Executor 工作)
-    max_attempts = 3  # 設定最大偵測次數 (想要偵測 3 次)
-    wrong = True      # 預設狀態是錯誤的
+from Debug.static_checker import static_check
+from Debug.perf_gate import evaluate_performance
+from Debug.leak_detector import run_leak_test
+from Debug.sandbox import Sandbox
+from Debug.fix_cache import get_fix_cache
+from llm_scheduler import get_scheduler
+from artifact_store import get_artifact_store, should_reuse, PIPELINE_STAGES, CODE_STAGES
+from tools import code_to_py
+
+# 每一輪測試的分數 = 通過了幾個關卡 (在哪個關卡失敗)，用來挑出最好的版本
+GATE_SCORES = {"static": 0, "executor": 1, "fuzz": 2, "perf": 3, "leak": 4, "pass": 5}
+
+# 各關卡失敗時的訊息 (還有修復機會 / 已無修復機會)
+GATE_MESSAGES = {
+    "static": ("🔧 [StaticCheck] 靜態檢查失敗，正在進行第 {} 次修復...", "❌ [StaticCheck] 最終測試失敗，已無修復機會。"),
+    "executor": ("🔧 [Executor] 執行失敗，正在進行第 {} 次修復...", "❌ [Executor] 最終測試失敗，已無修復機會。"),
+    "fuzz": ("🔧 [Fuzzer] 測試失敗，正在進行第 {} 次邏輯修復...", "❌ [Fuzzer] 最終測試失敗，已無修復機會。"),
+    "perf": ("🔧 [PerfGate] 效能未達標，正在進行第 {} 次效能優化...", "❌ [PerfGate] 最終測試失敗，已無修復機會。"),
+    "leak": ("🔧 [LeakCheck] 發現資源無上限成長，正在進行第 {} 次修復...", "❌ [LeakCheck] 最終測試失敗，已無修復機會。"),
+}
+
+def run_gates(code_content: str, sandbox: Sandbox):
+    """
+    依序執行所有測試關卡，遇到第一個失敗的關卡就停止。
+    Returns:
+        tuple: (關卡名稱 (全部通過為 "pass"), 錯誤報告 | None)
+    """
+    # [階段零] 靜態預檢 (Static Check: 不啟動子行程，毫秒級擋下語法錯誤/未定義名稱)
+    static_result = static_check(code_content, filename = os.path.basename(sandbox.game_path))
+    if not static_result["state"]:
+        return "static", static_result["Text"]
+
+    # [階段一] (Executor: Compile & Run)
+    exec_result = compile_and_debug(sandbox.game_path, limits = sandbox.limits)
+    if not exec_result["state"]:
+        return "executor", exec_result["Text"]
+
+    # [階段二] Fuzz 壓力測試 (Fuzz Tester: Runtime Logic)
+    # 只有當 Executor 通過時，才會進到這裡
+    fuzz_result = run_fuzz_test(metrics_path = sandbox.path("perf_metrics.json"), sandbox = sandbox)
+    if not fuzz_result["state"]:
+        return "fuzz", fuzz_result["Text"]
+
+    # [階段三] 效能門檻 (Perf Gate)：活著但跑太慢也算失敗，把效能摘要交給修復
+    perf_result = evaluate_performance(fuzz_result.get("Metrics"))
+    if not perf_result["state"]:
+        return "perf", perf_result["Text"]
+
+    # [階段四] 長時間模擬 (Leak Check)：以虛擬時鐘快轉數分鐘遊戲時間，抓記憶體洩漏與物件池耗盡
+    leak_result = run_leak_test(headless = True, sandbox = sandbox)
+    if not leak_result["state"]:
+        return "leak", leak_result["Text"]
+    return "pass", None
+
+def validate_game(code_content: str, sandbox: Sandbox, max_attempts: int = 3, run_id: str = None,
+                  redo_from: str = None):
+    """
+    在獨立沙盒中執行「檢查 -> 修復」迴圈，多個遊戲可各自使用不同沙盒同時驗證。
+    Args:
+        run_id: 產物倉庫中的 run 代號，提供時每一輪的測試結果與修復都會存成 checkpoint，
+                重跑時相同程式碼的測試結果與相同輸入的修復直接沿用；失敗時退回分數最高的版本
+        redo_from: 設為 "validation" 時不沿用測試結果與修復的 checkpoint
+    Returns:
+        tuple: (是否通過所有測試, 最終版本的程式碼)
+    """
+    store = get_artifact_store()
+    reuse = run_id is not None and should_reuse("validation", redo_from)
+    tested = _tracked_version(store, run_id, code_content)
 
     for current_attempt in range(1, max_attempts + 1):
         print(f"\n--- 進入第 {current_attempt} / {max_attempts} 輪測試 ---")
 
-        # [階段一] (Executor: Compile & Run)
-        exec_result = compile_and_debug(filepath)
-        
-        if not exec_result["state"]:
-            # --- 失敗處理 ---
-            if current_attempt < max_attempts:
-                print(f"🔧 [Executor] 執行失敗，正在進行第 {current_attempt} 次修復...")
-                code_content = error_solving(exec_result["Text"], code_content)
-                # 修復完後，使用 continue 直接進入下一輪迴圈 (重新從 Executor 開始測)
-                continue
-            else:
-                print("❌ [Executor] 最終測試失敗，已無修復機會。")
-                break # 這是最後一次偵測，直接跳出
-
-        # [階段二] Fuzz 壓力測試 (Fuzz Tester: Runtime Logic)
-        # 只有當 Executor 通過時，才會進到這裡
-        fuzz_result = run_fuzz_test()
-
-        if fuzz_result["state"]:
+        # 這個版本測過了 (中斷前的那一輪) 就直接沿用結果，否則執行所有關卡
+        checkpoint = store.versions(run_id)[tested["id"]] if tested is not None else None
+        if reuse and checkpoint["score"] is not None and "failed_at" in checkpoint["meta"]:
+            gate = checkpoint["meta"]["failed_at"]
+            error_text = store.get_blob(checkpoint["meta"]["error"]) if checkpoint["meta"].get("error") else None
+            print(f"♻️ 沿用版本 #{tested['id']} 的測試結果 (失敗於 {gate})" if gate != "pass"
+                  else f"♻️ 沿用版本 #{tested['id']} 的測試結果 (通過)")
+        else:
+            sandbox.write(code_content)
+            gate, error_text = run_gates(code_content, sandbox)
+            if tested is not None:
+                error_meta = {"error": store.put_blob(error_text)} if error_text else {}
+                store.set_score(run_id, tested["id"], GATE_SCORES[gate], failed_at = gate, **error_meta)
+
+        if gate == "pass":
             # --- 成功 ---
             print("🎉 恭喜！遊戲通過所有測試！")
-            wrong = False
-            break # 測試全部通過，跳出迴圈
+            get_fix_cache().resolve(sandbox.game_path)   # 最後一次修復確實有效
+            return True, code_content
+
+        # --- 失敗處理 ---
+        repair_message, final_message = GATE_MESSAGES[gate]
+        if current_attempt >= max_attempts:
+            print(final_message)
+            break # 這是最後一次偵測，直接跳出
+
+        print(repair_message.format(current_attempt))
+        repaired = store.find(run_id, "repair", (error_text, code_content)) if reuse else None
+        if repaired is not None:
+            print(f"♻️ 沿用已完成的修復 (版本 #{repaired['id']})")
+            code_content = store.load(repaired)
+            sandbox.write(code_content)
+            tested = repaired
         else:
-            # --- 失敗處理 ---
-            if current_attempt < max_attempts:
-                print(f"🔧 [Fuzzer] 測試失敗，正在進行第 {current_attempt} 次邏輯修復...")
-                code_content = error_solving(fuzz_result["Text"], code_content)
-                # 修復完後，使用 continue 直接進入下一輪 (確保修復後的代碼也能通過 Executor)
-                continue
-            else:
-                print("❌ [Fuzzer] 最終測試失敗，已無修復機會。")
-                break
+            start = time.perf_counter()
+            fixed_code = error_solving(error_text, code_content, sandbox.game_path)
+            if run_id:
+                tested = store.record(run_id, "repair", fixed_code, meta = {"attempt": current_attempt, "trigger": gate},
+                                      elapsed = time.perf_counter() - start, inputs = (error_text, code_content))
+            code_content = fixed_code
+        # 修復完後，使用 continue 直接進入下一輪 (確保修復後的代碼也能通過 Executor)
+
+    # 修復可能越修越糟：退回這次生成中通過最多關卡的版本
+    if tested is not None:
+        best = store.best(run_id)
+        final_score = store.versions(run_id)[tested["id"]]["score"]
+        if best is not None and best["id"] != tested["id"] and best["score"] > (final_score or 0):
+            print(f"⏪ 退回版本 #{best['id']} ({best['stage']}，失敗於 {best['meta'].get('failed_at')})")
+            code_content = store.load(best)
+    return False, code_content
+
+def _tracked_version(store, run_id: str, code_content: str):
+    """找出目前程式碼在產物倉庫中的版本 (內容相同就沿用)，沒有時記錄一個新版本"""
+    if not run_id:
+        return None
+    digest = store.put_blob(code_content)
+    for version in reversed(store.versions(run_id)):
+        if version["blob"] == digest and version["stage"] in CODE_STAGES:
+            return version
+    return store.record(run_id, "debugged_code", code_content)
+
+def generate_whole(user_prompt: str, run_id: str = None, redo_from: str = None):
+    """
+    Args:
+        run_id: 產物倉庫的 run 代號 (預設建立新的 run)；以同一個 run_id 重跑時，已完成的階段與修復直接沿用
+        redo_from: 從哪個階段 (PIPELINE_STAGES 之一) 開始強制重新執行
+    """
+    store = get_artifact_store()
+    run_id = store.new_run(user_prompt, run_id)
+    print(f"🗃️ Run ID: {run_id} (中斷後可用 python game_creator.py --run-id {run_id} 接續)")
+
+    # 1. 優化提示詞
+    raw_prompt = user_prompt
+    prompt_version = store.find(run_id, "prompt", (raw_prompt,)) if should_reuse("prompt", redo_from) else None
+    if prompt_version is not None:
+        print(f"♻️ 沿用 run {run_id} 已完成的 prompt (版本 #{prompt_version['id']})")
+        user_prompt = store.load(prompt_version)
+    else:
+        user_prompt = complete_prompt(user_prompt)
+        if not user_prompt:
+            print("⚠️ 輸入非法提示詞或者發生未知錯誤，請重新提供提示詞")
+            return
+        store.record(run_id, "prompt", user_prompt, inputs = (raw_prompt,))
+    
+    # 2. 生成並儲存程式碼 (Agent 工作)
+    filepath, code_content = generate_py(user_prompt, run_id = run_id, redo_from = redo_from)
+    
+    # 3. 執行與自動修復迴圈 (Executor 工作)：在獨立沙盒中驗證，最終版本再寫回 dest
+    with Sandbox(code_content) as sandbox:
+        passed, code_content = validate_game(code_content, sandbox, run_id = run_id, redo_from = redo_from)
+    code_to_py(code_content)
+    print(get_fix_cache().summary())
+    print(get_scheduler().summary())
 
     # [最終結果判定]
-    if wrong:
+    if not passed:
         print("\n⚠️ 非常抱歉，自動修復次數耗盡，無法正確偵錯。")
         print("請檢查 dest/generated_app.py 進行手動調整。")
+        print(f"所有版本保存在 dest/artifacts (python artifact_store.py {run_id})")
 
 if __name__ == "__main__":
+    # 用法：python game_creator.py [--run-id <id>] [--redo-from <stage>]
+    import argparse
+    parser = argparse.ArgumentParser(description = "AI Game Creator")
+    parser.add_argument("--run-id", default = None, help = "接續之前中斷的 run (已完成的階段不會重新執行)")
+    parser.add_argument("--redo-from", default = None, choices = PIPELINE_STAGES, help = "從這個階段開始強制重新執行")
+    args = parser.parse_args()
+
     print("🎮 AI Game Creator")
-    user_request = input("請輸入你想製作的遊戲 (例如: 貪食蛇): ")
+    store = get_artifact_store()
+    if args.run_id and store.has_run(args.run_id) and store.prompt(args.run_id):
+        user_request = store.prompt(args.run_id)
+        print(f"♻️ 接續 run {args.run_id}: {user_request}")
+    else:
+        user_request = input("請輸入你想製作的遊戲 (例如: 貪食蛇): ")
     if user_request:
-        generate_whole(user_request)
\ No newline at end of file
+        generate_whole(user_request, run_id = args.run_id, redo_from = args.redo_from)
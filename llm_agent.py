@@ -1,10 +1,13 @@
 import google.generativeai as genai
 import sys
 import os
+import time
 
 from config import * # 包含 API Key, Models, Safety Settings
 from tools import clean_code, code_to_py
 from rag_system.core import get_rag_context
+from artifact_store import get_artifact_store, should_reuse
+from llm_scheduler import get_scheduler
 
 # 多次生成確保程式碼完整
 def loop_game_generate(code: str, response_planner: str, times_remain: int = 2) -> str:
@@ -29,12 +32,10 @@ def loop_game_generate(code: str, response_planner: str, times_remain: int = 2)
             f"\n\n待審查程式碼:\n{current_code}"
         )
         
-        model_auditor = genai.GenerativeModel(MODEL_SMART)
-        audit_response = model_auditor.generate_content(audit_prompt, safety_settings = safety_settings)
+        audit_response = get_scheduler().generate(MODEL_SMART, audit_prompt, safety_settings = safety_settings)
         critique = audit_response.text
 
         # 重構階段 (The Refactorer)
-        model = genai.GenerativeModel('gemini-2.0-flash-thinking-exp')
         refine_prompt = (
             "你是一個資深的 Python 遊戲重構工程師。"
             "請根據「原始程式碼」以及「審查員的批評」，重寫並優化程式碼。\n\n"
@@ -52,8 +53,7 @@ def loop_game_generate(code: str, response_planner: str, times_remain: int = 2)
             "   - 這對自動化測試debug至關重要，請務必實作。"
         )
 
-        model_refiner = genai.GenerativeModel(MODEL_FAST)
-        refine_response = model_refiner.generate_content(refine_prompt, safety_settings=safety_settings)
+        refine_response = get_scheduler().generate(MODEL_FAST, refine_prompt, safety_settings=safety_settings)
         
         if len(refine_response.text) > 100:
             current_code = clean_code(refine_response.text)
@@ -66,8 +66,6 @@ def loop_game_generate(code: str, response_planner: str, times_remain: int = 2)
 def complete_prompt(user_prompt: str) -> str:
     print("🛡️ 正在進行輸入安全檢查與優化...")
     
-    model = genai.GenerativeModel(MODEL_FAST)
-    
     system_instruction = (
         "你是一個 AI 遊戲需求分析師與安全官。"
         "【規則 1：安全過濾 (Security)】"
@@ -83,7 +81,7 @@ def complete_prompt(user_prompt: str) -> str:
     )
     
     try:
-        response = model.generate_content(f"{system_instruction}\n\n使用者原始輸入: {user_prompt}")
+        response = get_scheduler().generate(MODEL_FAST, f"{system_instruction}\n\n使用者原始輸入: {user_prompt}")
         refined_prompt = response.text.strip()
         
         if refined_prompt.startswith("INVALID"):
@@ -97,8 +95,53 @@ def complete_prompt(user_prompt: str) -> str:
         print(f"❌ 發生錯誤 : {e}")
         return ""
 
+# Checkpoint：同一個 run 中輸入相同且已完成的階段直接沿用產物，不重新呼叫 LLM
+def _checkpointed_output(stage: str, inputs: tuple, run_id: str = None, redo_from: str = None):
+    if not run_id or not should_reuse(stage, redo_from):
+        return None
+    version = get_artifact_store().find(run_id, stage, inputs)
+    if version is None:
+        return None
+    print(f"♻️ 沿用 run {run_id} 已完成的 {stage} (版本 #{version['id']})")
+    return get_artifact_store().load(version)
+
+# 記錄階段產出與輸入 (沒有 run_id 時不記錄)
+def _record_output(stage: str, content: str, inputs: tuple, run_id: str = None, elapsed: float = None):
+    if run_id:
+        get_artifact_store().record(run_id, stage, content, elapsed = elapsed, inputs = inputs)
+
 # 遊戲程式碼生成  
-def generate_py(user_prompt) -> str:
+def generate_py(user_prompt, run_id: str = None, redo_from: str = None) -> str:
+    """
+    Args:
+        run_id: 產物倉庫中的 run 代號，提供時每個階段的產出都會存成 checkpoint，重跑時已完成的階段直接沿用
+        redo_from: 從哪個階段 (PIPELINE_STAGES 之一) 開始強制重新執行，不沿用 checkpoint
+    Returns:
+        tuple: (儲存路徑, 程式碼)
+    """
+    planner_text = _checkpointed_output("design_document", (user_prompt,), run_id, redo_from)
+    if planner_text is None:
+        planner_text = _plan_game(user_prompt, run_id)
+
+    folder = "dest"
+    filename = "game_design_document.txt"
+    os.makedirs(folder, exist_ok = True)
+    filename = os.path.join(folder, filename)
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(planner_text)
+
+    code_content = _checkpointed_output("designer_code", (planner_text,), run_id, redo_from)
+    if code_content is None:
+        code_content = _design_game(planner_text, run_id)
+
+    debugged_code = _checkpointed_output("debugged_code", (planner_text, code_content), run_id, redo_from)
+    code_content = debugged_code if debugged_code is not None else _debug_game(planner_text, code_content, run_id)
+
+    filepath = code_to_py(code_content)
+    return filepath, code_content
+
+# 2. 遊戲企劃師 (Planner)
+def _plan_game(user_prompt: str, run_id: str = None) -> str:
     # 1. 先去資料庫撈程式碼 (RAG 步驟)
     rag_context = get_rag_context(user_prompt)
     
@@ -150,21 +193,18 @@ def generate_py(user_prompt) -> str:
         "4. **RAG 模組應用**: 在 `used_modules` 中精準列出需要的檔案 (如 `mouse_camera.py`, `collision.py`)。"
     )
     
-    model_planner = genai.GenerativeModel('models/gemini-2.5-flash')
-    response_planner = model_planner.generate_content(
+    start = time.perf_counter()
+    response_planner = get_scheduler().generate(
+        'models/gemini-2.5-flash',
         f"{system_instruction_planner}\n\n使用者需求: {user_prompt}",
         safety_settings=safety_settings
     )
     print("✅ 企劃書已生成完畢。")
+    _record_output("design_document", response_planner.text, (user_prompt,), run_id, time.perf_counter() - start)
+    return response_planner.text
 
-    folder = "dest"
-    filename = "game_design_document.txt"
-    os.makedirs(folder, exist_ok = True)
-    filename = os.path.join(folder, filename)
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(response_planner.text)
-
-    # 3. 遊戲工程師
+# 3. 遊戲工程師
+def _design_game(planner_text: str, run_id: str = None) -> str:
     # 1. 遊戲架構師 (Designer) - 優化版
     system_game_designer = (
         "你是一個資深的 Python Pygame 遊戲架構師。任務是根據 JSON 企劃書與參考模組，撰寫單一檔案的遊戲程式碼。"
@@ -210,9 +250,10 @@ def generate_py(user_prompt) -> str:
         "解析輸入的 JSON (`technical_architecture`, `game_rules`)，產出單一 `import pygame` 的完整 Python 檔案，不含 Markdown。"
     )
     
-    model_designer = genai.GenerativeModel('models/gemini-2.5-flash')
-    response_designer = model_designer.generate_content(
-        f"{system_game_designer}\n\n企劃書: {response_planner.text}",
+    start = time.perf_counter()
+    response_designer = get_scheduler().generate(
+        'models/gemini-2.5-flash',
+        f"{system_game_designer}\n\n企劃書: {planner_text}",
         safety_settings=safety_settings
     )
     
@@ -225,7 +266,11 @@ def generate_py(user_prompt) -> str:
     code_content = clean_code(code_content)
     
     print("✅ 程式碼已生成完畢。")
+    _record_output("designer_code", code_content, (planner_text,), run_id, time.perf_counter() - start)
+    return code_content
 
+# 4. 遊戲偵錯師
+def _debug_game(planner_text: str, code_content: str, run_id: str = None) -> str:
     # 遊戲偵錯師 (Static Analysis)
     # 3. 遊戲偵錯師 (Static Analysis / Code Reviewer)
     system_instruction_debugger = (
@@ -234,7 +279,7 @@ def generate_py(user_prompt) -> str:
         "【核心審查規則 (CRITICAL RULES)】"
         "1. **架構規範**: 嚴禁 Global 變數；Game Loop 邏輯須封裝；正確引用 RAG 模組。"
         "2. **物件池安全 (Object Pool)**:"
-        "   - `ObjectPool` 僅有 `get()`/`release()`，**無** `add()`。"
+        "   - `ObjectPool` 僅有 `get()`/`release()`/`release_all()`，**無** `add()`。"
         "   - **分離原則**: 必須同時傳入 `pool` (生成用) 與 `group` (渲染用)。禁止將物件 add 進 pool。"
         "   - **回收機制**: 物件 `kill()` 時必須呼叫 `pool.release(obj)`。"
         "3. **物理與數學**: 禁止直接修改 `rect.x/y` (整數精度遺失)，必須使用 `Vector2` (`self.pos`) 運算後同步至 Rect。"
@@ -255,13 +300,15 @@ def generate_py(user_prompt) -> str:
         "【輸出格式】"
         "直接輸出修正後的完整 Python 程式碼 (純文字)，不含 Markdown 標記或解釋。"
     )
-    model_debugger = genai.GenerativeModel(MODEL_SMART)
-    response_debugger = model_debugger.generate_content(
-        f"{system_instruction_debugger}\n\n企劃書: {response_planner.text}\n\n程式碼: {code_content}",
+    designer_code = code_content
+    start = time.perf_counter()
+    response_debugger = get_scheduler().generate(
+        MODEL_SMART,
+        f"{system_instruction_debugger}\n\n企劃書: {planner_text}\n\n程式碼: {code_content}",
         safety_settings = safety_settings
     )
     code_content = clean_code(response_debugger.text)
     print("✅ 程式碼已偵錯完畢。")
-
-    filepath = code_to_py(code_content)
-    return filepath, code_content
\ No newline at end of file
+    _record_output("debugged_code", code_content, (planner_text, designer_code), run_id,
+                   time.perf_counter() - start)
+    return code_content
\ No newline at end of file
@@ -0,0 +1,305 @@
+import contextlib
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+
+import google.generativeai as genai
+
+from config import LLM_RATE_LIMITS, LLM_DEFAULT_LIMIT, LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES
+
+# ==========================================
+# 全域 LLM 請求排程器 (LLM Request Scheduler)
+# 所有模型呼叫 (提示詞優化、企劃/架構/偵錯、錯誤修復、RAG 選型與向量) 都經過這裡：
+# - 每個模型各有「請求數」與「token 數」兩個 Token Bucket，依配額平滑放行
+# - 全域同時請求數上限
+# - 配額 (429) / 暫時性錯誤以指數退避 + jitter 重試，並尊重伺服器建議的等待時間
+# - 優先順序通道：互動 (interactive) 先於批次 (batch)
+# - 佇列深度、排隊時間、呼叫時間與重試次數的統計
+# ==========================================
+
+LANES = {"interactive": 0, "batch": 1}   # 數字越小越優先
+BASE_BACKOFF = 2.0       # 第一次重試前的基本等待秒數
+MAX_BACKOFF = 60.0
+CHARS_PER_TOKEN = 3      # 估計 token 數用 (中英混合的提示詞約 3 字元一個 token)
+
+# 視為可重試的錯誤：google.api_core.exceptions 的類別名稱，或例外帶有的 HTTP 狀態碼
+# (不比對錯誤訊息文字，避免訊息中剛好出現 "500" 之類的數字就被當成暫時性錯誤)
+RETRYABLE_ERRORS = ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+                    "DeadlineExceeded", "Aborted", "RetryError")
+RATE_LIMIT_ERRORS = ("ResourceExhausted", "TooManyRequests")
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+RATE_LIMIT_STATUS = 429
+_RETRY_HINT = re.compile(r"(?:retry in|retry_delay\s*\{\s*seconds:)\s*([\d.]+)", re.IGNORECASE)
+
+_current_lane = threading.local()
+
+
+@contextlib.contextmanager
+def lane(name: str):
+    """
+    在這個區塊內 (同一執行緒) 發出的 LLM 請求使用指定的優先通道，例如建立向量資料庫 (build_db.py)：
+        with lane("batch"):
+            get_scheduler().embed(EMBEDDING_MODEL, content=documents)
+    """
+    previous = getattr(_current_lane, "name", None)
+    _current_lane.name = name
+    try:
+        yield
+    finally:
+        _current_lane.name = previous
+
+
+def estimate_tokens(content) -> int:
+    if isinstance(content, (list, tuple)):
+        return sum(estimate_tokens(item) for item in content)
+    return max(1, len(str(content)) // CHARS_PER_TOKEN)
+
+
+def _status_code(error: Exception):
+    """例外帶有的 HTTP 狀態碼 (GoogleAPICallError.code、HTTPError.code、*.status_code 或 response.status_code)"""
+    for source in (error, getattr(error, "response", None)):
+        for attr in ("code", "status_code"):
+            value = getattr(source, attr, None)
+            if isinstance(value, int) and not isinstance(value, bool):
+                return value
+    return None
+
+
+def _error_names(error: Exception) -> set:
+    return {cls.__name__ for cls in type(error).__mro__}
+
+
+def is_retryable(error: Exception) -> bool:
+    return bool(_error_names(error) & set(RETRYABLE_ERRORS)) or _status_code(error) in RETRYABLE_STATUS
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return bool(_error_names(error) & set(RATE_LIMIT_ERRORS)) or _status_code(error) == RATE_LIMIT_STATUS
+
+
+def _retry_hint(error: Exception):
+    """伺服器在錯誤訊息中建議的等待秒數 (例如 'Please retry in 23.4s')"""
+    match = _RETRY_HINT.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, capacity: float):
+        """
+        Args:
+            per_minute: 每分鐘補充的量 (配額)
+            capacity: 最多可累積的量 (允許的瞬間爆量)
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """還要等幾秒才能取用 amount (超過容量的請求只要桶子滿了就放行，之後以負餘額償還)"""
+        self._refill(now)
+        need = min(amount, self.capacity)
+        return 0.0 if self.tokens >= need else (need - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self.tokens -= amount
+
+    def drain(self, now: float):
+        """收到 429：清空桶子，讓同模型的其他請求也跟著放慢"""
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+
+
+class _Ticket:
+    def __init__(self, model: str, priority: int, tokens: int, seq: int):
+        self.model = model
+        self.priority = priority
+        self.tokens = tokens
+        self.seq = seq
+        self.enqueued = time.monotonic()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class LLMScheduler:
+    def __init__(self, rate_limits: dict = None, default_limit: dict = None, max_concurrency: int = None,
+                 max_retries: int = None):
+        self.rate_limits = rate_limits if rate_limits is not None else LLM_RATE_LIMITS
+        self.default_limit = default_limit or LLM_DEFAULT_LIMIT
+        self.max_concurrency = max_concurrency or LLM_MAX_CONCURRENCY
+        self.max_retries = LLM_MAX_RETRIES if max_retries is None else max_retries
+        self._cond = threading.Condition()
+        self._waiting = []        # heap of _Ticket
+        self._active = 0
+        self._buckets = {}        # model -> (請求 bucket, token bucket)
+        self._seq = itertools.count()
+        self.stats = {"requests": 0, "succeeded": 0, "failed": 0, "retries": 0, "rate_limited": 0,
+                      "max_queue_depth": 0, "queue_wait": [], "call_time": [], "lanes": {}}
+
+    def _model_buckets(self, model: str) -> tuple:
+        if model not in self._buckets:
+            limit = self.rate_limits.get(model, self.default_limit)
+            # 請求數不累積爆量 (容量 1)，長時間下來剛好等於配額；token 容量為 6 秒的配額
+            self._buckets[model] = (TokenBucket(limit["rpm"], 1), TokenBucket(limit["tpm"], limit["tpm"] / 10))
+        return self._buckets[model]
+
+    def _admissible(self, now: float):
+        """
+        依優先順序找出現在可以放行的請求 (每個模型只看排在最前面的那個，避免低優先權插隊)。
+        Returns:
+            tuple: (可放行的 ticket | None, 最短需要再等待的秒數 | None)
+        """
+        seen = set()
+        shortest = None
+        for ticket in sorted(self._waiting):
+            if ticket.model in seen:
+                continue
+            seen.add(ticket.model)
+            requests, tokens = self._model_buckets(ticket.model)
+            wait = max(requests.delay(1, now), tokens.delay(ticket.tokens, now))
+            if wait <= 0:
+                return ticket, None
+            shortest = wait if shortest is None else min(shortest, wait)
+        return None, shortest
+
+    def _acquire(self, ticket: _Ticket):
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self._waiting))
+            while True:
+                timeout = None
+                if self._active < self.max_concurrency:
+                    chosen, timeout = self._admissible(time.monotonic())
+                    if chosen is ticket:
+                        self._waiting.remove(ticket)
+                        heapq.heapify(self._waiting)
+                        requests, tokens = self._model_buckets(ticket.model)
+                        requests.consume(1)
+                        tokens.consume(ticket.tokens)
+                        self._active += 1
+                        self.stats["queue_wait"].append(time.monotonic() - ticket.enqueued)
+                        self._cond.notify_all()   # 其他模型的請求也許可以接著放行
+                        return
+                    if chosen is not None:
+                        self._cond.notify_all()   # 輪到別人：叫醒它 (它放行後會再通知大家)
+                self._cond.wait(timeout)
+
+    def _release(self, ticket: _Ticket, used_tokens: int = None, rate_limited: bool = False):
+        with self._cond:
+            self._active -= 1
+            requests, tokens = self._model_buckets(ticket.model)
+            if used_tokens and used_tokens > ticket.tokens:
+                tokens.consume(used_tokens - ticket.tokens)   # 實際用量 (含輸出) 比估計多，補扣
+            if rate_limited:
+                requests.drain(time.monotonic())
+            self._cond.notify_all()
+
+    def submit(self, call, model: str, content="", priority: str = None):
+        """
+        排隊取得配額後執行 call()，配額/暫時性錯誤時退避重試。
+        Args:
+            call: 實際發出請求的函式 (無參數)
+            model: 模型名稱 (決定使用哪一組配額)
+            content: 請求內容，用來估計 token 數
+            priority: "interactive" 或 "batch"，預設為目前 lane() 指定的通道 (沒有則為 interactive)
+        Returns:
+            call() 的回傳值；重試用盡或不可重試的錯誤會直接拋出
+        """
+        lane_name = priority or getattr(_current_lane, "name", None) or "interactive"
+        estimated = estimate_tokens(content)
+        with self._cond:
+            self.stats["requests"] += 1
+            self.stats["lanes"][lane_name] = self.stats["lanes"].get(lane_name, 0) + 1
+        ticket = _Ticket(model, LANES.get(lane_name, LANES["batch"]), estimated, next(self._seq))
+
+        for attempt in range(self.max_retries + 1):
+            self._acquire(ticket)
+            start = time.monotonic()
+            try:
+                response = call()
+            except Exception as e:
+                retryable = is_retryable(e) and attempt < self.max_retries
+                rate_limited = is_rate_limited(e)
+                self._release(ticket, rate_limited = rate_limited)
+                with self._cond:
+                    self.stats["rate_limited"] += int(rate_limited)
+                    if not retryable:
+                        self.stats["failed"] += 1
+                        raise
+                    self.stats["retries"] += 1
+                delay = min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt) * random.uniform(0.5, 1.0)
+                delay = max(delay, _retry_hint(e) or 0)
+                print(f"⏳ [LLM] {model} 暫時失敗 ({type(e).__name__})，{delay:.1f} 秒後第 {attempt + 1} 次重試")
+                time.sleep(delay)
+                ticket.enqueued = time.monotonic()
+                continue
+
+            usage = getattr(response, "usage_metadata", None)
+            used_tokens = getattr(usage, "total_token_count", None) if usage is not None else None
+            self._release(ticket, used_tokens)
+            with self._cond:
+                self.stats["succeeded"] += 1
+                self.stats["call_time"].append(time.monotonic() - start)
+            return response
+
+    def generate(self, model_name: str, prompt, priority: str = None, **kwargs):
+        """排程後呼叫 genai.GenerativeModel(model_name).generate_content(prompt, **kwargs)"""
+        model = genai.GenerativeModel(model_name)
+        return self.submit(lambda: model.generate_content(prompt, **kwargs), model_name, prompt, priority)
+
+    def embed(self, model_name: str, content, priority: str = None, **kwargs):
+        """排程後呼叫 genai.embed_content(model=model_name, content=content, **kwargs)"""
+        return self.submit(lambda: genai.embed_content(model=model_name, content=content, **kwargs),
+                           model_name, content, priority)
+
+    def metrics(self) -> dict:
+        """
+        Returns:
+            dict: {"requests", "succeeded", "failed", "retries", "rate_limited", "queue_depth", "max_queue_depth",
+                   "active", "wait_p50", "wait_p95", "call_p50", "call_p95", "lanes"} (時間單位為秒)
+        """
+        def percentile(values, q):
+            if not values:
+                return 0.0
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+        with self._cond:
+            return {
+                **{key: self.stats[key] for key in ("requests", "succeeded", "failed", "retries", "rate_limited",
+                                                    "max_queue_depth")},
+                "queue_depth": len(self._waiting),
+                "active": self._active,
+                "wait_p50": percentile(self.stats["queue_wait"], 0.5),
+                "wait_p95": percentile(self.stats["queue_wait"], 0.95),
+                "call_p50": percentile(self.stats["call_time"], 0.5),
+                "call_p95": percentile(self.stats["call_time"], 0.95),
+                "lanes": dict(self.stats["lanes"])
+            }
+
+    def summary(self) -> str:
+        m = self.metrics()
+        return (f"[LLM] 請求 {m['requests']} 次 (成功 {m['succeeded']}、失敗 {m['failed']}、重試 {m['retries']}、"
+                f"被限流 {m['rate_limited']})，佇列最深 {m['max_queue_depth']}，"
+                f"排隊 p50/p95 {m['wait_p50']:.1f}/{m['wait_p95']:.1f}s，呼叫 p50/p95 {m['call_p50']:.1f}/{m['call_p95']:.1f}s")
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """整個行程共用一個排程器 (配額是以 API Key 計算的)"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = LLMScheduler()
+    return _default_scheduler
@@ -9,6 +9,7 @@ import chromadb
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import EMBEDDING_MODEL
+from llm_scheduler import get_scheduler
 
 # === 這裡放入原來的 RAG 相關函式 ===
 
@@ -38,8 +39,6 @@ def select_relevant_modules(user_query: str) -> str:
     print(f"🤔 正在根據型錄分析需求...")
 
     # 2. 詢問 LLM
-    model = genai.GenerativeModel('models/gemini-2.5-flash')
-    
     prompt = (
         "你是一個 Python 遊戲開發的技術選型專家。"
         f"目前我們的軍火庫清單如下 (JSON 格式)：\n{catalog_str}\n"
@@ -52,7 +51,7 @@ def select_relevant_modules(user_query: str) -> str:
     )
 
     try:
-        response = model.generate_content(prompt)
+        response = get_scheduler().generate('models/gemini-2.5-flash', prompt)
         selected = response.text.strip()
         
         if "NONE" in selected:
@@ -83,8 +82,8 @@ def get_rag_context(user_query: str) -> str:
         collection = chroma_client.get_collection(name="game_modules")
         
         # 3. 生成向量
-        result = genai.embed_content(
-            model=EMBEDDING_MODEL,
+        result = get_scheduler().embed(
+            EMBEDDING_MODEL,
             content=enhanced_query,
             task_type="retrieval_query"
         )
@@ -7,7 +7,7 @@ class BoxCameraGroup(pygame.sprite.Group):
     功能：
     1. 建立一個虛擬的 Camera Box。
     2. 只有當目標 (target) 移出 Box 邊界時，相機才會移動。
-    3. 內建 Y-Sort (深度排序) 渲染。
+    3. 內建 Y-Sort (深度排序) 渲染，只繪製視野內的物件，並沿用上一幀的順序排序。
     """
     def __init__(self):
         super().__init__()
@@ -48,6 +48,10 @@ class BoxCameraGroup(pygame.sprite.Group):
             
         self.ground_rect = self.ground_surf.get_rect(topleft=(0, 0))
 
+        # 視野裁切 (Culling) 與 Y-Sort 繪製清單
+        self.cull_margin = 100   # 視野外多畫一圈 (像素)，避免大圖片在畫面邊緣突然出現
+        self.draw_list = []      # 上一幀的繪製順序
+
     def box_target_camera(self, target):
         """核心運算：更新相機偏移量"""
         
@@ -68,6 +72,24 @@ class BoxCameraGroup(pygame.sprite.Group):
         self.offset.x = self.camera_rect.left - self.camera_borders['left']
         self.offset.y = self.camera_rect.top - self.camera_borders['top']
 
+    def visible_sprites(self):
+        """
+        視野內 (往外擴 cull_margin) 的物件，依 centery 排序 (Y-Sort)。
+        從上一幀的順序開始排序：list.sort (Timsort) 對幾乎排好的清單接近線性時間。
+        """
+        screen_w, screen_h = self.display_surface.get_size()
+        margin = self.cull_margin
+        view = pygame.Rect(self.offset.x - margin, self.offset.y - margin, screen_w + 2 * margin, screen_h + 2 * margin)
+        sprites = self.sprites()
+        visible = {sprite for sprite in sprites if view.colliderect(sprite.rect)}
+        draw_list = [sprite for sprite in self.draw_list if sprite in visible]
+        if len(draw_list) < len(visible):   # 新進入視野 (或新加入群組) 的物件
+            listed = set(draw_list)
+            draw_list.extend(sprite for sprite in sprites if sprite in visible and sprite not in listed)
+        draw_list.sort(key=lambda sprite: sprite.rect.centery)
+        self.draw_list = draw_list
+        return draw_list
+
     def custom_draw(self, target):
         """渲染循環：包含背景與所有精靈的 Y-Sort"""
         
@@ -77,9 +99,9 @@ class BoxCameraGroup(pygame.sprite.Group):
         ground_offset = self.ground_rect.topleft - self.offset
         self.display_surface.blit(self.ground_surf, ground_offset)
         
-        # 2. 畫精靈 (Y-Sort: 根據 centery 排序)
+        # 2. 畫精靈 (Y-Sort: 根據 centery 排序，只畫視野內的物件)
         # 這是 2D 遊戲最關鍵的渲染邏輯，確保樹木會擋住後面的人
-        for sprite in sorted(self.sprites(), key=lambda sprite: sprite.rect.centery):
+        for sprite in self.visible_sprites():
             offset_pos = sprite.rect.topleft - self.offset
             self.display_surface.blit(sprite.image, offset_pos)
             
@@ -3,7 +3,7 @@ import pygame
 
 class CameraScrollGroup(pygame.sprite.Group):
     """
-    跟隨玩家移動的捲動相機，並內建 Y-Sort 深度排序。
+    跟隨玩家移動的捲動相機，並內建 Y-Sort 深度排序 (只繪製視野內的物件，並沿用上一幀的順序排序)。
     適用於 RPG、冒險遊戲等大地圖遊戲。
     """
     def __init__(self):
@@ -26,11 +26,33 @@ class CameraScrollGroup(pygame.sprite.Group):
             
         self.ground_rect = self.ground_surf.get_rect(topleft=(0, 0))
 
+        # 視野裁切 (Culling) 與 Y-Sort 繪製清單
+        self.cull_margin = 100   # 視野外多畫一圈 (像素)，避免大圖片在畫面邊緣突然出現
+        self.draw_list = []      # 上一幀的繪製順序
+
     def center_target_camera(self, target):
         """計算偏移量以確保目標在畫面中心"""
         self.offset.x = target.rect.centerx - self.half_w
         self.offset.y = target.rect.centery - self.half_h
 
+    def visible_sprites(self):
+        """
+        視野內 (往外擴 cull_margin) 的物件，依 centery 排序 (Y-Sort)。
+        從上一幀的順序開始排序：list.sort (Timsort) 對幾乎排好的清單接近線性時間。
+        """
+        screen_w, screen_h = self.display_surface.get_size()
+        margin = self.cull_margin
+        view = pygame.Rect(self.offset.x - margin, self.offset.y - margin, screen_w + 2 * margin, screen_h + 2 * margin)
+        sprites = self.sprites()
+        visible = {sprite for sprite in sprites if view.colliderect(sprite.rect)}
+        draw_list = [sprite for sprite in self.draw_list if sprite in visible]
+        if len(draw_list) < len(visible):   # 新進入視野 (或新加入群組) 的物件
+            listed = set(draw_list)
+            draw_list.extend(sprite for sprite in sprites if sprite in visible and sprite not in listed)
+        draw_list.sort(key=lambda sprite: sprite.rect.centery)
+        self.draw_list = draw_list
+        return draw_list
+
     def custom_draw(self, player):
         """
         :param player: 相機要跟隨的目標物件 (必須有 rect 屬性)
@@ -41,7 +63,7 @@ class CameraScrollGroup(pygame.sprite.Group):
         ground_offset = self.ground_rect.topleft - self.offset
         self.display_surface.blit(self.ground_surf, ground_offset)
 
-        # 2. Y-Sort 迴圈：只繪製在視野內的物件會更有效能 (這裡先保留全繪製)
-        for sprite in sorted(self.sprites(), key=lambda sprite: sprite.rect.centery):
+        # 2. Y-Sort 迴圈：只繪製在視野內的物件
+        for sprite in self.visible_sprites():
             offset_pos = sprite.rect.topleft - self.offset
             self.display_surface.blit(sprite.image, offset_pos)
\ No newline at end of file
@@ -0,0 +1,187 @@
+# tags: rendering, background, tilemap, chunk, cache, large-map, scroll, camera, optimization, memory
+from collections import OrderedDict
+import pygame
+
+class ChunkedBackground:
+    """
+    分塊快取的世界背景 (Chunk Cache)，取代每幀 blit 一整張 2000x2000 以上的 ground_surf。
+    世界切成固定大小的區塊 (chunk)，只有第一次出現在畫面中時才繪製並 convert() 成與螢幕相同的格式，
+    每幀只 blit 與視野重疊的區塊；快取區塊數有上限 (LRU)，離開畫面很久的區塊會被釋放，
+    所以 20000x20000 的世界也只佔用幾個畫面大小的記憶體。
+    三種建立方式：
+        ChunkedBackground(w, h, render_chunk)              # 程序化繪製：render_chunk(chunk_surface, world_rect)
+        ChunkedBackground.from_surface(ground_surf)        # 把現有的大背景圖切塊
+        ChunkedBackground.from_tiles(grid, 32, tile_images) # 由 tile 地圖 (grid[row][col] -> 圖片) 繪製
+    用法 (相機群組中)：
+        self.ground = ChunkedBackground.from_surface(ground_surf)
+        self.ground.draw(self.display_surface, self.offset)   # 取代 blit(self.ground_surf, ground_offset)
+    地圖內容改變時呼叫 invalidate(world_rect) 讓相關區塊下次重新繪製。
+    """
+    def __init__(self, world_width, world_height, render_chunk, chunk_size=512, max_cached=None, alpha=False):
+        """
+        :param render_chunk: 繪製區塊的函式 func(chunk_surface, world_rect)，world_rect 為區塊在世界中的範圍
+        :param chunk_size: 區塊邊長 (像素)
+        :param max_cached: 最多保留的區塊數 (None 則依視窗大小自動決定，約 4 個畫面)
+        :param alpha: 背景是否需要透明度 (不透明的背景 blit 速度快很多)
+        """
+        self.world_rect = pygame.Rect(0, 0, world_width, world_height)
+        self.render_chunk = render_chunk
+        self.chunk_size = chunk_size
+        self.alpha = alpha
+        if max_cached is None:
+            screen = pygame.display.get_surface()
+            screen_w, screen_h = screen.get_size() if screen else (1280, 720)
+            max_cached = (screen_w // chunk_size + 2) * (screen_h // chunk_size + 2) * 4
+        self.max_cached = max_cached
+        self.chunks = OrderedDict()   # (col, row) -> Surface，依最近使用排序
+        self.built = 0                # 累計繪製的區塊數 (除錯用)
+
+    # ------------------------------------------
+    # 建立方式
+    # ------------------------------------------
+    @classmethod
+    def from_surface(cls, surface, chunk_size=512, **kwargs):
+        """把一張大背景圖切成區塊 (原圖仍保留在記憶體，但每幀只 blit 可見的不透明區塊)"""
+        alpha = kwargs.pop("alpha", bool(surface.get_flags() & pygame.SRCALPHA))
+
+        def render(chunk, world_rect):
+            chunk.blit(surface, (0, 0), world_rect)
+
+        return cls(surface.get_width(), surface.get_height(), render, chunk_size, alpha=alpha, **kwargs)
+
+    @classmethod
+    def from_tiles(cls, grid, tile_size, tile_images, chunk_size=512, default_color=(0, 0, 0), **kwargs):
+        """
+        由 tile 地圖繪製區塊，不需要先畫出整張地圖。
+        :param grid: 二維 tile 地圖，grid[row][col] 為 tile 編號
+        :param tile_images: tile 編號 -> Surface 的 dict (找不到的編號以 default_color 填滿)
+        """
+        chunk_size = max(tile_size, chunk_size // tile_size * tile_size)   # 區塊邊長取 tile 的整數倍
+        rows, cols = len(grid), len(grid[0]) if grid else 0
+        images = {key: image.convert_alpha() if image.get_flags() & pygame.SRCALPHA else image.convert()
+                  for key, image in tile_images.items()} if pygame.display.get_surface() else dict(tile_images)
+
+        def render(chunk, world_rect):
+            chunk.fill(default_color)
+            col0, row0 = world_rect.left // tile_size, world_rect.top // tile_size
+            col1 = min(cols, -(-world_rect.right // tile_size))
+            row1 = min(rows, -(-world_rect.bottom // tile_size))
+            for row in range(row0, row1):
+                line = grid[row]
+                y = row * tile_size - world_rect.top
+                for col in range(col0, col1):
+                    image = images.get(line[col])
+                    if image is not None:
+                        chunk.blit(image, (col * tile_size - world_rect.left, y))
+
+        return cls(cols * tile_size, rows * tile_size, render, chunk_size, **kwargs)
+
+    # ------------------------------------------
+    # 快取
+    # ------------------------------------------
+    def _build(self, key):
+        col, row = key
+        size = self.chunk_size
+        world_rect = pygame.Rect(col * size, row * size, size, size).clip(self.world_rect)
+        flags = pygame.SRCALPHA if self.alpha else 0
+        chunk = pygame.Surface(world_rect.size, flags)
+        self.render_chunk(chunk, world_rect)
+        if pygame.display.get_surface():
+            chunk = chunk.convert_alpha() if self.alpha else chunk.convert()
+        self.built += 1
+        return chunk
+
+    def get_chunk(self, col, row):
+        key = (col, row)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = self._build(key)
+            while len(self.chunks) > self.max_cached:
+                self.chunks.popitem(last=False)   # 釋放最久沒用到的區塊
+        else:
+            self.chunks.move_to_end(key)
+        return chunk
+
+    def invalidate(self, world_rect=None):
+        """讓與 world_rect 重疊的區塊 (None 為全部) 下次重新繪製"""
+        if world_rect is None:
+            self.chunks.clear()
+            return
+        size = self.chunk_size
+        world_rect = pygame.Rect(world_rect)
+        for key in [key for key in self.chunks
+                    if world_rect.colliderect((key[0] * size, key[1] * size, size, size))]:
+            del self.chunks[key]
+
+    # ------------------------------------------
+    # 繪製
+    # ------------------------------------------
+    def draw(self, surface, offset=(0, 0)):
+        """
+        把視野內的區塊畫到 surface 上。
+        :param offset: 相機偏移量 (畫面左上角在世界中的座標)
+        :return: 這一幀 blit 的區塊數
+        """
+        size = self.chunk_size
+        view = pygame.Rect(int(offset[0]), int(offset[1]), *surface.get_size()).clip(self.world_rect)
+        if not view.width or not view.height:
+            return 0
+        col0, row0 = view.left // size, view.top // size
+        col1, row1 = (view.right - 1) // size, (view.bottom - 1) // size
+        ox, oy = int(offset[0]), int(offset[1])
+        blits = []
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                blits.append((self.get_chunk(col, row), (col * size - ox, row * size - oy)))
+        surface.blits(blits, doreturn=False)
+        return len(blits)
+
+
+if __name__ == "__main__":
+    # 效能測試：python reference_modules/chunk_cache.py
+    import random
+    import time
+
+    pygame.init()
+    screen = pygame.display.set_mode((1280, 720))
+    frames = 120
+
+    # 1. 原本的寫法：一整張 2500x2500 的 convert_alpha 背景
+    ground_surf = pygame.Surface((2500, 2500), pygame.SRCALPHA)
+    for y in range(0, 2500, 50):
+        for x in range(0, 2500, 50):
+            ground_surf.fill((40, 90 + (x * 7 + y * 3) % 40, 40), (x, y, 50, 50))
+    offset = pygame.math.Vector2()
+    start = time.perf_counter()
+    for frame in range(frames):
+        offset.update(frame * 7 % 1200, frame * 3 % 1700)
+        screen.blit(ground_surf, -offset)
+    big_ms = (time.perf_counter() - start) * 1000 / frames
+
+    # 2. 同一張圖切塊 (不透明)
+    ground = ChunkedBackground.from_surface(ground_surf.convert(), chunk_size=512)
+    start = time.perf_counter()
+    for frame in range(frames):
+        offset.update(frame * 7 % 1200, frame * 3 % 1700)
+        ground.draw(screen, offset)
+    chunk_ms = (time.perf_counter() - start) * 1000 / frames
+
+    # 3. 20000x20000 的 tile 世界 (625x625 格，每格 32px)，鏡頭一路捲過去
+    random.seed(0)
+    tiles = {}
+    for index, color in enumerate([(40, 110, 40), (60, 130, 50), (90, 80, 50), (50, 70, 140)]):
+        tiles[index] = pygame.Surface((32, 32))
+        tiles[index].fill(color)
+    grid = [[random.choice((0, 0, 0, 1, 2, 3)) for _ in range(625)] for _ in range(625)]
+    world = ChunkedBackground.from_tiles(grid, 32, tiles, chunk_size=512)
+    start = time.perf_counter()
+    for frame in range(frames):
+        offset.update(frame * 150, frame * 150)
+        world.draw(screen, offset)
+    world_ms = (time.perf_counter() - start) * 1000 / frames
+    cached_mb = sum(c.get_width() * c.get_height() * c.get_bytesize() for c in world.chunks.values()) / 2 ** 20
+
+    print(f"2500x2500 整張背景 (alpha): {big_ms:.2f} ms/幀")
+    print(f"2500x2500 切塊 (512px)    : {chunk_ms:.2f} ms/幀")
+    print(f"20000x20000 tile 世界     : {world_ms:.2f} ms/幀 (含首次繪製 {world.built} 個區塊)，"
+          f"快取 {len(world.chunks)} 塊 / {cached_mb:.0f} MB (整張圖需要 {20000 * 20000 * 4 / 2 ** 20:.0f} MB)")
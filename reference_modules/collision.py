@@ -1,4 +1,4 @@
-# tags: collision, physics, hitbox, interaction, damage
+# tags: collision, physics, hitbox, interaction, damage, broadphase, spatial-hash, optimization
 import pygame
 
 class CollisionManager:
@@ -6,49 +6,145 @@ class CollisionManager:
     通用碰撞管理器 (Static Utility Class)。
     封裝了 Pygame 的 spritecollide 與 groupcollide，提供更語意化的介面。
     支援「單體 vs 群體」與「群體 vs 群體」的碰撞偵測與回呼 (Callback) 處理。
+    物件數量多時 (大量子彈 vs 大量敵人) 自動改用 Spatial Hash 寬相 (Broadphase)：每幀把被撞的群組
+    一次放進均勻網格，只和同格的物件做矩形檢查，結果 (命中清單與順序、kill 行為) 與 Pygame 原本的函式完全相同。
     """
-    
+
+    # 群組物件數達到此數量才使用 Spatial Hash (太少時直接暴力比對反而較快)
+    BROADPHASE_THRESHOLD = 32
+
+    @staticmethod
+    def build_hash(target_group, cell_size=None):
+        """
+        把群組放進 Spatial Hash。同一幀內要讓很多個 sprite 去撞同一個群組時 (例如每個敵人檢查子彈)，
+        先建一次再傳給 apply_sprite_vs_group(..., spatial_hash=h)，不必每次重建。
+        """
+        return SpatialHash(cell_size).build(target_group)
+
     @staticmethod
-    def apply_sprite_vs_group(sprite, target_group, on_collide=None, kill_sprite=False, kill_target=False):
+    def apply_sprite_vs_group(sprite, target_group, on_collide=None, kill_sprite=False, kill_target=False,
+                              spatial_hash=None):
         """
         偵測「單一角色」撞到「一群物件」 (例如：玩家撞到金幣、玩家撞到敵人)。
-        
+
         :param sprite: 主動碰撞的物件 (Sprite)
         :param target_group: 被撞的群組 (Group)
         :param on_collide: (選用) 碰撞發生時執行的函式，簽章需為 func(sprite, target_sprite)
         :param kill_sprite: 是否在碰撞後刪除 sprite
         :param kill_target: 是否在碰撞後刪除被撞到的 target
+        :param spatial_hash: (選用) 由 build_hash(target_group) 建立的 Spatial Hash，提供時只檢查附近的物件
         :return: 所有發生碰撞的 target 列表
         """
         # 使用 mask 碰撞 (像素級精準) 或 rect 碰撞 (矩形範圍)
         # 預設使用 rect，效率較高
-        hits = pygame.sprite.spritecollide(sprite, target_group, kill_target)
-        
+        if spatial_hash is not None:
+            hits = spatial_hash.query(sprite.rect, target_group)
+            if kill_target:
+                for target in hits:
+                    target.kill()
+        else:
+            hits = pygame.sprite.spritecollide(sprite, target_group, kill_target)
+
         if hits:
             if kill_sprite:
                 sprite.kill()
-                
+
             if on_collide:
                 for target in hits:
                     on_collide(sprite, target)
         return hits
 
     @staticmethod
-    def apply_group_vs_group(group1, group2, on_collide=None, kill_group1=False, kill_group2=False):
+    def apply_group_vs_group(group1, group2, on_collide=None, kill_group1=False, kill_group2=False,
+                             broadphase=None, cell_size=None):
         """
         偵測「一群物件」撞到「另一群物件」 (例如：子彈群 撞到 敵人群)。
-        
+
         :param group1: 主動群組 (如子彈)
         :param group2: 被動群組 (如敵人)
         :param on_collide: (選用) 碰撞發生時執行的函式，簽章需為 func(sprite1, sprite2)
         :param kill_group1: 是否刪除 group1 中發生碰撞的物件
         :param kill_group2: 是否刪除 group2 中發生碰撞的物件
+        :param broadphase: True 強制使用 Spatial Hash、False 強制暴力比對、None 依物件數量自動選擇
+        :param cell_size: Spatial Hash 的格子大小 (None 則依物件尺寸自動決定)
         :return: 碰撞字典 {sprite1: [sprite2, ...]}
         """
-        hits = pygame.sprite.groupcollide(group1, group2, kill_group1, kill_group2)
-        
+        if broadphase is None:
+            broadphase = min(len(group1), len(group2)) >= CollisionManager.BROADPHASE_THRESHOLD
+        if broadphase:
+            hits = SpatialHash(cell_size).build(group2).groupcollide(group1, group2, kill_group1, kill_group2)
+        else:
+            hits = pygame.sprite.groupcollide(group1, group2, kill_group1, kill_group2)
+
         if hits and on_collide:
             for sprite1, targets in hits.items():
                 for sprite2 in targets:
                     on_collide(sprite1, sprite2)
-        return hits
\ No newline at end of file
+        return hits
+
+
+class SpatialHash:
+    """
+    均勻網格的 Spatial Hash，每幀以一次走訪重建。
+    每個物件依 rect 放進它覆蓋到的所有格子，並記錄它在群組中的順序，查詢結果依此排序以與 Pygame 一致。
+    """
+    def __init__(self, cell_size=None):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def build(self, group):
+        sprites = group.sprites()
+        cell = self.cell_size
+        if not cell:
+            # 自動決定格子大小：物件平均邊長的 2 倍 (大多數物件只會落在 1~4 格)
+            total = sum(max(s.rect.width, s.rect.height) for s in sprites)
+            cell = self.cell_size = max(16, int(2 * total / len(sprites))) if sprites else 64
+        cells = self.cells = {}
+        for order, sprite in enumerate(sprites):
+            rect = sprite.rect
+            x0, y0 = rect.left // cell, rect.top // cell
+            x1, y1 = max(x0, (rect.right - 1) // cell), max(y0, (rect.bottom - 1) // cell)
+            entry = (order, sprite)
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    bucket = cells.get((cx, cy))
+                    if bucket is None:
+                        cells[(cx, cy)] = [entry]
+                    else:
+                        bucket.append(entry)
+        return self
+
+    def query(self, rect, group=None):
+        """回傳與 rect 重疊的物件 (依原本群組順序)；提供 group 時略過已不在群組中的物件 (例如已被 kill)"""
+        cell = self.cell_size
+        x0, y0 = rect.left // cell, rect.top // cell
+        x1, y1 = max(x0, (rect.right - 1) // cell), max(y0, (rect.bottom - 1) // cell)
+        cells = self.cells
+        if x0 == x1 and y0 == y1:
+            bucket = cells.get((x0, y0), ())
+            hits = [sprite for _, sprite in bucket if rect.colliderect(sprite.rect)]
+        else:
+            found = {}
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    for order, sprite in cells.get((cx, cy), ()):
+                        if order not in found and rect.colliderect(sprite.rect):
+                            found[order] = sprite
+            hits = [found[order] for order in sorted(found)]
+        if group is not None:
+            hits = [sprite for sprite in hits if sprite in group]
+        return hits
+
+    def groupcollide(self, group1, group2, kill1=False, kill2=False):
+        """與 pygame.sprite.groupcollide 相同的結果；group2 必須是 build 時的群組"""
+        crashed = {}
+        for sprite in (group1.sprites() if kill1 else group1):
+            hits = self.query(sprite.rect, group2 if kill2 else None)
+            if hits:
+                if kill2:
+                    for target in hits:
+                        target.kill()   # 與 Pygame 相同：被撞掉的物件不會再被後面的 sprite 撞到
+                crashed[sprite] = hits
+                if kill1:
+                    sprite.kill()
+        return crashed
@@ -0,0 +1,202 @@
+# tags: rendering, dirty-rect, optimization, static-screen, display-update, fps, hud
+import pygame
+
+class DirtyRenderer:
+    """
+    髒矩形渲染器 (Dirty Rect Rendering)，適用於畫面不捲動的遊戲 (貪食蛇、固定畫面射擊、益智遊戲)。
+    每幀比對每個物件上一次畫的位置與圖片，只在有變化的區域補回背景、重畫相關物件，
+    最後以 pygame.display.update(rects) 只更新這些區域，取代每幀整個畫面重畫 + display.flip()。
+    變動區域太大或太零碎時自動改為整個畫面重畫 (此時反而比較快)。
+    物件規則與 LayeredDirty 相同：換了 image 或 rect 會自動偵測；若是直接在原本的 image 上作畫，
+    請設定 sprite.dirty = 1 (重畫一次) 或 2 (每幀都重畫)。
+    blit() 的圖片預設以 Surface 物件判斷是否改變，每幀重新 render 的文字請傳入 key (例如文字內容)，否則每幀都會重畫。
+    用法：
+        renderer = DirtyRenderer(background_surface)    # 或背景顏色 (30, 30, 30)
+        # 遊戲迴圈
+        all_sprites.update()
+        renderer.blit(font.render(f"Score {score}", True, WHITE), (10, 10), key=score)   # HUD 等非 Sprite 的圖片
+        renderer.draw(all_sprites)                      # 取代 screen.fill + draw + display.flip()
+    換場景或更換背景時呼叫 renderer.invalidate() (或 set_background) 讓下一幀整個畫面重畫。
+    """
+    def __init__(self, background, full_redraw_ratio=0.5, max_rects=48):
+        """
+        :param background: 背景 Surface (與視窗同大小) 或背景顏色
+        :param full_redraw_ratio: 變動面積超過畫面的這個比例時改為整個畫面重畫
+        :param max_rects: 合併後的變動區域超過這個數量時改為整個畫面重畫
+        """
+        self.screen = pygame.display.get_surface()
+        self.screen_rect = self.screen.get_rect()
+        self.full_redraw_ratio = full_redraw_ratio
+        self.max_rects = max_rects
+        self.set_background(background)
+        self._last = {}          # sprite -> (上次畫的 rect, 上次的 image)
+        self._last_overlays = []
+        self._overlays = []      # 這一幀 blit() 的圖片
+        self._marked = []        # mark_dirty() 標記的區域
+        self.last_mode = None    # 上一幀使用的模式："dirty" 或 "full" (除錯用)
+        self.last_rects = 0      # 上一幀更新的區域數量
+
+    def set_background(self, background):
+        if isinstance(background, pygame.Surface):
+            self.background = background
+        else:
+            self.background = pygame.Surface(self.screen_rect.size).convert()
+            self.background.fill(background)
+        self.invalidate()
+
+    def invalidate(self):
+        """下一幀整個畫面重畫"""
+        self._full = True
+
+    def mark_dirty(self, rect):
+        """手動標記需要重畫的區域 (例如直接畫在背景上的東西改變了)"""
+        self._marked.append(pygame.Rect(rect))
+
+    def blit(self, surface, pos, key=None):
+        """
+        在這一幀的物件之上畫一張圖 (HUD 文字、分數等)，draw() 時才真正畫上去。
+        :param key: (選用) 圖片內容的識別，例如文字或 (文字, 顏色)；與上一幀相同且位置不變時不重畫。
+                    未提供時以 Surface 物件本身判斷 (每幀 font.render 出新的 Surface 就會每幀重畫)
+        """
+        self._overlays.append((surface, surface.get_rect(topleft=pos), surface if key is None else key))
+
+    @staticmethod
+    def _merge(rects):
+        """合併互相重疊的區域，避免同一塊背景被補好幾次"""
+        merged = []
+        for rect in rects:
+            index = rect.collidelist(merged)
+            while index != -1:
+                rect = rect.union(merged.pop(index))
+                index = rect.collidelist(merged)
+            merged.append(rect)
+        return merged
+
+    def draw(self, *groups):
+        """
+        繪製所有群組 (依傳入順序，群組內依加入順序) 與 blit() 的圖片，並更新畫面。
+        :return: 這一幀更新的區域列表
+        """
+        screen = self.screen
+        items = []     # (sprite 或 None, rect, image)
+        for group in groups:
+            for sprite in group:
+                items.append((sprite, sprite.rect.copy(), sprite.image))
+        overlays = self._overlays
+        self._overlays = []
+
+        # 1. 找出有變化的區域 (舊位置 + 新位置)
+        dirty = self._marked
+        self._marked = []
+        last = self._last
+        current = {}
+        for sprite, rect, image in items:
+            current[sprite] = (rect, image)
+            previous = last.pop(sprite, None)
+            flag = getattr(sprite, "dirty", 0)
+            if previous is None:
+                dirty.append(rect)
+            elif flag or previous[0] != rect or previous[1] is not image:
+                dirty.append(previous[0])
+                dirty.append(rect)
+            if flag == 1:
+                sprite.dirty = 0
+        for rect, _ in last.values():   # 已經不在群組中的物件
+            dirty.append(rect)
+        if [(rect, key) for _, rect, key in overlays] != [(rect, key) for _, rect, key in self._last_overlays]:
+            dirty.extend(rect for _, rect, _ in self._last_overlays)
+            dirty.extend(rect for _, rect, _ in overlays)
+        self._last = current
+        self._last_overlays = overlays
+
+        screen_rect = self.screen_rect
+        if len(dirty) > self.max_rects * 4:
+            self._full = True   # 變動的物件太多，不必再花時間合併區域
+        if not self._full:
+            dirty = self._merge([rect.clip(screen_rect) for rect in dirty if rect.colliderect(screen_rect)])
+        area = sum(rect.width * rect.height for rect in dirty)
+
+        # 2. 變動太大或太零碎時，整個畫面重畫比較快
+        if self._full or len(dirty) > self.max_rects or area > screen_rect.width * screen_rect.height * self.full_redraw_ratio:
+            self._full = False
+            screen.blit(self.background, (0, 0))
+            for sprite, rect, image in items:
+                screen.blit(image, rect)
+            for image, rect, _ in overlays:
+                screen.blit(image, rect)
+            pygame.display.flip()
+            self.last_mode, self.last_rects = "full", 1
+            return [screen_rect]
+
+        # 3. 只在變動區域補背景並重畫與它重疊的物件 (用 clip 避免半透明物件被重複疊色)
+        if dirty:
+            layers = items + [(None, rect, image) for image, rect, _ in overlays]
+            layer_rects = [rect for _, rect, _ in layers]
+            for area_rect in dirty:
+                screen.set_clip(area_rect)
+                screen.blit(self.background, area_rect, area_rect)
+                for index in area_rect.collidelistall(layer_rects):
+                    _, rect, image = layers[index]
+                    screen.blit(image, rect)
+            screen.set_clip(None)
+            pygame.display.update(dirty)
+        self.last_mode, self.last_rects = "dirty", len(dirty)
+        return dirty
+
+
+if __name__ == "__main__":
+    # 效能測試：python reference_modules/dirty_render.py (比較每幀整個畫面重畫與髒矩形渲染)
+    import random
+    import time
+
+    pygame.init()
+    screen = pygame.display.set_mode((800, 600))
+    background = pygame.Surface((800, 600)).convert()
+    for y in range(0, 600, 40):
+        for x in range(0, 800, 40):
+            background.fill((30 + (x + y) % 80 // 4, 40, 50), (x, y, 40, 40))
+
+    class Mover(pygame.sprite.Sprite):
+        def __init__(self, group):
+            super().__init__(group)
+            self.image = pygame.Surface((20, 20), pygame.SRCALPHA)
+            pygame.draw.circle(self.image, (240, 200, 60, 200), (10, 10), 10)
+            self.rect = self.image.get_rect(center=(random.randint(0, 800), random.randint(0, 600)))
+
+        def update(self):
+            self.rect.move_ip(random.choice((-4, 0, 4)), random.choice((-4, 0, 4)))
+            self.rect.clamp_ip(screen.get_rect())
+
+    random.seed(0)
+    font = pygame.font.Font(None, 28)
+    for moving in (10, 40, 200):
+        group = pygame.sprite.Group()
+        statics = pygame.sprite.Group()
+        for _ in range(moving):
+            Mover(group)
+        for _ in range(300):   # 不動的牆壁 / 道具
+            wall = pygame.sprite.Sprite(statics)
+            wall.image = pygame.Surface((20, 20)).convert()
+            wall.image.fill((90, 90, 90))
+            wall.rect = wall.image.get_rect(topleft=(random.randrange(0, 780, 20), random.randrange(0, 580, 20)))
+
+        frames = 120
+        start = time.perf_counter()
+        for frame in range(frames):
+            group.update()
+            screen.blit(background, (0, 0))
+            statics.draw(screen)
+            group.draw(screen)
+            screen.blit(font.render(f"Score {frame // 10}", True, (255, 255, 255)), (10, 10))
+            pygame.display.flip()
+        full_ms = (time.perf_counter() - start) * 1000 / frames
+
+        renderer = DirtyRenderer(background)
+        start = time.perf_counter()
+        for frame in range(frames):
+            group.update()
+            renderer.blit(font.render(f"Score {frame // 10}", True, (255, 255, 255)), (10, 10), key=frame // 10)
+            renderer.draw(statics, group)
+        dirty_ms = (time.perf_counter() - start) * 1000 / frames
+        print(f"{moving:>4} 個移動物件: 整個畫面重畫 {full_ms:.2f} ms/幀 | DirtyRenderer {dirty_ms:.2f} ms/幀 "
+              f"(最後一幀模式: {renderer.last_mode}, {renderer.last_rects} 個區域)")
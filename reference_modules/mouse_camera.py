@@ -8,7 +8,7 @@ class MouseCameraGroup(pygame.sprite.Group):
     功能：
     1. 當滑鼠游標移動到視窗邊緣時，相機自動捲動。
     2. 實作了「滑鼠鎖定/回彈」機制，當游標超出邊界時會自動彈回，產生無限捲動的手感。
-    3. 內建 Y-Sort (深度排序) 渲染。
+    3. 內建 Y-Sort (深度排序) 渲染，只繪製視野內的物件，並沿用上一幀的順序排序。
     
     適用遊戲類型：RTS (即時戰略)、模擬經營、塔防遊戲。
     """
@@ -40,6 +40,10 @@ class MouseCameraGroup(pygame.sprite.Group):
             
         self.ground_rect = self.ground_surf.get_rect(topleft=(0, 0))
 
+        # 視野裁切 (Culling) 與 Y-Sort 繪製清單
+        self.cull_margin = 100   # 視野外多畫一圈 (像素)，避免大圖片在畫面邊緣突然出現
+        self.draw_list = []      # 上一幀的繪製順序
+
     def mouse_control(self):
         """核心邏輯：偵測滑鼠位置並更新相機偏移量"""
         mouse = pygame.math.Vector2(pygame.mouse.get_pos())
@@ -86,6 +90,24 @@ class MouseCameraGroup(pygame.sprite.Group):
         # 更新相機總偏移量
         self.offset += mouse_offset_vector * self.mouse_speed
 
+    def visible_sprites(self):
+        """
+        視野內 (往外擴 cull_margin) 的物件，依 centery 排序 (Y-Sort)。
+        從上一幀的順序開始排序：list.sort (Timsort) 對幾乎排好的清單接近線性時間。
+        """
+        screen_w, screen_h = self.display_surface.get_size()
+        margin = self.cull_margin
+        view = pygame.Rect(self.offset.x - margin, self.offset.y - margin, screen_w + 2 * margin, screen_h + 2 * margin)
+        sprites = self.sprites()
+        visible = {sprite for sprite in sprites if view.colliderect(sprite.rect)}
+        draw_list = [sprite for sprite in self.draw_list if sprite in visible]
+        if len(draw_list) < len(visible):   # 新進入視野 (或新加入群組) 的物件
+            listed = set(draw_list)
+            draw_list.extend(sprite for sprite in sprites if sprite in visible and sprite not in listed)
+        draw_list.sort(key=lambda sprite: sprite.rect.centery)
+        self.draw_list = draw_list
+        return draw_list
+
     def custom_draw(self):
         """渲染循環：呼叫滑鼠控制 + Y-Sort 繪製"""
         
@@ -96,7 +118,7 @@ class MouseCameraGroup(pygame.sprite.Group):
         ground_offset = self.ground_rect.topleft - self.offset
         self.display_surface.blit(self.ground_surf, ground_offset)
         
-        # 2. 畫角色 (Y-Sort)
-        for sprite in sorted(self.sprites(), key=lambda sprite: sprite.rect.centery):
+        # 2. 畫角色 (Y-Sort，只畫視野內的物件)
+        for sprite in self.visible_sprites():
             offset_pos = sprite.rect.topleft - self.offset
             self.display_surface.blit(sprite.image, offset_pos)
\ No newline at end of file
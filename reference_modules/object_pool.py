@@ -1,24 +1,102 @@
-# tags: optimization, memory, pool
+# tags: optimization, memory, pool, bullet, spawn, recycle
 class ObjectPool:
-    """簡易的物件池，用於重複使用子彈或敵人，避免頻繁的記憶體配置"""
-    def __init__(self, cls, size=100):
-        # 預先建立一批物件
-        self.pool = [cls() for _ in range(size)]
-        self.active = []
+    """
+    O(1) 物件池，用於重複使用子彈、敵人、特效等大量生成/消失的物件，避免頻繁的記憶體配置。
+    get() 與 release() 都是 O(1)：每個使用中的物件記錄自己在 active 陣列中的索引 (_pool_index)，
+    release 時把 active 最後一個物件搬到空出的位置 (swap-remove)，不需要搜尋整個串列；重複 release 會被安全忽略。
+    池子空了會依 grow 策略自動擴充，閒置物件過多時依 shrink_ratio 釋放；stats() 提供使用中數量、最高使用量等統計。
+    只有 grow=None 或已達 max_size 時 get() 才會回傳 None，使用這兩個設定時呼叫端必須檢查 None。
+    用法：pool = ObjectPool(Bullet, size=200)；bullet = pool.get(x, y)；子彈 kill() 時呼叫 pool.release(self)。
+    pool 只負責生產/回收，渲染與碰撞仍使用 pygame.sprite.Group。
+    """
+    def __init__(self, cls, size=100, grow="double", max_size=None, shrink_ratio=None, factory=None):
+        """
+        :param cls: 物件類別，必須能以 cls() 無參數建立 (或提供 factory)
+        :param size: 預先建立的物件數量
+        :param grow: 池子空了的處理方式："double" (加倍)、整數 (每次多建立幾個) 或 None (不擴充，get 回傳 None)
+        :param max_size: 物件總數上限 (None 為不限制)，達到上限時 get 回傳 None
+        :param shrink_ratio: 閒置物件超過 max(使用中數量, size) 的幾倍時釋放多餘的閒置物件 (None 為不縮小)
+        :param factory: 自訂建立物件的函式 (預設為 cls)
+        """
+        self.factory = factory or cls
+        self.initial_size = size
+        self.grow = grow
+        self.max_size = max_size
+        self.shrink_ratio = shrink_ratio
+        self.pool = [self.factory() for _ in range(size)]   # 閒置物件 (從尾端取用)
+        self.active = []                                      # 使用中的物件
+        self.created = size
+        self.high_water = 0     # 同時使用中的最大數量
+        self.grown = 0          # 擴充次數
+        self.exhausted = 0      # get 拿不到物件的次數
+
+    def _grow_pool(self):
+        if self.grow is None:
+            return
+        amount = max(self.created, 1) if self.grow == "double" else int(self.grow)
+        if self.max_size is not None:
+            amount = min(amount, self.max_size - self.created)
+        if amount <= 0:
+            return
+        self.pool.extend(self.factory() for _ in range(amount))
+        self.created += amount
+        self.grown += 1
 
     def get(self, *args, **kwargs):
-        """從池中取出一個物件並初始化"""
-        if self.pool:
-            obj = self.pool.pop()
-            # 假設物件都有一個 init 方法來重置狀態
-            if hasattr(obj, 'init'):
-                obj.init(*args, **kwargs)
-            self.active.append(obj)
-            return obj
-        return None # 池子空了
+        """從池中取出一個物件並初始化 (物件有 init 方法時以參數呼叫)；無法取得時回傳 None"""
+        if not self.pool:
+            self._grow_pool()
+            if not self.pool:
+                self.exhausted += 1
+                return None
+        obj = self.pool.pop()
+        obj._pool_index = len(self.active)
+        self.active.append(obj)
+        if len(self.active) > self.high_water:
+            self.high_water = len(self.active)
+        # 假設物件都有一個 init 方法來重置狀態
+        if hasattr(obj, 'init'):
+            obj.init(*args, **kwargs)
+        return obj
 
     def release(self, obj):
-        """將物件放回池中"""
-        if obj in self.active:
-            self.active.remove(obj)
-            self.pool.append(obj)
\ No newline at end of file
+        """將物件放回池中 (O(1))；物件不在使用中 (例如重複 release) 時回傳 False"""
+        index = getattr(obj, '_pool_index', -1)
+        if index < 0 or index >= len(self.active) or self.active[index] is not obj:
+            return False
+        last = self.active.pop()
+        if last is not obj:
+            # 把最後一個物件搬到空出的位置
+            self.active[index] = last
+            last._pool_index = index
+        obj._pool_index = -1
+        self.pool.append(obj)
+        if self.shrink_ratio is not None:
+            self._shrink()
+        return True
+
+    def _shrink(self):
+        keep = int(max(len(self.active), self.initial_size) * self.shrink_ratio)
+        if len(self.pool) > keep * 2:   # 超過兩倍才一次裁切，攤銷後仍是 O(1)
+            removed = len(self.pool) - keep
+            del self.pool[keep:]
+            self.created -= removed
+
+    def release_all(self):
+        """把所有使用中的物件放回池中 (例如重新開始關卡)；Sprite Group 需另外 empty()。回傳放回的數量"""
+        count = len(self.active)
+        for obj in self.active:
+            obj._pool_index = -1
+        self.pool.extend(self.active)
+        self.active = []
+        return count
+
+    def stats(self):
+        return {
+            "active": len(self.active),
+            "idle": len(self.pool),
+            "created": self.created,
+            "high_water": self.high_water,
+            "grown": self.grown,
+            "exhausted": self.exhausted
+        }
@@ -0,0 +1,321 @@
+# tags: quadtree, loose-quadtree, spatial-partition, optimization, neighbor-query, nearest, range-query, clustering, collision
+import heapq
+import math
+import pygame
+
+class QuadNode:
+    __slots__ = ("x0", "y0", "x1", "y1", "lx0", "ly0", "lx1", "ly1", "depth", "parent", "items", "children", "count")
+
+    def __init__(self, x0, y0, x1, y1, depth, parent, looseness):
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+        if parent is None:
+            # 根節點接受任何位置的物件 (包含超出世界範圍的)
+            self.lx0 = self.ly0 = -math.inf
+            self.lx1 = self.ly1 = math.inf
+        else:
+            pad_x = (x1 - x0) * (looseness - 1) / 2
+            pad_y = (y1 - y0) * (looseness - 1) / 2
+            self.lx0, self.ly0, self.lx1, self.ly1 = x0 - pad_x, y0 - pad_y, x1 + pad_x, y1 + pad_y
+        self.depth = depth
+        self.parent = parent
+        self.items = {}         # 存在這個節點的物件 (dict：O(1) 移除)
+        self.children = None    # 分裂後為 4 個子節點 [左上, 右上, 左下, 右下]
+        self.count = 0          # 整棵子樹的物件數 (查詢時略過空的子樹)
+
+
+class QuadTree:
+    """
+    鬆散四元樹 (Loose Quadtree)，適合物件分布不均的場景 (敵人全部湧向基地、怪物圍住玩家)。
+    均勻網格在物件擠在一起時，少數格子會塞滿物件、其他格子全空；四元樹會在密集處自動細分。
+    「鬆散」指每個節點的邊界往外擴 (looseness 倍)，物件依中心點放進子節點，只要 rect 還在鬆散邊界內就不用搬移，
+    所以小幅移動的 update() 通常是 O(1)。
+    API 與 SpatialGrid 相同 (insert/update/remove/query_rect/query_radius/k_nearest/nearest)，可以直接互換；
+    另外提供 rebuild(objects) 一次由上而下建樹 (物件每幀都大幅移動時比逐一 update 快)。
+    用法：
+        tree = QuadTree((0, 0, WORLD_W, WORLD_H))
+        tree.rebuild(enemies)                # 或逐一 tree.insert(enemy)
+        tree.update(enemy)                   # 移動後呼叫
+        tree.remove(enemy)                   # kill() 時呼叫
+        tree.query_radius(tower.rect.center, 200)
+        tree.nearest(player.rect.center, max_radius=500)
+    執行 python reference_modules/quadtree.py 可比較均勻分布與群聚分布下它和 SpatialGrid 的效能。
+    """
+    def __init__(self, bounds, max_items=8, max_depth=8, looseness=2.0):
+        """
+        :param bounds: 世界範圍 (x, y, w, h)
+        :param max_items: 節點物件數超過此值時分裂
+        :param max_depth: 最大深度
+        :param looseness: 鬆散邊界倍率 (2.0 表示節點邊界往外擴一半的邊長)
+        """
+        self.bounds = pygame.Rect(bounds)
+        self.max_items = max_items
+        self.max_depth = max_depth
+        self.looseness = looseness
+        self._where = {}    # 物件 -> 所在節點
+        self.clear()
+
+    # ------------------------------------------
+    # 內部工具
+    # ------------------------------------------
+    @staticmethod
+    def _fits(node, rect):
+        return node.lx0 <= rect.left and rect.right <= node.lx1 and node.ly0 <= rect.top and rect.bottom <= node.ly1
+
+    def _child_for(self, node, rect):
+        """依 rect 中心選子節點；放不進該子節點的鬆散邊界時回傳 None (留在目前的節點)"""
+        cx, cy = rect.center
+        index = (cx >= (node.x0 + node.x1) / 2) + 2 * (cy >= (node.y0 + node.y1) / 2)
+        child = node.children[index]
+        return child if self._fits(child, rect) else None
+
+    def _split(self, node):
+        x0, y0, x1, y1 = node.x0, node.y0, node.x1, node.y1
+        mx, my = (x0 + x1) / 2, (y0 + y1) / 2
+        depth = node.depth + 1
+        node.children = [
+            QuadNode(x0, y0, mx, my, depth, node, self.looseness),
+            QuadNode(mx, y0, x1, my, depth, node, self.looseness),
+            QuadNode(x0, my, mx, y1, depth, node, self.looseness),
+            QuadNode(mx, my, x1, y1, depth, node, self.looseness),
+        ]
+        where = self._where
+        for obj in list(node.items):
+            child = self._child_for(node, obj.rect)
+            if child is not None:
+                del node.items[obj]
+                child.items[obj] = None
+                child.count += 1
+                where[obj] = child
+        for child in node.children:
+            if len(child.items) > self.max_items and depth < self.max_depth:
+                self._split(child)
+
+    def _collapse(self, node):
+        """子樹物件很少時把子節點合併回 node，避免留下大量空節點"""
+        stack = list(node.children)
+        while stack:
+            child = stack.pop()
+            for obj in child.items:
+                node.items[obj] = None
+                self._where[obj] = node
+            if child.children:
+                stack.extend(child.children)
+        node.children = None
+
+    def _place(self, obj, rect):
+        node = self.root
+        while node.children is not None:
+            child = self._child_for(node, rect)
+            if child is None:
+                break
+            node = child
+        node.items[obj] = None
+        self._where[obj] = node
+        parent = node
+        while parent is not None:
+            parent.count += 1
+            parent = parent.parent
+        if node.children is None and len(node.items) > self.max_items and node.depth < self.max_depth:
+            self._split(node)
+
+    def _unplace(self, obj):
+        node = self._where.pop(obj)
+        del node.items[obj]
+        target = None
+        while node is not None:
+            node.count -= 1
+            if node.children is not None and node.count <= self.max_items // 2:
+                target = node   # 記下最上層可合併的節點
+            node = node.parent
+        if target is not None:
+            self._collapse(target)
+
+    # ------------------------------------------
+    # 維護
+    # ------------------------------------------
+    def clear(self):
+        b = self.bounds
+        self.root = QuadNode(b.left, b.top, b.right, b.bottom, 0, None, self.looseness)
+        self._where.clear()
+
+    def rebuild(self, objects):
+        """清空後一次放入所有物件 (由上而下分裂，比逐一 insert 快)"""
+        self.clear()
+        root = self.root
+        root.items = dict.fromkeys(objects)
+        root.count = len(root.items)
+        self._where = dict.fromkeys(root.items, root)
+        if root.count > self.max_items and self.max_depth > 0:
+            self._split(root)
+
+    def insert(self, obj, rect=None):
+        if obj in self._where:
+            return self.update(obj, rect)
+        self._place(obj, obj.rect if rect is None else rect)
+
+    def update(self, obj, rect=None):
+        """物件移動後呼叫；仍在所在節點的鬆散邊界內 (且不能往下放) 時直接返回"""
+        rect = obj.rect if rect is None else rect
+        node = self._where.get(obj)
+        if node is not None:
+            if self._fits(node, rect) and (node.children is None or self._child_for(node, rect) is None):
+                return
+            self._unplace(obj)
+        self._place(obj, rect)
+
+    def remove(self, obj):
+        if obj in self._where:
+            self._unplace(obj)
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, obj):
+        return obj in self._where
+
+    # ------------------------------------------
+    # 查詢
+    # ------------------------------------------
+    def _nodes_overlapping(self, left, top, right, bottom):
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.count == 0 or node.lx1 < left or node.lx0 > right or node.ly1 < top or node.ly0 > bottom:
+                continue
+            yield node
+            if node.children is not None:
+                stack.extend(node.children)
+
+    def query_rect(self, rect):
+        """與 rect 重疊的物件"""
+        rect = pygame.Rect(rect)
+        hits = []
+        for node in self._nodes_overlapping(rect.left, rect.top, rect.right, rect.bottom):
+            for obj in node.items:
+                if rect.colliderect(obj.rect):
+                    hits.append(obj)
+        return hits
+
+    def query_radius(self, center, radius):
+        """rect 中心在 center 半徑 radius 以內的物件 (依距離由近到遠)"""
+        cx, cy = center
+        radius_sq = radius * radius
+        hits = []
+        for node in self._nodes_overlapping(cx - radius, cy - radius, cx + radius, cy + radius):
+            for obj in node.items:
+                ox, oy = obj.rect.center
+                dist_sq = (ox - cx) ** 2 + (oy - cy) ** 2
+                if dist_sq <= radius_sq:
+                    hits.append((dist_sq, obj))
+        hits.sort(key=lambda item: item[0])
+        return [obj for _, obj in hits]
+
+    def k_nearest(self, point, k=1, max_radius=None, exclude=None):
+        """
+        離 point 最近的 k 個物件 (以 rect 中心距離計算，由近到遠)。
+        依節點鬆散邊界與 point 的最短距離做 best-first 搜尋，確定剩下的節點都更遠時就停止。
+        :param max_radius: 只找這個距離以內的物件 (None 為不限)
+        :param exclude: 要略過的物件 (例如自己)
+        """
+        px, py = point
+        limit_sq = max_radius * max_radius if max_radius is not None else math.inf
+        best = []                       # max-heap (負距離)，保留最近的 k 個
+        frontier = [(0, 0, self.root)]  # (節點最短距離平方, 序號, 節點)
+        order = 1
+        while frontier:
+            bound_sq, _, node = heapq.heappop(frontier)
+            if bound_sq > limit_sq or (len(best) == k and bound_sq > -best[0][0]):
+                break
+            for obj in node.items:
+                if obj is exclude:
+                    continue
+                ox, oy = obj.rect.center
+                dist_sq = (ox - px) ** 2 + (oy - py) ** 2
+                if dist_sq > limit_sq:
+                    continue
+                if len(best) < k:
+                    heapq.heappush(best, (-dist_sq, id(obj), obj))
+                elif dist_sq < -best[0][0]:
+                    heapq.heapreplace(best, (-dist_sq, id(obj), obj))
+            if node.children is not None:
+                for child in node.children:
+                    if child.count:
+                        dx = max(child.lx0 - px, 0, px - child.lx1)
+                        dy = max(child.ly0 - py, 0, py - child.ly1)
+                        heapq.heappush(frontier, (dx * dx + dy * dy, order, child))
+                        order += 1
+        return [obj for _, _, obj in sorted(best, key=lambda item: -item[0])]
+
+    def nearest(self, point, max_radius=None, exclude=None):
+        """離 point 最近的物件，找不到時回傳 None"""
+        result = self.k_nearest(point, 1, max_radius, exclude)
+        return result[0] if result else None
+
+
+if __name__ == "__main__":
+    # 效能測試：python reference_modules/quadtree.py (均勻分布 vs 群聚分布，與 SpatialGrid 比較)
+    import random
+    import time
+    from spatial_grid import SpatialGrid
+
+    WORLD = 4000
+
+    class Unit:
+        def __init__(self, x, y):
+            self.rect = pygame.Rect(int(x), int(y), 24, 24)
+            self.velocity = (random.uniform(-2, 2), random.uniform(-2, 2))
+
+    def spawn(count, clustered):
+        units = []
+        for _ in range(count):
+            if clustered:
+                # 90% 的單位擠在基地附近半徑 250 內
+                if random.random() < 0.9:
+                    angle, dist = random.uniform(0, math.tau), random.uniform(0, 250)
+                    x, y = WORLD / 2 + math.cos(angle) * dist, WORLD / 2 + math.sin(angle) * dist
+                else:
+                    x, y = random.uniform(0, WORLD - 24), random.uniform(0, WORLD - 24)
+            else:
+                x, y = random.uniform(0, WORLD - 24), random.uniform(0, WORLD - 24)
+            units.append(Unit(x, y))
+        return units
+
+    def bench(index, units, frames=30):
+        start = time.perf_counter()
+        for _ in range(frames):
+            for unit in units:
+                unit.rect.move_ip(unit.velocity)
+                index.update(unit)
+        update_ms = (time.perf_counter() - start) * 1000 / frames
+        probes = units[:200]
+        start = time.perf_counter()
+        for unit in probes:
+            index.query_radius(unit.rect.center, 150)
+        radius_us = (time.perf_counter() - start) * 1e6 / len(probes)
+        start = time.perf_counter()
+        for unit in probes:
+            index.k_nearest(unit.rect.center, 5, exclude=unit)
+        nearest_us = (time.perf_counter() - start) * 1e6 / len(probes)
+        return update_ms, radius_us, nearest_us
+
+    for clustered in (False, True):
+        for count in (2000, 5000):
+            random.seed(1)
+            units = spawn(count, clustered)
+            label = "群聚" if clustered else "均勻"
+
+            grid = SpatialGrid(WORLD, WORLD, cell_size=64)
+            for unit in units:
+                grid.insert(unit)
+            g_update, g_radius, g_nearest = bench(grid, units)
+
+            tree = QuadTree((0, 0, WORLD, WORLD))
+            start = time.perf_counter()
+            tree.rebuild(units)
+            rebuild_ms = (time.perf_counter() - start) * 1000
+            t_update, t_radius, t_nearest = bench(tree, units)
+
+            print(f"[{label} {count:>5}] SpatialGrid: update {g_update:.2f} ms/幀, query_radius {g_radius:.0f} µs, "
+                  f"5-nearest {g_nearest:.0f} µs")
+            print(f"{'':>13}QuadTree:    update {t_update:.2f} ms/幀, query_radius {t_radius:.0f} µs, "
+                  f"5-nearest {t_nearest:.0f} µs, rebuild {rebuild_ms:.1f} ms")
@@ -0,0 +1,229 @@
+# tags: spatial-grid, spatial-partition, optimization, neighbor-query, nearest, range-query, ai, collision
+import heapq
+import math
+import pygame
+
+class SpatialGrid:
+    """
+    增量式空間網格 (Incremental Spatial Grid)，用於大量單位的範圍查詢 (塔的射程、AI 找最近的敵人、附近的碰撞對象)。
+    格子存在一維陣列中 (index = row * cols + col)，每格是 dict (O(1) 加入/移除)，
+    每個物件記住自己目前佔用的格子範圍：移動後仍在同一格時 update() 什麼都不用做，跨格時只更新差異的格子。
+    不需要每幀 clear() 再全部重新插入。
+    用法：
+        grid = SpatialGrid(WORLD_W, WORLD_H, cell_size=64)
+        grid.insert(enemy)               # 物件需有 rect
+        grid.update(enemy)               # 每次移動後呼叫 (同格時幾乎沒有成本)
+        grid.remove(enemy)               # kill() 時呼叫
+        grid.query_radius(tower.rect.center, 200)
+        grid.nearest(player.rect.center, max_radius=500)
+    """
+    def __init__(self, world_width, world_height, cell_size=64):
+        self.cell_size = cell_size
+        self.cols = max(1, math.ceil(world_width / cell_size))
+        self.rows = max(1, math.ceil(world_height / cell_size))
+        self.cells = [None] * (self.cols * self.rows)   # 第一次用到才建立 dict
+        self._where = {}                                # 物件 -> 佔用的格子範圍 (c0, r0, c1, r1)
+
+    # ------------------------------------------
+    # 內部工具
+    # ------------------------------------------
+    def _span(self, rect):
+        """rect 覆蓋的格子範圍 (超出世界的部分併入邊緣的格子)"""
+        cs, cols, rows = self.cell_size, self.cols, self.rows
+        c0 = min(max(rect.left // cs, 0), cols - 1)
+        r0 = min(max(rect.top // cs, 0), rows - 1)
+        c1 = min(max((rect.right - 1) // cs, c0), cols - 1)
+        r1 = min(max((rect.bottom - 1) // cs, r0), rows - 1)
+        return c0, r0, c1, r1
+
+    def _add(self, obj, span):
+        c0, r0, c1, r1 = span
+        cells, cols = self.cells, self.cols
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                index = r * cols + c
+                cell = cells[index]
+                if cell is None:
+                    cell = cells[index] = {}
+                cell[obj] = None
+
+    def _discard(self, obj, span):
+        c0, r0, c1, r1 = span
+        cells, cols = self.cells, self.cols
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                cells[r * cols + c].pop(obj, None)
+
+    # ------------------------------------------
+    # 維護
+    # ------------------------------------------
+    def insert(self, obj, rect=None):
+        if obj in self._where:
+            return self.update(obj, rect)
+        span = self._span(obj.rect if rect is None else rect)
+        self._where[obj] = span
+        self._add(obj, span)
+
+    def update(self, obj, rect=None):
+        """物件移動後呼叫；仍在同樣的格子時直接返回"""
+        old = self._where.get(obj)
+        span = self._span(obj.rect if rect is None else rect)
+        if span == old:
+            return
+        if old is None:
+            self._where[obj] = span
+            self._add(obj, span)
+            return
+        self._where[obj] = span
+        if old[0] == old[2] and old[1] == old[3] and span[0] == span[2] and span[1] == span[3]:
+            # 最常見的情況：單格物件移到相鄰的格子
+            self.cells[old[1] * self.cols + old[0]].pop(obj, None)
+            self._add(obj, span)
+        else:
+            self._discard(obj, old)
+            self._add(obj, span)
+
+    def remove(self, obj):
+        span = self._where.pop(obj, None)
+        if span is not None:
+            self._discard(obj, span)
+
+    def clear(self):
+        self.cells = [None] * (self.cols * self.rows)
+        self._where.clear()
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, obj):
+        return obj in self._where
+
+    # ------------------------------------------
+    # 查詢
+    # ------------------------------------------
+    def _collect(self, span):
+        c0, r0, c1, r1 = span
+        cells, cols = self.cells, self.cols
+        found = {}
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                cell = cells[r * cols + c]
+                if cell:
+                    found.update(cell)
+        return found
+
+    def query_rect(self, rect):
+        """與 rect 重疊的物件"""
+        rect = pygame.Rect(rect)
+        return [obj for obj in self._collect(self._span(rect)) if rect.colliderect(obj.rect)]
+
+    def query_radius(self, center, radius):
+        """rect 中心在 center 半徑 radius 以內的物件 (依距離由近到遠)"""
+        cx, cy = center
+        span = self._span(pygame.Rect(cx - radius, cy - radius, 2 * radius + 1, 2 * radius + 1))
+        radius_sq = radius * radius
+        hits = []
+        for obj in self._collect(span):
+            ox, oy = obj.rect.center
+            dist_sq = (ox - cx) ** 2 + (oy - cy) ** 2
+            if dist_sq <= radius_sq:
+                hits.append((dist_sq, obj))
+        hits.sort(key=lambda item: item[0])
+        return [obj for _, obj in hits]
+
+    def k_nearest(self, point, k=1, max_radius=None, exclude=None):
+        """
+        離 point 最近的 k 個物件 (以 rect 中心距離計算，由近到遠)。
+        從 point 所在的格子一圈一圈往外擴，確定外圈不可能更近時就停止。
+        :param max_radius: 只找這個距離以內的物件 (None 為不限)
+        :param exclude: 要略過的物件 (例如自己)
+        """
+        px, py = point
+        cs, cols, rows = self.cell_size, self.cols, self.rows
+        pc = min(max(int(px // cs), 0), cols - 1)
+        pr = min(max(int(py // cs), 0), rows - 1)
+        limit_sq = max_radius * max_radius if max_radius is not None else math.inf
+        max_ring = max(pc, cols - 1 - pc, pr, rows - 1 - pr)
+        if max_radius is not None:
+            max_ring = min(max_ring, int(max_radius // cs) + 1)
+
+        best = []        # max-heap (負距離)，保留最近的 k 個
+        seen = set()
+        for ring in range(max_ring + 1):
+            # 外圈的格子與 point 的最短距離至少是 (ring - 1) 格
+            if len(best) == k and ((ring - 1) * cs) ** 2 > -best[0][0]:
+                break
+            for r in range(pr - ring, pr + ring + 1):
+                if r < 0 or r >= rows:
+                    continue
+                step = 1 if r in (pr - ring, pr + ring) else 2 * ring   # 只走這一圈的邊框
+                for c in range(pc - ring, pc + ring + 1, max(step, 1)):
+                    if c < 0 or c >= cols:
+                        continue
+                    cell = self.cells[r * cols + c]
+                    if not cell:
+                        continue
+                    for obj in cell:
+                        if obj is exclude or id(obj) in seen:
+                            continue
+                        seen.add(id(obj))
+                        ox, oy = obj.rect.center
+                        dist_sq = (ox - px) ** 2 + (oy - py) ** 2
+                        if dist_sq > limit_sq:
+                            continue
+                        if len(best) < k:
+                            heapq.heappush(best, (-dist_sq, id(obj), obj))
+                        elif dist_sq < -best[0][0]:
+                            heapq.heapreplace(best, (-dist_sq, id(obj), obj))
+        return [obj for _, _, obj in sorted(best, key=lambda item: -item[0])]
+
+    def nearest(self, point, max_radius=None, exclude=None):
+        """離 point 最近的物件，找不到時回傳 None"""
+        result = self.k_nearest(point, 1, max_radius, exclude)
+        return result[0] if result else None
+
+
+if __name__ == "__main__":
+    # 效能測試：python reference_modules/spatial_grid.py
+    import random
+    import time
+
+    class Unit:
+        def __init__(self, x, y):
+            self.rect = pygame.Rect(x, y, 24, 24)
+            self.velocity = (random.uniform(-2, 2), random.uniform(-2, 2))
+
+    for count in (500, 2000, 5000):
+        random.seed(0)
+        units = [Unit(random.randint(0, 3975), random.randint(0, 3975)) for _ in range(count)]
+        grid = SpatialGrid(4000, 4000, cell_size=64)
+        for unit in units:
+            grid.insert(unit)
+
+        frames = 60
+        start = time.perf_counter()
+        for _ in range(frames):
+            for unit in units:
+                unit.rect.move_ip(unit.velocity)
+                unit.rect.clamp_ip(pygame.Rect(0, 0, 4000, 4000))
+                grid.update(unit)
+        update_ms = (time.perf_counter() - start) * 1000 / frames
+
+        start = time.perf_counter()
+        for unit in units[:200]:
+            grid.query_radius(unit.rect.center, 150)
+        radius_us = (time.perf_counter() - start) * 1e6 / 200
+
+        start = time.perf_counter()
+        for unit in units[:200]:
+            grid.nearest(unit.rect.center, exclude=unit)
+        nearest_us = (time.perf_counter() - start) * 1e6 / 200
+
+        start = time.perf_counter()
+        for unit in units[:200]:
+            min(units, key=lambda other: (other.rect.centerx - unit.rect.centerx) ** 2
+                + (other.rect.centery - unit.rect.centery) ** 2 if other is not unit else math.inf)
+        brute_us = (time.perf_counter() - start) * 1e6 / 200
+
+        print(f"{count:>5} 個單位: 全部移動+update {update_ms:.2f} ms/幀 | query_radius {radius_us:.0f} µs | "
+              f"nearest {nearest_us:.0f} µs (暴力搜尋 {brute_us:.0f} µs)")
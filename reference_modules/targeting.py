@@ -0,0 +1,182 @@
+# tags: targeting, tower-defense, auto-aim, nearest, range-query, spatial-grid, optimization, ai, shooter
+
+class TargetingSystem:
+    """
+    共用的目標選擇服務，取代「每座塔各自掃過所有敵人」的 O(N·M) 寫法。
+    每幀用 update(enemies) 把候選目標一次放進均勻網格 (O(M))，
+    再用 assign(towers) 一次替所有射手找射程內最近的目標：每個射手只檢查射程附近的格子，
+    並且「黏住」目前的目標 —— 目標還活著且仍在射程內就直接沿用，不必重新查詢。
+    位置取物件的 pos (Vector2)，沒有的話取 rect.center；射程預設取射手的 attack_range。
+    用法：
+        targeting = TargetingSystem(cell_size=128)
+        # 每幀 (敵人移動之後)
+        targeting.update(enemy_group)
+        for tower, enemy in targeting.assign(tower_group).items():
+            if enemy is not None and tower.cooldown_timer <= 0:
+                tower.shoot(enemy)
+        # 單一查詢 (例如玩家自動瞄準)
+        target = targeting.nearest(player.rect.center, 600)
+    """
+    def __init__(self, cell_size=128):
+        """
+        :param cell_size: 網格大小 (像素)，約為常見射程的一半到一倍時效果最好
+        """
+        self.cell_size = cell_size
+        self.cells = {}         # (col, row) -> [(x, y, target), ...]
+        self.positions = {}     # target -> (x, y)，同時代表「這一幀還活著的目標」
+        self.locks = {}         # shooter -> 目前鎖定的目標
+        self.queries = 0        # 實際做網格查詢的次數 (除錯用)
+        self.sticky_hits = 0    # 沿用舊目標的次數 (除錯用)
+
+    @staticmethod
+    def position_of(obj):
+        pos = getattr(obj, "pos", None)
+        if pos is None:
+            pos = obj.rect.center
+        return pos[0], pos[1]
+
+    def update(self, targets):
+        """把這一幀的候選目標放進網格 (已 kill 的 Sprite 不在群組中，自然不會被選到)"""
+        size = self.cell_size
+        cells = {}
+        positions = {}
+        for target in targets:
+            x, y = self.position_of(target)
+            positions[target] = (x, y)
+            key = (int(x // size), int(y // size))
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [(x, y, target)]
+            else:
+                bucket.append((x, y, target))
+        self.cells = cells
+        self.positions = positions
+
+    def nearest(self, pos, max_range, exclude=None, accept=None):
+        """
+        射程內離 pos 最近的目標，沒有時回傳 None。
+        由 pos 所在的格子一圈一圈往外找，確定外圈不會更近時就停止。
+        :param accept: (選用) 過濾函式 func(target) -> bool (例如略過隱形的敵人)
+        """
+        self.queries += 1
+        px, py = pos[0], pos[1]
+        size = self.cell_size
+        cells = self.cells
+        col, row = int(px // size), int(py // size)
+        best, best_sq = None, max_range * max_range
+        for ring in range(int(max_range // size) + 2):
+            # 這一圈的格子與 pos 的最短距離至少是 (ring - 1) 格
+            if best is not None and ((ring - 1) * size) ** 2 > best_sq:
+                break
+            for r in range(row - ring, row + ring + 1):
+                edge = r == row - ring or r == row + ring
+                for c in (range(col - ring, col + ring + 1) if edge else (col - ring, col + ring)):
+                    bucket = cells.get((c, r))
+                    if not bucket:
+                        continue
+                    for x, y, target in bucket:
+                        dist_sq = (x - px) ** 2 + (y - py) ** 2
+                        if dist_sq <= best_sq and target is not exclude and (accept is None or accept(target)):
+                            best, best_sq = target, dist_sq
+        return best
+
+    def in_range(self, pos, radius):
+        """範圍內所有的目標 (範圍傷害、減速塔等)"""
+        px, py = pos[0], pos[1]
+        size = self.cell_size
+        radius_sq = radius * radius
+        hits = []
+        for r in range(int((py - radius) // size), int((py + radius) // size) + 1):
+            for c in range(int((px - radius) // size), int((px + radius) // size) + 1):
+                for x, y, target in self.cells.get((c, r), ()):
+                    if (x - px) ** 2 + (y - py) ** 2 <= radius_sq:
+                        hits.append(target)
+        return hits
+
+    def acquire(self, shooter, max_range, accept=None):
+        """
+        單一射手取得目標：目前鎖定的目標仍存在、在射程內且通過 accept 就沿用，否則重新找最近的。
+        :param accept: (選用) 過濾函式 func(target) -> bool，同時套用在沿用的目標上 (例如目標變成隱形就換目標)
+        :return: 目標或 None
+        """
+        sx, sy = self.position_of(shooter)
+        current = self.locks.get(shooter)
+        if current is not None:
+            position = self.positions.get(current)
+            if (position is not None and (position[0] - sx) ** 2 + (position[1] - sy) ** 2 <= max_range * max_range
+                    and (accept is None or accept(current))):
+                self.sticky_hits += 1
+                return current
+        target = self.nearest((sx, sy), max_range, accept=accept)
+        if target is None:
+            self.locks.pop(shooter, None)
+        else:
+            self.locks[shooter] = target
+        return target
+
+    def assign(self, shooters, range_of=None, accept=None):
+        """
+        一次替所有射手選目標。
+        :param shooters: 射手群組 (Group 或 list)
+        :param range_of: (選用) 取得射程的函式 func(shooter)，預設為 shooter.attack_range
+        :param accept: (選用) 過濾函式 func(target) -> bool
+        :return: {shooter: 目標或 None}
+        """
+        result = {}
+        previous = self.locks
+        self.locks = {}     # 只保留這次有傳入的射手 (被移除的塔不會殘留)
+        for shooter in shooters:
+            max_range = range_of(shooter) if range_of is not None else shooter.attack_range
+            current = previous.get(shooter)
+            if current is not None:
+                self.locks[shooter] = current
+            result[shooter] = self.acquire(shooter, max_range, accept)
+        return result
+
+    def release(self, shooter):
+        """解除射手的鎖定 (例如射手死亡或想強制換目標)"""
+        self.locks.pop(shooter, None)
+
+
+if __name__ == "__main__":
+    # 效能測試：python reference_modules/targeting.py (每座塔掃過所有敵人 vs TargetingSystem)
+    import random
+    import time
+    import pygame
+
+    random.seed(0)
+
+    class Unit:
+        def __init__(self, attack_range=0):
+            self.pos = pygame.math.Vector2(random.uniform(0, 4000), random.uniform(0, 4000))
+            self.velocity = pygame.math.Vector2(random.uniform(-1.5, 1.5), random.uniform(-1.5, 1.5))
+            self.attack_range = attack_range
+
+    for tower_count, enemy_count in ((50, 500), (200, 2000), (400, 5000)):
+        towers = [Unit(attack_range=250) for _ in range(tower_count)]
+        enemies = [Unit() for _ in range(enemy_count)]
+        frames = 20
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            for enemy in enemies:
+                enemy.pos += enemy.velocity
+            for tower in towers:
+                nearest, best = None, tower.attack_range ** 2
+                for enemy in enemies:
+                    dist_sq = (enemy.pos - tower.pos).length_squared()
+                    if dist_sq < best:
+                        nearest, best = enemy, dist_sq
+        naive_ms = (time.perf_counter() - start) * 1000 / frames
+
+        targeting = TargetingSystem(cell_size=128)
+        start = time.perf_counter()
+        for _ in range(frames):
+            for enemy in enemies:
+                enemy.pos += enemy.velocity
+            targeting.update(enemies)
+            targeting.assign(towers)
+        system_ms = (time.perf_counter() - start) * 1000 / frames
+        sticky = targeting.sticky_hits / max(1, targeting.sticky_hits + targeting.queries) * 100
+        print(f"{tower_count:>4} 座塔 x {enemy_count:>5} 個敵人: 逐一掃描 {naive_ms:.1f} ms/幀 | "
+              f"TargetingSystem {system_ms:.2f} ms/幀 (沿用目標 {sticky:.0f}%)")
@@ -1,4 +1,4 @@
-# tags: procedural-generation, maze, dfs, tilemap, grid-system
+# tags: procedural-generation, maze, dfs, tilemap, grid-system, render-cache, large-map
 import pygame
 import random
 
@@ -6,65 +6,88 @@ class MazeManager:
     """
     迷宮生成與管理模組。
     封裝了 DFS 迷宮生成演算法與基本的網格繪圖功能。
-    
+
     功能：
-    1. 使用 Iterative DFS 演算法生成保證連通的迷宮。
-    2. 提供標準化的地圖繪製方法。
+    1. 使用 Iterative DFS 演算法生成保證連通的迷宮 (1000x1000 約 0.3 秒)。
+    2. 地圖存在 MazeGrid (bytearray) 中，grid[row][col] 的取值與設值和 List of Lists 相同 (列本身的限制見 MazeGrid)。
+    3. draw_map 只在第一次 (或格子改變時) 繪製地圖並快取成 Surface，之後每幀只 blit 一次；
+       格子改變會自動偵測，只重畫改變的格子。支援 offset 捲動大型迷宮。
     """
-    
+
     # 顏色定義 (Class Constants)
     WALL_COLOR = (0, 0, 0)          # 牆 (黑)
     PATH_COLOR = (255, 255, 255)    # 路 (白)
     START_COLOR = (0, 255, 0)       # 起點 (綠)
     END_COLOR = (255, 0, 0)         # 終點 (紅)
-    
+
     # 格子定義
     TILE_WALL = 1
     TILE_PATH = 0
     TILE_START = 2
     TILE_END = 3
 
+    # 快取的整張地圖超過這個像素數時，改為每幀只放大可見的範圍 (避免佔用大量記憶體)
+    MAX_CACHE_PIXELS = 4096 * 4096
+
     def __init__(self, tile_size=20):
         """
         :param tile_size: 每個格子的像素大小 (預設 20)
         """
         self.tile_size = tile_size
+        self.invalidate()
 
     def create_path_dfs(self, width, height):
         """
         使用深度優先搜尋 (DFS) 生成迷宮地圖。
-        
+
         :param width: 網格寬度 (Grid Cols)
         :param height: 網格高度 (Grid Rows)
-        :return: 二維陣列 (List of Lists)
+        :return: MazeGrid (grid[row][col] 取值與設值和二維陣列相同)
         """
-        # 初始化牆壁 
-        grid = [[self.TILE_WALL for _ in range(width)] for _ in range(height)]
-        
-        start_x, start_y = 1, 1
-        grid[start_y][start_x] = self.TILE_PATH
-        
-        stack = [(start_x, start_y)]    # 記錄走過的地方
-        directions = [(0, -2), (0, 2), (-2, 0), (2, 0)]
-
-        # DFS 演算法挖掘過程 
-        while stack:
-            current_x, current_y = stack[-1]
-            possible_moves = []
-            for dx, dy in directions:
-                nx, ny = current_x + dx, current_y + dy
-                if 1 <= nx < width - 1 and 1 <= ny < height - 1:
-                    if grid[ny][nx] == self.TILE_WALL:
-                        possible_moves.append((dx, dy))
-            
-            if possible_moves:
-                dx, dy = random.choice(possible_moves)
-                # 打通牆壁 (中間格與目標格)
-                grid[current_y + dy // 2][current_x + dx // 2] = self.TILE_PATH
-                grid[current_y + dy][current_x + dx] = self.TILE_PATH
-                stack.append((current_x + dx, current_y + dy))
-            else:
-                stack.pop()
+        # 初始化牆壁
+        grid = MazeGrid(width, height, fill=self.TILE_WALL)
+        data = grid.data
+        path = self.TILE_PATH
+
+        # 在「房間格」(奇數座標) 上做 DFS；visited 外圍多一圈已拜訪的格子，省去邊界檢查
+        cols, rows = (width - 1) // 2, (height - 1) // 2
+        if cols > 0 and rows > 0:
+            stride = cols + 2
+            visited = bytearray([1]) * (stride * (rows + 2))
+            for row in range(rows):
+                start = (row + 1) * stride + 1
+                visited[start:start + cols] = bytes(cols)
+
+            # (visited 的位移, 迷宮中牆壁的位移, 迷宮中目標格的位移)；順序與原本的上、下、左、右相同，同一個 seed 產生相同的迷宮
+            up, down = (-stride, -width, -2 * width), (stride, width, 2 * width)
+            left, right = (-1, -1, -2), (1, 1, 2)
+            start_cell, start_tile = stride + 1, width + 1
+            visited[start_cell] = 1
+            data[start_tile] = path
+            stack = [(start_cell, start_tile)]    # 記錄走過的地方
+            push, pop, choice = stack.append, stack.pop, random.choice
+
+            # DFS 演算法挖掘過程
+            while stack:
+                cell, tile = stack[-1]
+                possible_moves = []
+                if not visited[cell - stride]:
+                    possible_moves.append(up)
+                if not visited[cell + stride]:
+                    possible_moves.append(down)
+                if not visited[cell - 1]:
+                    possible_moves.append(left)
+                if not visited[cell + 1]:
+                    possible_moves.append(right)
+                if possible_moves:
+                    cell_step, wall_step, tile_step = choice(possible_moves)
+                    # 打通牆壁 (中間格與目標格)
+                    data[tile + wall_step] = path
+                    data[tile + tile_step] = path
+                    visited[cell + cell_step] = 1
+                    push((cell + cell_step, tile + tile_step))
+                else:
+                    pop()
 
         # 設定起點與終點
         grid[1][1] = self.TILE_START
@@ -72,28 +95,159 @@ class MazeManager:
 
         return grid
 
-    def draw_map(self, surface, map_data):
+    # ------------------------------------------
+    # 繪製 (快取)
+    # ------------------------------------------
+    def invalidate(self):
+        """清除繪圖快取 (例如修改了顏色)，下次 draw_map 時重新繪製"""
+        self._source = None      # 快取對應的 map_data
+        self._snapshot = None    # 上次繪製時的格子內容 (用來偵測改變)
+        self._tiles = None       # 每格 1 像素的 8-bit 地圖 (調色盤 = 格子顏色)
+        self._surface = None     # 放大到 tile_size 的地圖快取 (太大時為 None)
+
+    def _palette(self):
+        palette = [self.PATH_COLOR] * 256
+        palette[self.TILE_WALL] = self.WALL_COLOR
+        palette[self.TILE_START] = self.START_COLOR
+        palette[self.TILE_END] = self.END_COLOR
+        return palette
+
+    def _rebuild(self, map_data):
+        rows, cols = len(map_data), len(map_data[0])
+        if isinstance(map_data, MazeGrid):
+            raw = bytes(map_data.data)
+            self._snapshot = raw
+        else:
+            raw = bytes(tile for row in map_data for tile in row)
+            self._snapshot = [list(row) for row in map_data]
+        tiles = pygame.image.frombuffer(raw, (cols, rows), "P")
+        tiles.set_palette(self._palette())
+        self._tiles = tiles.copy()
+        self._source = map_data
+        size = (cols * self.tile_size, rows * self.tile_size)
+        self._surface = None
+        if size[0] * size[1] <= self.MAX_CACHE_PIXELS:
+            self._surface = pygame.transform.scale(self._tiles, size)
+            if pygame.display.get_surface():
+                self._surface = self._surface.convert()
+
+    def _changed_rows(self, map_data):
+        """找出與快取不同的列，並更新快照"""
+        if isinstance(map_data, MazeGrid):
+            data, snapshot = map_data.data, self._snapshot
+            if data == snapshot:
+                return []
+            width = map_data.width
+            current, previous = memoryview(data), memoryview(snapshot)
+            changed = [row for row in range(map_data.height)
+                       if current[row * width:(row + 1) * width] != previous[row * width:(row + 1) * width]]
+            self._snapshot = bytes(data)
+            return changed
+        changed = [row for row, line in enumerate(map_data) if line != self._snapshot[row]]
+        for row in changed:
+            self._snapshot[row] = list(map_data[row])
+        return changed
+
+    def _sync(self, map_data):
+        if self._source is not map_data or self._tiles.get_size() != (len(map_data[0]), len(map_data)):
+            self._rebuild(map_data)
+            return
+        changed = self._changed_rows(map_data)
+        if not changed:
+            return
+        # 只重畫改變的格子
+        palette = self._palette()
+        size = self.tile_size
+        tiles = pygame.PixelArray(self._tiles)
+        for row in changed:
+            line = map_data[row]
+            for col in range(len(line)):
+                tile = line[col]
+                if tiles[col, row] != tile:
+                    tiles[col, row] = tile
+                    if self._surface is not None:
+                        self._surface.fill(palette[tile], (col * size, row * size, size, size))
+        tiles.close()
+
+    def draw_map(self, surface, map_data, offset=(0, 0)):
         """
-        繪製整個迷宮地圖到指定的 Surface 上。
-        
+        繪製整個迷宮地圖到指定的 Surface 上 (第一次繪製後會快取，格子改變時自動更新)。
+
         :param surface: 目標繪圖畫布 (通常是 screen)
-        :param map_data: create_path_dfs 產生的二維陣列
+        :param map_data: create_path_dfs 產生的 MazeGrid (也接受 List of Lists)
+        :param offset: 相機偏移量 (畫面左上角在地圖中的像素座標)，捲動大型迷宮時使用
         """
-        # 先填滿背景色 (路徑色)，這樣只需要畫牆壁和特殊點，優化效能
-        surface.fill(self.PATH_COLOR)
-
-        for row_index, row in enumerate(map_data):
-            for col_index, tile in enumerate(row):
-                rect = pygame.Rect(
-                    col_index * self.tile_size, 
-                    row_index * self.tile_size, 
-                    self.tile_size, 
-                    self.tile_size
-                )
-                
-                if tile == self.TILE_WALL:
-                    pygame.draw.rect(surface, self.WALL_COLOR, rect)
-                elif tile == self.TILE_START:
-                    pygame.draw.rect(surface, self.START_COLOR, rect)
-                elif tile == self.TILE_END:
-                    pygame.draw.rect(surface, self.END_COLOR, rect)
+        self._sync(map_data)
+        ox, oy = int(offset[0]), int(offset[1])
+        size = self.tile_size
+        view = pygame.Rect(ox, oy, *surface.get_size())
+        map_rect = pygame.Rect(0, 0, self._tiles.get_width() * size, self._tiles.get_height() * size)
+        if not map_rect.contains(view):
+            # 地圖外的區域以路徑色填滿
+            surface.fill(self.PATH_COLOR)
+
+        if self._surface is not None:
+            surface.blit(self._surface, (-ox, -oy))
+            return
+
+        # 大型迷宮：只放大畫面內的格子
+        visible = view.clip(map_rect)
+        if not visible.width or not visible.height:
+            return
+        col0, row0 = visible.left // size, visible.top // size
+        col1, row1 = (visible.right - 1) // size + 1, (visible.bottom - 1) // size + 1
+        window = self._tiles.subsurface((col0, row0, col1 - col0, row1 - row0))
+        scaled = pygame.transform.scale(window, ((col1 - col0) * size, (row1 - row0) * size))
+        surface.blit(scaled, (col0 * size - ox, row0 * size - oy))
+
+
+class MazeGrid:
+    """
+    緊湊的迷宮網格：所有格子存在一個 bytearray 中 (每格 1 byte，1000x1000 只需 1 MB)。
+    grid[row][col] 的取值與設值方式和 List of Lists 相同，len(grid)、for row in grid 也可以使用，
+    另外提供 data (一維 bytearray，index = row * width + col) 給尋路等需要高速存取的程式使用。
+    注意每一列是 memoryview 而不是 list：
+        - grid[row] == [1, 0, 1] 永遠是 False，也沒有 .index() / .count() / .append()，需要時先 list(grid[row])
+        - 格子的值只能是 0~255 的整數
+        - 存成 JSON 請用 to_lists()；copy.copy / copy.deepcopy / pickle 可以直接使用 (會複製整張地圖)
+    """
+    __slots__ = ("width", "height", "data", "_rows")
+
+    def __init__(self, width, height, fill=0, data=None):
+        self.width = width
+        self.height = height
+        self.data = bytearray(data) if data is not None else bytearray([fill]) * (width * height)
+        view = memoryview(self.data)
+        self._rows = [view[row * width:(row + 1) * width] for row in range(height)]
+
+    def __getitem__(self, row):
+        return self._rows[row]
+
+    def __len__(self):
+        return self.height
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def get(self, col, row):
+        return self.data[row * self.width + col]
+
+    def set(self, col, row, value):
+        self.data[row * self.width + col] = value
+
+    def copy(self):
+        return MazeGrid(self.width, self.height, data=self.data)
+
+    # memoryview 無法被複製或 pickle，改為由 bytes 重建
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __reduce__(self):
+        return MazeGrid, (self.width, self.height, 0, bytes(self.data))
+
+    def to_lists(self):
+        """轉成 List of Lists (存檔成 JSON 時使用)"""
+        return [list(row) for row in self._rows]